@@ -0,0 +1,489 @@
+"""
+Threshold and anomaly alerting over interface, error and NAT counters.
+
+A background evaluator (VPP_ALERTS=1) samples every VPP_ALERT_INTERVAL
+seconds and checks declarative rules:
+
+    {"name": "drop-storm", "metric": "drops_per_sec", "match": "Gig*",
+     "op": ">", "threshold": 1000, "for": 3, "severity": "critical"}
+
+    {"name": "rx-anomaly", "metric": "rx_bps",
+     "anomaly": {"alpha": 0.1, "z": 4, "warmup": 30}}
+
+Metrics:
+    rx_bps tx_bps rx_pps tx_pps drops_per_sec   per interface (match = name glob)
+    err_rate                                    per /err/* counter (match = path glob)
+    nat_pool_utilization                        NAT44 sessions / (pool addresses * ports)
+
+Each metric is one numpy vector per tick (one entry per interface or
+counter), so a rule is a handful of array operations however many
+interfaces there are. Firing / resolved transitions go to the recent-alert
+list, the /api/alerts/stream subscribers and the webhook queue.
+"""
+import fnmatch
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+from collections import deque
+from itertools import count
+
+from api.interfaces import collect_interface_counters
+from vpp_connection import connect_vpp, connection_stale, disconnect_vpp
+
+log = logging.getLogger(__name__)
+
+VPP_ALERTS = os.environ.get("VPP_ALERTS", "0") not in ("", "0", "false", "no")
+VPP_ALERT_INTERVAL = float(os.environ.get("VPP_ALERT_INTERVAL", "5"))
+VPP_ALERT_RULES = os.environ.get("VPP_ALERT_RULES", "")          # path to a JSON list of rules
+VPP_ALERT_WEBHOOK = os.environ.get("VPP_ALERT_WEBHOOK", "")      # POST every alert here
+VPP_ALERT_HISTORY = int(os.environ.get("VPP_ALERT_HISTORY", "500"))
+
+# Vectorized evaluation needs numpy; without it the engine stays off
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+INTERFACE_METRICS = ("rx_bps", "tx_bps", "rx_pps", "tx_pps", "drops_per_sec")
+METRICS = INTERFACE_METRICS + ("err_rate", "nat_pool_utilization")
+OPS = {">": "greater", ">=": "greater_equal", "<": "less", "<=": "less_equal"}
+SEVERITIES = ("info", "warning", "critical")
+
+# NAT44 ports available per pool address and protocol
+NAT_PORTS_PER_ADDRESS = 65535 - 1024
+
+DEFAULT_RULES = [
+    {"name": "interface-drops", "metric": "drops_per_sec", "op": ">", "threshold": 1000,
+     "for": 2, "severity": "critical"},
+    {"name": "nat-pool-utilization", "metric": "nat_pool_utilization", "op": ">", "threshold": 0.9,
+     "for": 1, "severity": "warning"},
+]
+
+
+def _number(rule, field, value, kind=float):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"rule {rule['name']}: {field} must be a number, got {value!r}") from None
+
+
+def validate_rule(rule):
+    """Return a normalized copy of rule or raise ValueError."""
+    if not isinstance(rule, dict) or not rule.get("name"):
+        raise ValueError("each rule needs a name")
+    if rule.get("metric") not in METRICS:
+        raise ValueError(f"rule {rule['name']}: metric must be one of {', '.join(METRICS)}")
+    normalized = {
+        "name": str(rule["name"]),
+        "metric": rule["metric"],
+        "match": str(rule.get("match", "*")),
+        "severity": rule.get("severity", "warning"),
+        "for": max(_number(rule, "for", rule.get("for", 1), int), 1),
+    }
+    if normalized["severity"] not in SEVERITIES:
+        raise ValueError(f"rule {rule['name']}: severity must be one of {', '.join(SEVERITIES)}")
+
+    if "anomaly" in rule:
+        anomaly = rule["anomaly"] or {}
+        if not isinstance(anomaly, dict):
+            raise ValueError(f"rule {rule['name']}: anomaly must be an object")
+        normalized["anomaly"] = {
+            "alpha": _number(rule, "anomaly alpha", anomaly.get("alpha", 0.1)),
+            "z": _number(rule, "anomaly z", anomaly.get("z", 4.0)),
+            "warmup": _number(rule, "anomaly warmup", anomaly.get("warmup", 30), int),
+        }
+        if not 0 < normalized["anomaly"]["alpha"] <= 1:
+            raise ValueError(f"rule {rule['name']}: anomaly alpha must be in (0, 1]")
+    else:
+        if rule.get("op", ">") not in OPS:
+            raise ValueError(f"rule {rule['name']}: op must be one of {', '.join(OPS)}")
+        if "threshold" not in rule:
+            raise ValueError(f"rule {rule['name']}: threshold or anomaly is required")
+        normalized["op"] = rule.get("op", ">")
+        normalized["threshold"] = _number(rule, "threshold", rule["threshold"])
+    return normalized
+
+
+def load_rules(path=VPP_ALERT_RULES):
+    if not path:
+        return [validate_rule(r) for r in DEFAULT_RULES]
+    with open(path) as f:
+        return [validate_rule(r) for r in json.load(f)]
+
+
+def _load_configured_rules(engine):
+    """Replace the default rules with VPP_ALERT_RULES; a bad file is logged and the defaults stay."""
+    try:
+        engine.set_rules(load_rules())
+    except (OSError, ValueError) as e:
+        log.error("Cannot load alert rules from %s, keeping the default rules: %s", VPP_ALERT_RULES, e)
+
+
+# ---------------------------------------------------------------------------
+# Sampling: one vector per metric
+# ---------------------------------------------------------------------------
+
+class Sample:
+    """One tick of raw counters: {metric: (target names, values)}."""
+
+    def __init__(self, ts):
+        self.ts = ts
+        self.counters = {}       # raw cumulative vectors, for rates
+        self.gauges = {}         # already-final values
+
+    def add_counter(self, key, names, values):
+        self.counters[key] = (list(names), np.asarray(values, dtype=np.float64))
+
+    def add_gauge(self, metric, names, values):
+        self.gauges[metric] = (list(names), np.asarray(values, dtype=np.float64))
+
+
+def _rate(now, then, elapsed):
+    """Per-second rate of a counter vector, aligned on target name; resets become 0."""
+    names, cur = now
+    prev_names, prev = then
+    if prev_names != names:
+        position = {name: i for i, name in enumerate(prev_names)}
+        index = np.array([position.get(name, -1) for name in names], dtype=np.int64)
+        prev = np.where(index >= 0, prev[np.maximum(index, 0)] if len(prev) else 0, cur)
+    return names, np.clip(cur - prev, 0, None) / elapsed
+
+
+def metric_vectors(now, then):
+    """{metric: (names, values)} from two successive samples."""
+    vectors = dict(now.gauges)
+    if then is None:
+        return vectors
+    elapsed = max(now.ts - then.ts, 1e-6)
+    rates = {key: _rate(series, then.counters[key], elapsed)
+             for key, series in now.counters.items() if key in then.counters}
+
+    if "rx_bytes" in rates:
+        names = rates["rx_bytes"][0]
+        vectors["rx_bps"] = (names, rates["rx_bytes"][1] * 8)
+        vectors["tx_bps"] = (names, rates["tx_bytes"][1] * 8)
+        vectors["rx_pps"] = (names, rates["rx_packets"][1])
+        vectors["tx_pps"] = (names, rates["tx_packets"][1])
+        vectors["drops_per_sec"] = (names, rates["drops"][1])
+    if "err" in rates:
+        vectors["err_rate"] = rates["err"]
+    return vectors
+
+
+# ---------------------------------------------------------------------------
+# Rule state and evaluation
+# ---------------------------------------------------------------------------
+
+class RuleState:
+    """Per-target vectors for one rule, re-laid out when the target list changes."""
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.names = None
+        self.mask = None
+        self.streak = None       # consecutive ticks matching
+        self.firing = None
+        self.mean = None         # EWMA state for anomaly rules
+        self.var = None
+        self.seen = None         # samples folded into the EWMA, per target (warm-up)
+
+    def align(self, names):
+        """Adopt a new target list; returns the targets that disappeared."""
+        if names == self.names:
+            return []
+        dropped = sorted(set(self.names or []) - set(names))
+        n = len(names)
+        old = {name: i for i, name in enumerate(self.names or [])}
+        index = np.array([old.get(name, -1) for name in names], dtype=np.int64)
+        known = index >= 0
+
+        def carry(vector, fill, dtype):
+            out = np.full(n, fill, dtype=dtype)
+            if vector is not None and known.any():
+                out[known] = vector[index[known]]
+            return out
+
+        self.streak = carry(self.streak, 0, np.int64)
+        self.firing = carry(self.firing, False, bool)
+        self.mean = carry(self.mean, np.nan, np.float64)
+        self.var = carry(self.var, 0.0, np.float64)
+        self.seen = carry(self.seen, 0, np.int64)
+        pattern = self.rule["match"]
+        self.mask = np.array([fnmatch.fnmatchcase(name, pattern) for name in names], dtype=bool)
+        self.names = list(names)
+        return dropped
+
+    def condition(self, values):
+        rule = self.rule
+        if "anomaly" not in rule:
+            return getattr(np, OPS[rule["op"]])(values, rule["threshold"]), None
+
+        a = rule["anomaly"]
+        fresh = np.isnan(self.mean)
+        self.mean[fresh] = values[fresh]
+        deviation = values - self.mean
+        std = np.sqrt(self.var)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where(std > 0, np.abs(deviation) / std, 0.0)
+        # a target that appeared later warms up on its own
+        hit = (z > a["z"]) & (self.seen >= a["warmup"])
+        # standard incremental EWMA mean / variance
+        self.mean += a["alpha"] * deviation
+        self.var = (1 - a["alpha"]) * (self.var + a["alpha"] * deviation * deviation)
+        self.seen += 1
+        return hit, z
+
+
+class AlertEngine:
+    """Evaluates rules against successive samples and publishes transitions."""
+
+    def __init__(self, rules):
+        self._lock = threading.Lock()
+        self._ids = count(1)
+        self.recent = deque(maxlen=VPP_ALERT_HISTORY)
+        self.active = {}                 # (rule, target) -> alert
+        self.subscribers = set()
+        self.sinks = []
+        self.last_sample = None
+        self.last_eval_ms = 0.0
+        self.set_rules(rules)
+
+    def set_rules(self, rules):
+        """Replace the rules; alerts that were firing are published as resolved."""
+        with self._lock:
+            now = time.time()
+            resolved = [self._resolved(alert, now) for alert in self.active.values()]
+            self.rules = list(rules)
+            self.states = {rule["name"]: RuleState(rule) for rule in self.rules}
+            self.active = {}
+
+        for alert in resolved:
+            self.publish(alert)
+
+    def needs(self, metric):
+        return any(rule["metric"] == metric for rule in self.rules)
+
+    def evaluate(self, sample):
+        """Run every rule against sample; returns the alerts it produced."""
+        started = time.perf_counter()
+        with self._lock:
+            vectors = metric_vectors(sample, self.last_sample)
+            self.last_sample = sample
+            alerts = []
+            for rule in self.rules:
+                series = vectors.get(rule["metric"])
+                if series is None:
+                    continue
+                names, values = series
+                state = self.states[rule["name"]]
+                for target in state.align(names):
+                    alert = self.active.pop((rule["name"], target), None)
+                    if alert is not None:
+                        alerts.append(self._resolved(alert, sample.ts))
+                hit, z = state.condition(values)
+                hit &= state.mask
+
+                state.streak = np.where(hit, state.streak + 1, 0)
+                firing = state.streak >= rule["for"]
+                started_firing = np.flatnonzero(firing & ~state.firing)
+                resolved = np.flatnonzero(state.firing & ~firing)
+                state.firing = firing
+
+                for i in started_firing:
+                    alerts.append(self._transition(rule, names[i], "firing", values[i], z, i, sample.ts))
+                for i in resolved:
+                    alerts.append(self._transition(rule, names[i], "resolved", values[i], z, i, sample.ts))
+            self.last_eval_ms = (time.perf_counter() - started) * 1000.0
+
+        for alert in alerts:
+            self.publish(alert)
+        return alerts
+
+    def _transition(self, rule, target, state, value, z, i, ts):
+        alert = {
+            "id": next(self._ids),
+            "rule": rule["name"],
+            "metric": rule["metric"],
+            "severity": rule["severity"],
+            "target": target,
+            "state": state,
+            "value": float(value),
+            "ts": ts,
+        }
+        if "anomaly" in rule:
+            alert["z"] = float(z[i])
+        else:
+            alert["threshold"] = rule["threshold"]
+            alert["op"] = rule["op"]
+
+        key = (rule["name"], target)
+        if state == "firing":
+            self.active[key] = alert
+        else:
+            self.active.pop(key, None)
+        return alert
+
+    def _resolved(self, alert, ts):
+        """A "resolved" copy of an active alert whose target or rule went away."""
+        return dict(alert, id=next(self._ids), state="resolved", ts=ts)
+
+    def publish(self, alert):
+        self.recent.append(alert)
+        log.warning("alert %s %s %s=%s on %s", alert["state"], alert["rule"],
+                    alert["metric"], alert["value"], alert["target"])
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.put_nowait(alert)
+            except queue.Full:
+                pass      # slow stream client; it misses this one rather than blocking the engine
+        for sink in self.sinks:
+            sink(alert)
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=1000)
+        self.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        self.subscribers.discard(q)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "active": list(self.active.values()),
+                "recent": list(self.recent),
+                "rules": list(self.rules),
+                "last_eval_ms": round(self.last_eval_ms, 3),
+            }
+
+
+# ---------------------------------------------------------------------------
+# Webhook delivery
+# ---------------------------------------------------------------------------
+
+class WebhookQueue(threading.Thread):
+    """POSTs alerts as JSON to a URL from a bounded queue, retrying with backoff."""
+
+    def __init__(self, url, retries=3, maxsize=1000):
+        super().__init__(daemon=True, name="vpp-alert-webhook")
+        self.url = url
+        self.retries = retries
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.last_error = None
+
+    def __call__(self, alert):
+        try:
+            self.queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+
+    def post(self, alert):
+        req = urllib.request.Request(self.url, data=json.dumps(alert).encode(),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=5) as response:
+            response.read()
+
+    def run(self):
+        while True:
+            alert = self.queue.get()
+            for attempt in range(self.retries):
+                try:
+                    self.post(alert)
+                    self.last_error = None
+                    break
+                except Exception as e:
+                    self.last_error = str(e)
+                    time.sleep(2 ** attempt)
+            else:
+                log.warning("Dropping alert %s after %d webhook attempts: %s",
+                            alert["id"], self.retries, self.last_error)
+
+
+# ---------------------------------------------------------------------------
+# Background evaluator
+# ---------------------------------------------------------------------------
+
+def take_sample(v, engine, collect):
+    """Read only the counters some rule needs into a Sample."""
+    sample = Sample(time.time())
+
+    if any(engine.needs(m) for m in INTERFACE_METRICS):
+        columns = collect(v)
+        for field in ("rx_bytes", "tx_bytes", "rx_packets", "tx_packets", "drops"):
+            sample.add_counter(field, columns["name"], columns[field])
+
+    if engine.needs("err_rate"):
+        paths = v.vpp_stats.ls(["/err/"])
+        values = []
+        for path in paths:
+            counter = v.vpp_stats.get_counter(path)
+            values.append(sum(counter) if isinstance(counter, list) else counter)
+        sample.add_counter("err", paths, values)
+
+    if engine.needs("nat_pool_utilization"):
+        addresses = len(v.api.nat44_address_dump())
+        sessions = sum(u.nsessions for u in v.api.nat44_user_dump())
+        capacity = addresses * NAT_PORTS_PER_ADDRESS
+        sample.add_gauge("nat_pool_utilization", ["nat44"], [sessions / capacity if capacity else 0.0])
+
+    return sample
+
+
+class AlertEvaluator(threading.Thread):
+    """Samples and evaluates every interval seconds on its own VPP connection."""
+
+    def __init__(self, engine, interval):
+        super().__init__(daemon=True, name="vpp-alert-evaluator")
+        self.engine = engine
+        self.interval = interval
+        self.last_error = None
+
+    def run(self):
+        v = None
+        while True:
+            started = time.monotonic()
+            try:
+                if v is not None and connection_stale(v):
+                    disconnect_vpp(v)
+                    v = None
+                if v is None:
+                    v = connect_vpp("vpp-gui-alerts")
+                    if v is None:
+                        raise ConnectionError("Not connected to VPP")
+                self.engine.evaluate(take_sample(v, self.engine, collect_interface_counters))
+                self.last_error = None
+            except Exception as e:
+                if self.last_error != str(e):
+                    log.warning("Alert evaluation failed: %s", e)
+                self.last_error = str(e)
+                if v is not None:
+                    disconnect_vpp(v)
+                    v = None
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+# the rules file is only read by init_alerts(), when alerting is enabled
+alert_engine = AlertEngine(load_rules(None)) if np is not None else None
+alert_evaluator = AlertEvaluator(alert_engine, VPP_ALERT_INTERVAL) if alert_engine is not None else None
+
+
+def init_alerts(app):
+    """Call this from create_app() to start the alert evaluator (VPP_ALERTS=1, needs numpy)."""
+    if not VPP_ALERTS:
+        return
+    if alert_engine is None:
+        log.warning("VPP_ALERTS is set but numpy is not installed; alerting disabled")
+        return
+    if VPP_ALERT_RULES:
+        _load_configured_rules(alert_engine)
+    if VPP_ALERT_WEBHOOK and not alert_engine.sinks:
+        webhook = WebhookQueue(VPP_ALERT_WEBHOOK)
+        alert_engine.sinks.append(webhook)
+        webhook.start()
+    if not alert_evaluator.is_alive():
+        alert_evaluator.start()
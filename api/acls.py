@@ -1,51 +1,40 @@
 from flask import Blueprint, jsonify, request
 from vpp_connection import get_vpp_for_request
+from vpp_cache import cached_dump, invalidate_on_write, config_cache, cached_view, view_response
+from vpp_records import AclRule, decode
+from vpp_address import family, is_zero, ZERO
 import ipaddress
 import traceback
+import logging
 
 acls_bp = Blueprint('acls', __name__)
+log = logging.getLogger(__name__)
+invalidate_on_write(acls_bp, 'acl_dump', 'acl_interface_list_dump')
 
 
 @acls_bp.route('/api/acls', methods=['GET'])
 def get_acls():
     """Get all ACLs"""
     try:
+        cached = cached_view('acls')
+        if cached is not None:
+            return cached
+
+        version = config_cache.version('acls')
         v = get_vpp_for_request()
         if not v:
             return jsonify({'error': 'Not connected to VPP'}), 500
 
-        acls = v.api.acl_dump(acl_index=0xffffffff)
+        acls = cached_dump(v, 'acl_dump', acl_index=0xffffffff)
         result = []
 
         for acl in acls:
             rules = []
             for rule in acl.r:
                 try:
-                    # Source prefix
-                    if isinstance(rule.src_prefix, ipaddress._BaseNetwork):
-                        src_prefix = str(rule.src_prefix)
-                    else:
-                        src_prefix = f"{rule.src_prefix.address}/{rule.src_prefix.len}"
-
-                    # Destination prefix
-                    if isinstance(rule.dst_prefix, ipaddress._BaseNetwork):
-                        dst_prefix = str(rule.dst_prefix)
-                    else:
-                        dst_prefix = f"{rule.dst_prefix.address}/{rule.dst_prefix.len}"
-
-                    rules.append({
-                        'is_permit': int(rule.is_permit),
-                        'src_prefix': src_prefix,
-                        'dst_prefix': dst_prefix,
-                        'proto': int(rule.proto),
-                        'src_port_min': int(rule.srcport_or_icmptype_first),
-                        'src_port_max': int(rule.srcport_or_icmptype_last),
-                        'dst_port_min': int(rule.dstport_or_icmpcode_first),
-                        'dst_port_max': int(rule.dstport_or_icmpcode_last)
-                    })
-
+                    rules.append(decode(AclRule, rule).to_dict())
                 except Exception as e:
-                    print(f"Error processing ACL rule: {e}")
+                    log.error("Error processing ACL rule: %s", e)
                     continue
 
             result.append({
@@ -55,15 +44,47 @@ def get_acls():
                 'rules': rules
             })
 
-        return jsonify(result)
+        return view_response('acls', version, result)
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in get_acls: {e}\n{error_trace}")
+        log.error("Error in get_acls: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': error_trace}), 500
 
 
 
+def build_acl_rule(rule):
+    """Convert one JSON rule (src_ip, dst_ip, ports, action ...) to an acl_add_replace rule."""
+    # IP + prefix length; IPv4 or IPv6, an omitted side is "any" of the other side's family
+    given = rule.get('src_ip') or rule.get('dst_ip')
+    af = family(given) if given else 4
+    any_ip = ZERO[af]
+    src_ip = rule.get('src_ip', any_ip)
+    dst_ip = rule.get('dst_ip', any_ip)
+    if family(src_ip) != family(dst_ip):
+        raise ValueError(f"src_ip {src_ip} and dst_ip {dst_ip} are different address families")
+
+    host_len = 128 if af == 6 else 32
+    src_prefix_len = int(rule.get('src_prefix_len', host_len if not is_zero(src_ip) else 0))
+    dst_prefix_len = int(rule.get('dst_prefix_len', host_len if not is_zero(dst_ip) else 0))
+
+    src_network = ipaddress.ip_network(f"{src_ip}/{src_prefix_len}", strict=False)
+    dst_network = ipaddress.ip_network(f"{dst_ip}/{dst_prefix_len}", strict=False)
+
+    return {
+        'is_permit': 1 if rule.get('action', 'permit') == 'permit' else 0,
+        'src_prefix': src_network,
+        'dst_prefix': dst_network,
+        'proto': int(rule.get('proto', 0)),
+        'srcport_or_icmptype_first': int(rule.get('src_port_min', 0)),
+        'srcport_or_icmptype_last': int(rule.get('src_port_max', 65535)),
+        'dstport_or_icmpcode_first': int(rule.get('dst_port_min', 0)),
+        'dstport_or_icmpcode_last': int(rule.get('dst_port_max', 65535)),
+        'tcp_flags_mask': 0,
+        'tcp_flags_value': 0
+    }
+
+
 @acls_bp.route('/api/acl', methods=['POST'])
 def create_acl():
     """Create a new ACL"""
@@ -76,43 +97,19 @@ def create_acl():
         tag = data.get('tag', 'custom-acl')
         rules = data.get('rules', [])
 
-        acl_rules = []
-        for rule in rules:
-            # IP + prefix length
-            src_ip = rule.get('src_ip', '0.0.0.0')
-            dst_ip = rule.get('dst_ip', '0.0.0.0')
-
-            src_prefix_len = int(rule.get('src_prefix_len', 32 if src_ip != '0.0.0.0' else 0))
-            dst_prefix_len = int(rule.get('dst_prefix_len', 32 if dst_ip != '0.0.0.0' else 0))
-
-            src_network = ipaddress.ip_network(f"{src_ip}/{src_prefix_len}", strict=False)
-            dst_network = ipaddress.ip_network(f"{dst_ip}/{dst_prefix_len}", strict=False)
-
-            acl_rule = {
-                'is_permit': 1 if rule.get('action', 'permit') == 'permit' else 0,
-                'src_prefix': src_network,
-                'dst_prefix': dst_network,
-                'proto': int(rule.get('proto', 0)),
-                'srcport_or_icmptype_first': int(rule.get('src_port_min', 0)),
-                'srcport_or_icmptype_last': int(rule.get('src_port_max', 65535)),
-                'dstport_or_icmpcode_first': int(rule.get('dst_port_min', 0)),
-                'dstport_or_icmpcode_last': int(rule.get('dst_port_max', 65535)),
-                'tcp_flags_mask': 0,
-                'tcp_flags_value': 0
-            }
-
-            acl_rules.append(acl_rule)
-
-        # ✔ KEEP LOGS
-        print(f"Sending ACL '{tag}' with {len(acl_rules)} rule(s) to VPP:")
-        for r in acl_rules:
-            print(
-                f"{'PERMIT' if r['is_permit'] else 'DENY'} "
-                f"{r['src_prefix']} -> {r['dst_prefix']} "
-                f"proto {r['proto']} "
-                f"sports {r['srcport_or_icmptype_first']}-{r['srcport_or_icmptype_last']} "
-                f"-> dports {r['dstport_or_icmpcode_first']}-{r['dstport_or_icmpcode_last']}"
-            )
+        acl_rules = [build_acl_rule(rule) for rule in rules]
+
+        # ✔ KEEP LOGS (debug level; the per-rule loop only runs when enabled)
+        log.debug("Sending ACL '%s' with %d rule(s) to VPP:", tag, len(acl_rules))
+        if log.isEnabledFor(logging.DEBUG):
+            for r in acl_rules:
+                log.debug(
+                    "%s %s -> %s proto %s sports %s-%s -> dports %s-%s",
+                    'PERMIT' if r['is_permit'] else 'DENY',
+                    r['src_prefix'], r['dst_prefix'], r['proto'],
+                    r['srcport_or_icmptype_first'], r['srcport_or_icmptype_last'],
+                    r['dstport_or_icmpcode_first'], r['dstport_or_icmpcode_last']
+                )
 
         resp = v.api.acl_add_replace(
             acl_index=0xFFFFFFFF,
@@ -120,13 +117,13 @@ def create_acl():
             count=len(acl_rules),
             r=acl_rules
         )
+        config_cache.invalidate('acls')
 
         return jsonify({'success': True, 'acl_index': resp.acl_index})
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print("Error in create_acl:", e)
-        print(error_trace)
+        log.error("Error in create_acl: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': error_trace}), 500
 
 
@@ -140,11 +137,12 @@ def delete_acl(acl_index):
             return jsonify({'error': 'Not connected to VPP'}), 500
 
         v.api.acl_del(acl_index=acl_index)
+        config_cache.invalidate('acls')
 
         return jsonify({'success': True, 'deleted_acl': acl_index})
 
     except Exception as e:
-        print(f"Error deleting ACL: {e}")
+        log.error("Error deleting ACL: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -204,5 +202,5 @@ def apply_acl_to_interface(acl_index, sw_if_index):
         })
 
     except Exception as e:
-        print(f"Error applying/removing ACL: {e}")
+        log.error("Error applying/removing ACL: %s", e)
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,90 @@
+from flask import Blueprint, Response, jsonify, request
+from alerts import alert_evaluator, validate_rule, VPP_ALERTS
+import alerts
+from vpp_fleet import default_target_only
+import json
+import queue
+import traceback
+import logging
+
+alerts_bp = Blueprint('alerts', __name__)
+log = logging.getLogger(__name__)
+
+# Seconds between keep-alive comments on an idle alert stream
+STREAM_KEEPALIVE = 15
+
+
+def _engine_unavailable():
+    return jsonify({'error': 'Alerting requires numpy'}), 503
+
+
+@alerts_bp.route('/api/alerts', methods=['GET'])
+@default_target_only
+def get_alerts():
+    """Active alerts, recent firing/resolved transitions and the rule set"""
+    engine = alerts.alert_engine
+    if engine is None:
+        return _engine_unavailable()
+
+    result = engine.snapshot()
+    result['enabled'] = VPP_ALERTS
+    result['running'] = alert_evaluator.is_alive()
+    result['last_error'] = alert_evaluator.last_error
+    return jsonify(result)
+
+
+@alerts_bp.route('/api/alerts/rules', methods=['GET', 'PUT'])
+@default_target_only
+def manage_alert_rules():
+    """Get or replace the alert rules (PUT takes a JSON list of rules)"""
+    engine = alerts.alert_engine
+    if engine is None:
+        return _engine_unavailable()
+
+    if request.method == 'GET':
+        return jsonify(engine.rules)
+
+    try:
+        rules = request.get_json(silent=True)
+        if not isinstance(rules, list):
+            return jsonify({'error': 'Expected a JSON list of rules'}), 400
+        rules = [validate_rule(rule) for rule in rules]
+        names = [rule['name'] for rule in rules]
+        if len(set(names)) != len(names):
+            return jsonify({'error': 'Rule names must be unique'}), 400
+
+        engine.set_rules(rules)
+        log.info("Alert rules replaced: %s", ", ".join(names))
+        return jsonify({'success': True, 'rules': rules})
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
+
+
+@alerts_bp.route('/api/alerts/stream', methods=['GET'])
+@default_target_only
+def stream_alerts():
+    """Server-sent events: one 'alert' event per firing/resolved transition"""
+    engine = alerts.alert_engine
+    if engine is None:
+        return _engine_unavailable()
+
+    subscriber = engine.subscribe()
+
+    def events():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    alert = subscriber.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {alert['id']}\nevent: alert\ndata: {json.dumps(alert)}\n\n"
+        finally:
+            engine.unsubscribe(subscriber)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
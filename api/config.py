@@ -0,0 +1,137 @@
+from flask import Blueprint, jsonify, request, send_file
+from vpp_connection import get_vpp_for_request, current_target
+from config_apply import apply_config
+import config_snapshot
+import os
+import traceback
+import logging
+
+config_bp = Blueprint('config', __name__)
+log = logging.getLogger(__name__)
+
+
+@config_bp.route('/api/config/apply', methods=['POST'])
+def apply_desired_config():
+    """
+    Reconcile VPP with a desired-state document (see config_apply).
+    ?dry_run=1 only returns the planned changes.
+    """
+    try:
+        doc = request.get_json(silent=True)
+        if not isinstance(doc, dict):
+            return jsonify({'error': 'Expected a JSON desired-state document'}), 400
+
+        dry_run = request.args.get('dry_run', '0') not in ('', '0', 'false', 'no')
+
+        v = get_vpp_for_request()
+        if not v:
+            return jsonify({'error': 'Not connected to VPP'}), 500
+
+        result = apply_config(v, doc, dry_run=dry_run)
+        log.info("Config apply%s: %d change(s), %d error(s) in %.1fms",
+                 " (dry run)" if dry_run else "", len(result['changes']), result['errors'],
+                 result['timings_ms']['total'])
+        return jsonify(result), 200 if result['success'] else 500
+
+    except (ValueError, KeyError) as e:
+        return jsonify({'error': f'Invalid document: {e}'}), 400
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        log.error("Error in apply_desired_config: %s\n%s", e, error_trace)
+        return jsonify({'error': str(e), 'trace': error_trace}), 500
+
+
+@config_bp.route('/api/config/snapshot', methods=['POST'])
+def create_config_snapshot():
+    """Write the running configuration to a snapshot file. Optional JSON body: {"name": ...}."""
+    try:
+        data = request.get_json(silent=True) or {}
+
+        v = get_vpp_for_request()
+        if not v:
+            return jsonify({'error': 'Not connected to VPP'}), 500
+
+        info = config_snapshot.save_snapshot(v, name=data.get('name'))
+        log.info("Config snapshot %s: %d bytes in %.1fms", info['name'], info['bytes'], info['elapsed_ms'])
+        return jsonify(info), 201
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        log.error("Error in create_config_snapshot: %s\n%s", e, error_trace)
+        return jsonify({'error': str(e), 'trace': error_trace}), 500
+
+
+@config_bp.route('/api/config/snapshots', methods=['GET'])
+def list_config_snapshots():
+    """Saved snapshots of the request's VPP target, oldest first."""
+    try:
+        return jsonify({'snapshots': config_snapshot.list_snapshots(target=current_target())})
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        log.error("Error in list_config_snapshots: %s\n%s", e, error_trace)
+        return jsonify({'error': str(e), 'trace': error_trace}), 500
+
+
+@config_bp.route('/api/config/snapshot/<name>', methods=['GET'])
+def get_config_snapshot(name):
+    """Download a snapshot file, or ?format=json for the decoded document."""
+    try:
+        snapshot = config_snapshot.load_snapshot(name, target=current_target())
+        if request.args.get('format') == 'json':
+            return jsonify(snapshot)
+        path = config_snapshot.snapshot_path(name)
+        return send_file(os.path.abspath(path), mimetype='application/gzip', as_attachment=True,
+                         download_name=os.path.basename(path))
+
+    except FileNotFoundError:
+        return jsonify({'error': f'No snapshot {name!r}'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        log.error("Error in get_config_snapshot: %s\n%s", e, error_trace)
+        return jsonify({'error': str(e), 'trace': error_trace}), 500
+
+
+@config_bp.route('/api/config/restore', methods=['POST'])
+def restore_config_snapshot():
+    """
+    Restore a snapshot: an uploaded file (multipart "file"), {"name": ...}, or
+    the most recent saved snapshot. Saved snapshots are only restored onto the
+    VPP target they were taken from. ?dry_run=1 only returns the planned changes.
+    """
+    try:
+        dry_run = request.args.get('dry_run', '0') not in ('', '0', 'false', 'no')
+
+        upload = request.files.get('file')
+        if upload is not None:
+            snapshot = config_snapshot.parse_snapshot(upload.read())
+        else:
+            name = (request.get_json(silent=True) or {}).get('name')
+            if name is None:
+                saved = config_snapshot.list_snapshots(target=current_target())
+                if not saved:
+                    return jsonify({'error': 'No snapshots saved'}), 404
+                name = saved[-1]['name']
+            snapshot = config_snapshot.load_snapshot(name, target=current_target())
+
+        v = get_vpp_for_request()
+        if not v:
+            return jsonify({'error': 'Not connected to VPP'}), 500
+
+        result = config_snapshot.restore_snapshot(v, snapshot, dry_run=dry_run)
+        log.info("Config restore %s%s: %d change(s), %d error(s) in %.1fms", result['snapshot'],
+                 " (dry run)" if dry_run else "", len(result['changes']), result['errors'],
+                 result['timings_ms']['total'])
+        return jsonify(result), 200 if result['success'] else 500
+
+    except FileNotFoundError:
+        return jsonify({'error': 'No such snapshot'}), 404
+    except (ValueError, KeyError) as e:
+        return jsonify({'error': f'Invalid snapshot: {e}'}), 400
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        log.error("Error in restore_config_snapshot: %s\n%s", e, error_trace)
+        return jsonify({'error': str(e), 'trace': error_trace}), 500
@@ -1,8 +1,49 @@
 from flask import Blueprint, jsonify
 from vpp_connection import get_vpp_for_request
+from vpp_cache import cached_dump
 import logging
 
 dashboard_bp = Blueprint('dashboard', __name__)
+log = logging.getLogger(__name__)
+
+
+def dashboard_stats(v):
+    """Dashboard totals for one VPP connection (also fanned out over the fleet)."""
+    # Interfaces
+    interfaces = cached_dump(v, 'sw_interface_dump')
+    total_interfaces = len(interfaces)
+    active_interfaces = sum(1 for iface in interfaces if iface.flags & 1)
+
+    # Routes
+    total_routes = sum(len(cached_dump(v, 'ip_route_dump', table={'table_id': 0, 'is_ip6': is_ip6}))
+                       for is_ip6 in (0, 1))
+
+    # ACLs
+    acls = cached_dump(v, 'acl_dump', acl_index=0xffffffff)
+    total_acls = len(acls)
+
+    # NAT session count
+    nat_sessions = 0
+    try:
+        users = list(v.api.nat44_user_dump())
+        for user in users:
+            sessions = list(v.api.nat44_user_session_dump(
+                ip_address=user.ip_address,
+                vrf_id=user.vrf_id
+            ))
+            nat_sessions += len(sessions)
+            log.debug("NAT sessions counted so far: %d", nat_sessions)   # KEEP LOG
+    except Exception as e:
+        log.debug("NAT session count failed: %s", e)
+        pass
+
+    return {
+        'interfaces': {'total': total_interfaces, 'active': active_interfaces},
+        'routes': total_routes,
+        'acls': total_acls,
+        'nat_sessions': nat_sessions,
+        'uptime': get_system_uptime(v)
+    }
 
 
 @dashboard_bp.route('/api/dashboard/stats', methods=['GET'])
@@ -13,57 +54,20 @@ def get_dashboard_stats():
         if not v:
             return jsonify({'error': 'Not connected to VPP'}), 500
 
-        # Interfaces
-        interfaces = v.api.sw_interface_dump()
-        total_interfaces = len(interfaces)
-        active_interfaces = sum(1 for iface in interfaces if iface.flags & 1)
-
-        # Routes
-        routes = v.api.ip_route_dump(table={'table_id': 0, 'is_ip6': 0})
-        total_routes = len(routes)
-
-        # ACLs
-        acls = v.api.acl_dump(acl_index=0xffffffff)
-        total_acls = len(acls)
-
-        # NAT session count
-        nat_sessions = 0
-        try:
-            users = list(v.api.nat44_user_dump())
-            for user in users:
-                sessions = list(v.api.nat44_user_session_dump(
-                    ip_address=user.ip_address,
-                    vrf_id=user.vrf_id
-                ))
-                nat_sessions += len(sessions)
-                print(nat_sessions)   # KEEP LOG
-        except Exception as e:
-            logging.debug(f"NAT session count failed: {e}")
-            pass
-
-        return jsonify({
-            'interfaces': {'total': total_interfaces, 'active': active_interfaces},
-            'routes': total_routes,
-            'acls': total_acls,
-            'nat_sessions': nat_sessions,
-            'uptime': get_system_uptime()
-        })
+        return jsonify(dashboard_stats(v))
 
     except Exception as e:
-        logging.error(f"Dashboard stats error: {e}")
+        log.error("Dashboard stats error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
-def get_system_uptime():
+def get_system_uptime(v):
     """Get VPP uptime"""
     try:
-        v = get_vpp_for_request()
-        if v:
-            result = v.api.show_version()
-            if hasattr(result, 'uptime'):
-                return result.uptime
-            return "Running"
-        return "Disconnected"
+        result = v.api.show_version()
+        if hasattr(result, 'uptime'):
+            return result.uptime
+        return "Running"
     except Exception as e:
-        logging.debug(f"Uptime check failed: {e}")
+        log.debug("Uptime check failed: %s", e)
         return "Unknown"
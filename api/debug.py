@@ -0,0 +1,51 @@
+from flask import Blueprint, jsonify, request, current_app
+from vpp_trace import api_call_stats, VPP_TRACE, LATENCY_BUCKETS_MS
+import vpp_profile
+import vpp_watchdog
+from vpp_fleet import default_target_only
+
+debug_bp = Blueprint('debug', __name__)
+
+
+@debug_bp.route('/api/debug/apicalls', methods=['GET', 'DELETE'])
+def get_api_call_stats():
+    """Per-message VPP API call counts and latency histograms (VPP_TRACE=1)"""
+    if request.method == 'DELETE':
+        api_call_stats.reset()
+        return jsonify({'success': True})
+
+    return jsonify({
+        'enabled': VPP_TRACE,
+        'buckets_ms': list(LATENCY_BUCKETS_MS),
+        'messages': api_call_stats.snapshot()
+    })
+
+
+@debug_bp.route('/api/debug/profile', methods=['GET', 'DELETE'])
+def get_rolling_profile():
+    """Rolling stack samples for the profiled blueprints (VPP_PROFILE_SAMPLER=1)"""
+    sampler = vpp_profile.rolling_sampler
+    if sampler is None:
+        return jsonify({'error': 'Rolling sampler disabled (set VPP_PROFILE_SAMPLER=1)'}), 404
+
+    if request.method == 'DELETE':
+        sampler.reset()
+        return jsonify({'success': True})
+
+    samples = sampler.snapshot(request.args.get('blueprint'))
+    if request.args.get('format') == 'folded':
+        return current_app.response_class(samples.folded(), mimetype='text/plain')
+
+    result = samples.summary(sampler.interval)
+    result['blueprints'] = sorted(vpp_profile.VPP_PROFILE_BLUEPRINTS) or 'all'
+    result['window_s'] = sampler.window
+    return jsonify(result)
+
+
+@debug_bp.route('/api/debug/watchdog', methods=['GET'])
+@default_target_only
+def get_watchdog_status():
+    """VPP restart detection and restore times (VPP_WATCHDOG=1)"""
+    if not vpp_watchdog.vpp_watchdog.is_alive():
+        return jsonify({'enabled': False})
+    return jsonify(vpp_watchdog.vpp_watchdog.snapshot())
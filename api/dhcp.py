@@ -1,9 +1,12 @@
 from flask import Blueprint, jsonify, request
 from vpp_connection import get_vpp_for_request
-import ipaddress
+from vpp_records import DhcpLease, decode
+from vpp_address import format_address, parse_address, family
 import traceback
+import logging
 
 dhcp_bp = Blueprint('dhcp', __name__)
+log = logging.getLogger(__name__)
 
 
 # ============================================================================
@@ -47,41 +50,21 @@ def get_dhcp_clients():
         result = []
         for client_detail in v.api.dhcp_client_dump():
             client = client_detail.client
-            lease = client_detail.lease
-
-            # host address
-            if isinstance(lease.host_address, bytes):
-                host_addr = str(ipaddress.IPv4Address(lease.host_address))
-            else:
-                host_addr = str(lease.host_address)
-
-            # router address
-            if isinstance(lease.router_address, bytes):
-                router_addr = str(ipaddress.IPv4Address(lease.router_address))
-            else:
-                router_addr = str(lease.router_address)
+            lease = decode(DhcpLease, client_detail.lease)
 
             result.append({
                 'sw_if_index': int(client.sw_if_index),
                 'hostname': client.hostname,
                 'want_dhcp_event': bool(client.want_dhcp_event),
                 'set_broadcast_flag': bool(client.set_broadcast_flag),
-                'lease': {
-                    'sw_if_index': int(lease.sw_if_index),
-                    'state': int(lease.state),
-                    'is_ipv6': bool(lease.is_ipv6),
-                    'hostname': lease.hostname,
-                    'mask_width': int(lease.mask_width),
-                    'host_address': host_addr,
-                    'router_address': router_addr
-                }
+                'lease': lease.to_dict()
             })
 
         return jsonify(result)
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in get_dhcp_clients: {e}\n{error_trace}")
+        log.error("Error in get_dhcp_clients: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
 
 
@@ -102,7 +85,7 @@ def add_dhcp_client():
         if sw_if_index is None:
             return jsonify({'error': 'sw_if_index is required'}), 400
 
-        print(f"Adding DHCP client: sw_if_index={sw_if_index}, hostname={hostname}")
+        log.debug("Adding DHCP client: sw_if_index=%s, hostname=%s", sw_if_index, hostname)
 
         client_config = {
             'sw_if_index': int(sw_if_index),
@@ -127,7 +110,7 @@ def add_dhcp_client():
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in add_dhcp_client: {e}\n{error_trace}")
+        log.error("Error in add_dhcp_client: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
 
 
@@ -139,7 +122,7 @@ def remove_dhcp_client(sw_if_index):
         if not v:
             return jsonify({'error': 'Not connected to VPP'}), 500
 
-        print(f"Removing DHCP client: sw_if_index={sw_if_index}")
+        log.debug("Removing DHCP client: sw_if_index=%s", sw_if_index)
 
         client_config = {
             'sw_if_index': int(sw_if_index),
@@ -164,7 +147,7 @@ def remove_dhcp_client(sw_if_index):
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in remove_dhcp_client: {e}\n{error_trace}")
+        log.error("Error in remove_dhcp_client: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
 
 
@@ -181,23 +164,14 @@ def get_dhcp_proxies():
             return jsonify({'error': 'Not connected to VPP'}), 500
 
         result = []
-        for proxy in v.api.dhcp_proxy_dump(is_ip6=False):
-            if isinstance(proxy.dhcp_src_address, bytes):
-                src_addr = str(ipaddress.IPv4Address(proxy.dhcp_src_address))
-            else:
-                src_addr = str(proxy.dhcp_src_address)
-
+        proxies = list(v.api.dhcp_proxy_dump(is_ip6=False)) + list(v.api.dhcp_proxy_dump(is_ip6=True))
+        for proxy in proxies:
             servers = []
             for i in range(proxy.count):
                 server = proxy.servers[i]
-                if isinstance(server.dhcp_server, bytes):
-                    srv_addr = str(ipaddress.IPv4Address(server.dhcp_server))
-                else:
-                    srv_addr = str(server.dhcp_server)
-
                 servers.append({
                     'server_vrf_id': int(server.server_vrf_id),
-                    'dhcp_server': srv_addr
+                    'dhcp_server': format_address(server.dhcp_server)
                 })
 
             result.append({
@@ -207,7 +181,7 @@ def get_dhcp_proxies():
                 'vss_oui': int(proxy.vss_oui),
                 'vss_fib_id': int(proxy.vss_fib_id),
                 'is_ipv6': bool(proxy.is_ipv6),
-                'dhcp_src_address': src_addr,
+                'dhcp_src_address': format_address(proxy.dhcp_src_address),
                 'servers': servers
             })
 
@@ -215,7 +189,7 @@ def get_dhcp_proxies():
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in get_dhcp_proxies: {e}\n{error_trace}")
+        log.error("Error in get_dhcp_proxies: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
 
 
@@ -235,22 +209,24 @@ def add_dhcp_proxy():
 
         if not dhcp_server or not dhcp_src_address:
             return jsonify({'error': 'dhcp_server and dhcp_src_address are required'}), 400
+        if family(dhcp_server) != family(dhcp_src_address):
+            return jsonify({'error': 'dhcp_server and dhcp_src_address must be the same address family'}), 400
 
         v.api.dhcp_proxy_config(
             rx_vrf_id=int(rx_vrf_id),
             server_vrf_id=int(server_vrf_id),
             is_add=True,
-            dhcp_server=ipaddress.IPv4Address(dhcp_server),
-            dhcp_src_address=ipaddress.IPv4Address(dhcp_src_address)
+            dhcp_server=parse_address(dhcp_server),
+            dhcp_src_address=parse_address(dhcp_src_address)
         )
 
-        print(f"DHCP proxy added successfully")
+        log.debug("DHCP proxy added successfully")
 
         return jsonify({'success': True, 'message': 'DHCP proxy added successfully'})
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in add_dhcp_proxy: {e}\n{error_trace}")
+        log.error("Error in add_dhcp_proxy: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
 
 
@@ -270,16 +246,18 @@ def remove_dhcp_proxy():
 
         if not dhcp_server or not dhcp_src_address:
             return jsonify({'error': 'dhcp_server and dhcp_src_address are required'}), 400
+        if family(dhcp_server) != family(dhcp_src_address):
+            return jsonify({'error': 'dhcp_server and dhcp_src_address must be the same address family'}), 400
 
-        print(f"Removing DHCP proxy: rx_vrf={rx_vrf_id}, server={dhcp_server}")
+        log.debug("Removing DHCP proxy: rx_vrf=%s, server=%s", rx_vrf_id, dhcp_server)
 
 
         v.api.dhcp_proxy_config(
             rx_vrf_id=int(rx_vrf_id),
             server_vrf_id=int(server_vrf_id),
             is_add=False,
-            dhcp_server=ipaddress.IPv4Address(dhcp_server),
-            dhcp_src_address=ipaddress.IPv4Address(dhcp_src_address)
+            dhcp_server=parse_address(dhcp_server),
+            dhcp_src_address=parse_address(dhcp_src_address)
         )
 
         return jsonify({'success': True, 'message': 'DHCP proxy removed successfully'})
@@ -308,7 +286,7 @@ def set_dhcp_vss():
         vpn_index = data.get('vpn_index', 0)
         is_ipv6 = data.get('is_ipv6', False)
 
-        print(f"Setting DHCP VSS: tbl_id={tbl_id}, vss_type={vss_type}")
+        log.debug("Setting DHCP VSS: tbl_id=%s, vss_type=%s", tbl_id, vss_type)
 
         v.api.dhcp_proxy_set_vss(
             tbl_id=int(tbl_id),
@@ -324,7 +302,7 @@ def set_dhcp_vss():
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in set_dhcp_vss: {e}\n{error_trace}")
+        log.error("Error in set_dhcp_vss: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
 
 
@@ -340,7 +318,7 @@ def unset_dhcp_vss():
         tbl_id = data.get('tbl_id', 0)
         is_ipv6 = data.get('is_ipv6', False)
 
-        print(f"Unsetting DHCP VSS: tbl_id={tbl_id}")
+        log.debug("Unsetting DHCP VSS: tbl_id=%s", tbl_id)
 
         v.api.dhcp_proxy_set_vss(
             tbl_id=int(tbl_id),
@@ -352,7 +330,7 @@ def unset_dhcp_vss():
             is_add=False
         )
 
-        print(f"DHCP VSS unset successfully")
+        log.debug("DHCP VSS unset successfully")
 
         return jsonify({'success': True, 'message': 'DHCP VSS unset successfully'})
 
@@ -377,7 +355,7 @@ def enable_dhcpv6():
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in enable_dhcpv6: {e}\n{error_trace}")
+        log.error("Error in enable_dhcpv6: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
 
 
@@ -462,5 +440,5 @@ def disable_dhcp_detect(sw_if_index):
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in disable_dhcp_detect: {e}\n{error_trace}")
+        log.error("Error in disable_dhcp_detect: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
@@ -0,0 +1,114 @@
+from flask import Blueprint, jsonify, request
+from vpp_connection import (
+    VppTarget, target_pool, targets, register_target, unregister_target, get_target
+)
+from vpp_fleet import fan_out
+from api.dashboard import dashboard_stats
+import traceback
+import logging
+
+fleet_bp = Blueprint('fleet', __name__)
+log = logging.getLogger(__name__)
+
+
+def _selected_targets():
+    """?targets=a,b limits a fan-out query; all targets by default."""
+    names = request.args.get('targets')
+    return [n for n in names.split(',') if n] if names else None
+
+
+def _timeout_arg():
+    timeout = request.args.get('timeout')
+    return float(timeout) if timeout else None
+
+
+def _ping(v):
+    reply = v.api.control_ping()
+    return {'vpe_pid': getattr(reply, 'vpe_pid', None)}
+
+
+@fleet_bp.route('/api/fleet/targets', methods=['GET'])
+def get_fleet_targets():
+    """Registered VPP targets with their connection pool stats; ?health=1 pings them all"""
+    try:
+        result = []
+        for target in targets():
+            entry = target.to_dict()
+            entry['pool'] = target_pool(target.name).stats()
+            result.append(entry)
+
+        if request.args.get('health', '0') not in ('', '0', 'false', 'no'):
+            health = fan_out(_ping, timeout=_timeout_arg())
+            for entry in result:
+                entry['health'] = health.get(entry['name'])
+
+        return jsonify(result)
+
+    except Exception as e:
+        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
+
+
+@fleet_bp.route('/api/fleet/targets', methods=['POST'])
+def add_fleet_target():
+    """Register (or replace) a VPP target: {"name", "api_socket", "stats_socket", "timeout"}"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Missing JSON payload'}), 400
+
+        replaced = get_target(data.get('name')) is not None
+        target = register_target(VppTarget.from_dict(data))
+        log.info("Fleet target %s %s (%s)", target.name, "replaced" if replaced else "added", target.api_socket)
+        return jsonify(target.to_dict()), (200 if replaced else 201)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
+
+
+@fleet_bp.route('/api/fleet/targets/<name>', methods=['DELETE'])
+def remove_fleet_target(name):
+    """Unregister a VPP target and close its pooled connections"""
+    try:
+        if unregister_target(name) is None:
+            return jsonify({'error': f'Unknown VPP target {name!r}'}), 404
+        log.info("Fleet target %s removed", name)
+        return jsonify({'success': True, 'name': name})
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
+
+
+@fleet_bp.route('/api/fleet/dashboard', methods=['GET'])
+def get_fleet_dashboard():
+    """
+    Dashboard stats of every target (or ?targets=a,b), queried concurrently,
+    plus totals over the targets that answered within their timeout.
+    """
+    try:
+        results = fan_out(dashboard_stats, _selected_targets(), _timeout_arg())
+
+        totals = {'interfaces': {'total': 0, 'active': 0}, 'routes': 0, 'acls': 0, 'nat_sessions': 0}
+        for entry in results.values():
+            if not entry['ok']:
+                continue
+            stats = entry['result']
+            totals['interfaces']['total'] += stats['interfaces']['total']
+            totals['interfaces']['active'] += stats['interfaces']['active']
+            for key in ('routes', 'acls', 'nat_sessions'):
+                totals[key] += stats[key]
+
+        return jsonify({
+            'targets': results,
+            'totals': totals,
+            'answered': sum(1 for entry in results.values() if entry['ok']),
+            'failed': sorted(name for name, entry in results.items() if not entry['ok'])
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
@@ -1,10 +1,25 @@
 from flask import Blueprint, jsonify, request
-from vpp_connection import get_vpp_for_request
+from vpp_connection import get_vpp_for_request, current_target
+from vpp_cache import cached_dump, invalidate_on_write, config_cache
+from json_provider import table_response
+from binary_formats import (
+    negotiate_format, columns_response, sum_thread_counters, as_list,
+    INTERFACE_COUNTER_SCHEMA, INTERFACE_HISTORY_SCHEMA
+)
+from counter_store import counter_store, counter_recorder, VPP_COUNTER_STORE
+from top_talkers import sample_top_talkers, snapshots_for, METRICS, DIRECTIONS, MAX_WINDOW
+from config_apply import Change, ApiWorkers, execute, VPP_CONFIG_WORKERS
+from vpp_address import format_prefix, encode_prefix, family
+from vpp_fleet import default_target_only
+import fnmatch
+import time
 import traceback
 import logging
 import ipaddress
 
 interfaces_bp = Blueprint('interfaces', __name__)
+log = logging.getLogger(__name__)
+invalidate_on_write(interfaces_bp, 'sw_interface_dump', 'ip_address_dump', 'ip_route_dump')
 
 # -------- Get interface list --------
 @interfaces_bp.route('/api/interfaces', methods=['GET'])
@@ -15,29 +30,18 @@ def get_interfaces():
         if not v:
             return jsonify({'error': 'Not connected to VPP'}), 500
 
-        interfaces = v.api.sw_interface_dump()
+        interfaces = cached_dump(v, 'sw_interface_dump')
         result = []
 
         for iface in interfaces:
-            # Get IP addresses
+            # Get IP addresses (IPv4 then IPv6)
             ip_addrs = []
             try:
-                addrs = v.api.ip_address_dump(sw_if_index=iface.sw_if_index)
-                for addr in addrs:
-                    # prefix.address.af == 0 → IPv4
-                    if hasattr(addr, "prefix") and hasattr(addr.prefix, "address"):
-                        prefix = addr.prefix
-                        if prefix.address.af == 0:  # IPv4
-                            ip = ipaddress.IPv4Address(prefix.address.un.ip4)
-                            ip_addrs.append(f"{ip}/{prefix.len}")
-                    else:
-                        # fallback string
-                        try:
-                            ip_addrs.append(str(addr.prefix))
-                        except:
-                            pass
+                for is_ipv6 in (False, True):
+                    addrs = cached_dump(v, 'ip_address_dump', sw_if_index=iface.sw_if_index, is_ipv6=is_ipv6)
+                    ip_addrs.extend(format_prefix(addr.prefix) for addr in addrs)
             except Exception as e:
-                print(f"Error getting IPs for interface {iface.sw_if_index}: {e}")
+                log.error("Error getting IPs for interface %s: %s", iface.sw_if_index, e)
 
             result.append({
                 'sw_if_index': iface.sw_if_index,
@@ -47,12 +51,11 @@ def get_interfaces():
                 'ip_addresses': ip_addrs
             })
 
-        return jsonify(result)
+        return table_response(result)
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in get_interfaces: {e}")
-        print(error_trace)
+        log.error("Error in get_interfaces: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': error_trace}), 500
 
 
@@ -85,20 +88,17 @@ def manage_interface_ip(sw_if_index):
 
         data = request.json
         ip_addr = data.get('ip')
-        prefix_len = int(data.get('prefix_len', 24))
-
-        ip_packed = ipaddress.IPv4Address(ip_addr).packed
+        # IPv4 or IPv6; the default prefix length follows the family
+        prefix_len = int(data.get('prefix_len', 64 if family(ip_addr) == 6 else 24))
         is_add = 1 if request.method == 'POST' else 0
 
         v.api.sw_interface_add_del_address(
             sw_if_index=sw_if_index,
             is_add=is_add,
-            prefix={
-                "address": {"af": 0, "un": {"ip4": ip_packed}},
-                "len": prefix_len
-            },
+            prefix=encode_prefix(f"{ip_addr}/{prefix_len}"),
             del_all=0
         )
+        config_cache.invalidate('routes')
 
         action = 'added' if is_add else 'removed'
         return jsonify({'success': True, 'message': f'IP {action}'})
@@ -106,6 +106,190 @@ def manage_interface_ip(sw_if_index):
         return jsonify({'error': str(e)}), 500
 
 
+def _parse_index_range(spec):
+    """Inclusive (first, last) from "10-20", [10, 20] or 10."""
+    if isinstance(spec, (list, tuple)):
+        first, last = spec
+    elif isinstance(spec, str) and '-' in spec:
+        first, last = spec.split('-', 1)
+    else:
+        first = last = spec
+    return int(first), int(last)
+
+
+def select_interfaces(interfaces, selector):
+    """
+    Interfaces matching a selector; every given key must match:
+      names:      exact names          sw_if_index: list of indexes
+      glob:       fnmatch on the name  range:       "first-last" sw_if_index range
+    """
+    allowed = {'names', 'sw_if_index', 'glob', 'range'}
+    unknown = set(selector) - allowed
+    if unknown:
+        raise ValueError(f"unknown selector keys: {', '.join(sorted(unknown))}")
+    if not selector:
+        raise ValueError("empty selector")
+
+    names = set(selector.get('names', ())) if 'names' in selector else None
+    indexes = {int(i) for i in selector['sw_if_index']} if 'sw_if_index' in selector else None
+    glob = selector.get('glob')
+    first, last = _parse_index_range(selector['range']) if 'range' in selector else (None, None)
+
+    result = []
+    for iface in interfaces:
+        i = int(iface.sw_if_index)
+        if names is not None and iface.interface_name not in names:
+            continue
+        if indexes is not None and i not in indexes:
+            continue
+        if glob is not None and not fnmatch.fnmatchcase(iface.interface_name, glob):
+            continue
+        if first is not None and not first <= i <= last:
+            continue
+        result.append(iface)
+    return result
+
+
+def _bulk_cidr(entry):
+    """Normalized CIDR string from "10.0.0.1/24", "2001:db8::1/64" or {"ip": ..., "prefix_len": ...}."""
+    if isinstance(entry, dict):
+        default_len = 64 if family(entry['ip']) == 6 else 24
+        entry = f"{entry['ip']}/{int(entry.get('prefix_len', default_len))}"
+    return str(ipaddress.ip_interface(entry))
+
+
+def plan_bulk_changes(interfaces, data):
+    """
+    Changes for a bulk request: "select" + "up" sets admin state on every
+    match; "items" are per-interface {"name"|"sw_if_index", "up", "add",
+    "remove"} with add/remove lists of addresses.
+    """
+    by_name = {iface.interface_name: iface for iface in interfaces}
+    by_index = {int(iface.sw_if_index): iface for iface in interfaces}
+
+    changes = []
+
+    def set_flags(iface, up):
+        changes.append(Change('interfaces', 'up' if up else 'down', iface.interface_name,
+                              'sw_interface_set_flags',
+                              {'sw_if_index': int(iface.sw_if_index), 'flags': 1 if up else 0}))
+
+    def address(iface, cidr, is_add):
+        changes.append(Change('addresses_add' if is_add else 'addresses_del', 'add' if is_add else 'delete',
+                              f"{iface.interface_name} {cidr}", 'sw_interface_add_del_address',
+                              {'sw_if_index': int(iface.sw_if_index), 'is_add': is_add, 'del_all': 0,
+                               'prefix': encode_prefix(cidr)}))
+
+    matched = []
+    if 'select' in data:
+        if 'up' not in data:
+            raise ValueError('"select" needs "up"')
+        matched = select_interfaces(interfaces, data['select'])
+        for iface in matched:
+            set_flags(iface, bool(data['up']))
+
+    for item in data.get('items', []):
+        if 'sw_if_index' in item:
+            iface = by_index.get(int(item['sw_if_index']))
+        else:
+            iface = by_name.get(item.get('name'))
+        if iface is None:
+            raise ValueError(f"unknown interface {item.get('name', item.get('sw_if_index'))!r}")
+        if 'up' in item:
+            set_flags(iface, bool(item['up']))
+        for entry in item.get('remove', []):
+            address(iface, _bulk_cidr(entry), 0)
+        for entry in item.get('add', []):
+            address(iface, _bulk_cidr(entry), 1)
+
+    return matched, changes
+
+
+@interfaces_bp.route('/api/interfaces/bulk', methods=['POST'])
+def bulk_interfaces():
+    """
+    Admin state and address changes for many interfaces in one request.
+    Calls run in batches over a few worker connections (see config_apply);
+    ?dry_run=1 only lists them.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not ('select' in data or 'items' in data):
+            return jsonify({'error': 'Expected {"select": ..., "up": ...} and/or {"items": [...]}'}), 400
+        dry_run = request.args.get('dry_run', '0') not in ('', '0', 'false', 'no')
+
+        started = time.perf_counter()
+        v = get_vpp_for_request()
+        if not v:
+            return jsonify({'error': 'Not connected to VPP'}), 500
+
+        interfaces = cached_dump(v, 'sw_interface_dump')
+        matched, changes = plan_bulk_changes(interfaces, data)
+
+        if dry_run:
+            results, phase_ms = [c.describe() for c in changes], {}
+        else:
+            with ApiWorkers(v, VPP_CONFIG_WORKERS) as workers:
+                results, phase_ms = execute(workers, changes, stop_on_error=False)
+            if any(c.msg == 'sw_interface_add_del_address' for c in changes):
+                config_cache.invalidate('routes')
+
+        errors = sum(1 for r in results if r.get('status') == 'error')
+        elapsed_ms = round((time.perf_counter() - started) * 1000.0, 3)
+        log.info("Bulk interface request: %d call(s), %d error(s) in %.1fms", len(changes), errors, elapsed_ms)
+
+        return jsonify({
+            'dry_run': dry_run,
+            'success': not errors,
+            'matched': [iface.interface_name for iface in matched],
+            'results': results,
+            'errors': errors,
+            'elapsed_ms': elapsed_ms,
+            'phases_ms': phase_ms,
+        }), 200 if not errors else 207
+
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        log.error("Error in bulk_interfaces: %s\n%s", e, error_trace)
+        return jsonify({'error': str(e), 'trace': error_trace}), 500
+
+
+
+def collect_interface_counters(v):
+    """
+    Read per-interface rx/tx/drop totals from the stats segment as columns
+    (name plus one summed counter vector per field).
+    """
+    # --- fetch available counters (try/except to avoid KeyError) ---
+    try:
+        stats_names = v.vpp_stats.get_counter("/if/names")
+    except Exception:
+        stats_names = []
+
+    def safe_get(path):
+        try:
+            return v.vpp_stats.get_counter(path)
+        except Exception:
+            log.debug("counter %s not available", path)
+            return None
+
+    stats_rx = safe_get("/if/rx")
+    stats_tx = safe_get("/if/tx")
+    stats_drops = safe_get("/if/drops")
+
+    n = len(stats_names) if stats_names else 0
+
+    return {
+        "name": list(stats_names[:n]) if n else [],
+        "rx_bytes": sum_thread_counters(stats_rx, n, "bytes"),
+        "tx_bytes": sum_thread_counters(stats_tx, n, "bytes"),
+        "rx_packets": sum_thread_counters(stats_rx, n, "packets"),
+        "tx_packets": sum_thread_counters(stats_tx, n, "packets"),
+        "drops": sum_thread_counters(stats_drops, n)
+    }
+
 
 @interfaces_bp.route("/api/interfaces/stats", methods=["GET"])
 def get_interface_stats_binary():
@@ -114,54 +298,109 @@ def get_interface_stats_binary():
         if not v:
             return jsonify({"error": "Not connected to VPP"}), 500
 
-        # --- fetch available counters (try/except to avoid KeyError) ---
-        try:
-            stats_names = v.vpp_stats.get_counter("/if/names")
-        except Exception:
-            stats_names = []
+        columns = collect_interface_counters(v)
 
-        def safe_get(path):
-            try:
-                return v.vpp_stats.get_counter(path)
-            except Exception:
-                print(f"counter {path} not available")
-                return None
+        fmt = negotiate_format()
+        if fmt != "json":
+            return columns_response(fmt, columns, INTERFACE_COUNTER_SCHEMA)
 
-        stats_rx = safe_get("/if/rx")
-        stats_tx = safe_get("/if/tx")
-        stats_drops = safe_get("/if/drops")
+        names = columns["name"]
+        rx_bytes = as_list(columns["rx_bytes"])
+        tx_bytes = as_list(columns["tx_bytes"])
+        rx_packets = as_list(columns["rx_packets"])
+        tx_packets = as_list(columns["tx_packets"])
+        drops = as_list(columns["drops"])
 
         interfaces = []
-        n = len(stats_names) if stats_names else 0
-
-        for i in range(n):
-            rx_bytes = 0
-            rx_packets = 0
-            tx_bytes = 0
-            tx_packets = 0
-            drops_total = 0
-
-            for th in stats_rx or []:
-                rx_bytes += th[i]["bytes"]
-                rx_packets += th[i]["packets"]
-            for th in stats_tx or []:
-                tx_bytes += th[i]["bytes"]
-                tx_packets += th[i]["packets"]
-            for th in stats_drops or []:
-                drops_total += th[i]
-
+        for i in range(len(names)):
             interfaces.append({
-                "name": stats_names[i],
-                "rx_bytes": int(rx_bytes),
-                "tx_bytes": int(tx_bytes),
-                "rx_packets": int(rx_packets),
-                "tx_packets": int(tx_packets),
-                "drops": int(drops_total)
+                "name": names[i],
+                "rx_bytes": int(rx_bytes[i]),
+                "tx_bytes": int(tx_bytes[i]),
+                "rx_packets": int(rx_packets[i]),
+                "tx_packets": int(tx_packets[i]),
+                "drops": int(drops[i])
             })
 
-        return jsonify(interfaces)
+        return table_response(interfaces)
+
+    except Exception as e:
+        log.exception("Exception occurred in get_interface_stats_binary:")
+        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+
+
+@interfaces_bp.route("/api/interfaces/history", methods=["GET"])
+@default_target_only
+def get_interface_history():
+    """
+    Recorded counter history (VPP_COUNTER_STORE=1).
+    Without ?name= lists the recorded interfaces; with it returns the
+    cumulative counters between ?start= and ?end= (unix seconds, default
+    the last hour) from ?tier=1s|1m|1h, or the finest tier that fits.
+    """
+    try:
+        name = request.args.get("name")
+        if not name:
+            return jsonify({
+                "enabled": VPP_COUNTER_STORE,
+                "interval": counter_recorder.interval,
+                "last_error": counter_recorder.last_error,
+                "tiers": [{"name": t, "step": step, "capacity": cap} for t, step, cap in counter_store.tiers],
+                "interfaces": counter_store.interfaces()
+            })
+
+        end = int(request.args.get("end", time.time()))
+        start = int(request.args.get("start", end - 3600))
+        result = counter_store.query(name, start, end, request.args.get("tier"))
+        if result is None:
+            return jsonify({"error": f"No history recorded for {name}"}), 404
+        tier, step, columns = result
+
+        fmt = negotiate_format()
+        if fmt != "json":
+            return columns_response(fmt, columns, INTERFACE_HISTORY_SCHEMA)
+
+        return jsonify({
+            "interface": name,
+            "tier": tier,
+            "step": step,
+            "count": len(columns["ts"]),
+            "columns": {field: as_list(col) for field, col in columns.items()}
+        })
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.exception("Exception occurred in get_interface_history:")
+        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+
+
+@interfaces_bp.route("/api/interfaces/top", methods=["GET"])
+def get_top_talkers():
+    """
+    Top ?k= interfaces by ?metric=bps|pps|drops (?direction=both|rx|tx)
+    over the last ?window= seconds, plus an "other" aggregate.
+    """
+    try:
+        metric = request.args.get("metric", "bps")
+        direction = request.args.get("direction", "both")
+        if metric not in METRICS:
+            return jsonify({"error": f"metric must be one of {', '.join(METRICS)}"}), 400
+        if direction not in DIRECTIONS:
+            return jsonify({"error": f"direction must be one of {', '.join(DIRECTIONS)}"}), 400
+        k = max(int(request.args.get("k", 10)), 0)
+        window = min(max(float(request.args.get("window", 10)), 0.1), MAX_WINDOW)
+
+        v = get_vpp_for_request()
+        if not v:
+            return jsonify({"error": "Not connected to VPP"}), 500
+
+        snapshots = snapshots_for(current_target())
+        return jsonify(sample_top_talkers(lambda: collect_interface_counters(v), snapshots,
+                                          metric, k, window, direction))
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print("Exception occurred in get_interface_stats_binary:")
-        traceback.print_exc()
+        log.exception("Exception occurred in get_top_talkers:")
         return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
@@ -1,9 +1,41 @@
 from flask import Blueprint, jsonify, request
 from vpp_connection import get_vpp_for_request
+from vpp_cache import cached_dump, invalidate_on_write, config_cache, cached_view, view_response
+from json_provider import table_response, to_columnar
+from binary_formats import negotiate_format, columns_response, NAT_SESSION_SCHEMA
+from vpp_records import Session, StaticMapping, NatAddress, decode_all
+from nat_index import nat_indexer, ip_to_int
+from nat_export import nat_exporter, list_exports, read_footer, query_export, export_path, FILE_SUFFIX
+from vpp_address import parse_ip4
+from vpp_fleet import default_target_only
+from api.routes import known_table
 import ipaddress
+import os
+import time
 import traceback
+import logging
 
 nat_bp = Blueprint('nat', __name__)
+log = logging.getLogger(__name__)
+invalidate_on_write(nat_bp, 'nat44_interface_dump', 'nat44_address_dump', 'nat44_static_mapping_dump')
+
+
+def _vrf_arg():
+    """?vrf_id= filter for the pool / static mapping listings; None lists every VRF."""
+    vrf_id = request.args.get('vrf_id')
+    return None if vrf_id in (None, '', 'all') else int(vrf_id)
+
+
+def _vrf_view(resource, vrf_id):
+    return resource if vrf_id is None else f'{resource}:{vrf_id}'
+
+
+def _cacheable_view(v, resource, vrf_id):
+    """
+    The view to cache a ?vrf_id= listing under, or None to answer it
+    uncached: only VRFs VPP has get a config cache version.
+    """
+    return resource if vrf_id is None or known_table(v, vrf_id) else None
 
 
 @nat_bp.route('/api/nat/plugin', methods=['GET'])
@@ -16,8 +48,8 @@ def get_nat_plugin_status():
 
         # Query actual runtime config
         cfg = v.api.nat44_show_running_config()
-        interfaces = list(v.api.nat44_interface_dump())
-        addresses = list(v.api.nat44_address_dump())
+        interfaces = cached_dump(v, 'nat44_interface_dump')
+        addresses = cached_dump(v, 'nat44_address_dump')
         nat_active = bool(interfaces or addresses)  # True if NAT is actively forwarding
 
         plugin_loaded = True if getattr(cfg, "sessions", 0) != 0 else False
@@ -45,6 +77,7 @@ def enable_nat():
 
         # Enable NAT44
         v.api.nat44_ed_plugin_enable_disable(enable=True)
+        config_cache.invalidate('nat_interfaces', 'nat_addresses', 'nat_static')
 
         return jsonify({
             'success': True,
@@ -65,6 +98,7 @@ def disable_nat():
 
         # Disable NAT44
         v.api.nat44_ed_plugin_enable_disable(enable=False)
+        config_cache.invalidate('nat_interfaces', 'nat_addresses', 'nat_static')
 
         return jsonify({
             'success': True,
@@ -79,12 +113,17 @@ def disable_nat():
 def get_nat_interfaces():
     """Get all NAT-configured interfaces"""
     try:
+        cached = cached_view('nat_interfaces')
+        if cached is not None:
+            return cached
+
+        version = config_cache.version('nat_interfaces')
         v = get_vpp_for_request()
         if not v:
             return jsonify({'error': 'Not connected to VPP'}), 500
 
         result = []
-        for nat_if in v.api.nat44_interface_dump():
+        for nat_if in cached_dump(v, 'nat44_interface_dump'):
             # bitmasks: NAT44_EI_IF_INSIDE = 0x20, NAT44_EI_IF_OUTSIDE = 0x10
             result.append({
                 'sw_if_index': int(nat_if.sw_if_index),
@@ -93,11 +132,11 @@ def get_nat_interfaces():
                 'is_outside': bool(nat_if.flags & 0x10)
             })
 
-        return jsonify(result)
+        return view_response('nat_interfaces', version, result)
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in get_nat_interfaces: {e}\n{error_trace}")
+        log.error("Error in get_nat_interfaces: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': error_trace}), 500
 
 
@@ -123,7 +162,7 @@ def configure_nat_interface(sw_if_index):
         # Optional: additional features (keep as before)
         flags |= 0x02  # NAT44_EI_CONNECTION_TRACKING
 
-        print(f"Configuring NAT: sw_if_index={sw_if_index}, is_inside={is_inside}, flags={flags}, is_add={is_add}")
+        log.debug("Configuring NAT: sw_if_index=%s, is_inside=%s, flags=%s, is_add=%s", sw_if_index, is_inside, flags, is_add)
 
         # Apply NAT configuration
         v.api.nat44_interface_add_del_feature(
@@ -131,10 +170,11 @@ def configure_nat_interface(sw_if_index):
             is_add=is_add,
             flags=flags
         )
+        config_cache.invalidate('nat_interfaces')
 
         action = 'configured' if is_add else 'removed'
         direction = 'inside' if is_inside else 'outside'
-        print(f"NAT interface {action}: sw_if_index={sw_if_index}, direction={direction}")
+        log.debug("NAT interface %s: sw_if_index=%s, direction=%s", action, sw_if_index, direction)
 
         # Verify the configuration
         verification = []
@@ -146,7 +186,7 @@ def configure_nat_interface(sw_if_index):
                     'is_inside': bool(nat_if.flags & 0x20),
                     'is_outside': bool(nat_if.flags & 0x10)
                 })
-        print(f"Verification: {verification}")
+        log.debug("Verification: %s", verification)
 
         return jsonify({
             'success': True,
@@ -158,36 +198,39 @@ def configure_nat_interface(sw_if_index):
         })
 
     except Exception as e:
-        print(f"Error in configure_nat_interface: {e}\n{traceback.format_exc()}")
+        log.error("Error in configure_nat_interface: %s\n%s", e, traceback.format_exc())
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
 
 
 @nat_bp.route('/api/nat/addresses', methods=['GET'])
 def get_nat_addresses():
-    """Get all NAT address pool entries"""
+    """Get NAT address pool entries, optionally of one VRF (?vrf_id=N)"""
     try:
+        vrf_id = _vrf_arg()
+        resource = _vrf_view('nat_addresses', vrf_id)
+        cached = cached_view(resource)
+        if cached is not None:
+            return cached
+
         v = get_vpp_for_request()
         if not v:
             return jsonify({'error': 'Not connected to VPP'}), 500
+        resource = _cacheable_view(v, resource, vrf_id)
+        version = config_cache.version(resource) if resource else None
 
-        result = []
-        for addr in v.api.nat44_address_dump():
-            # addr.ip_address may be bytes or an object — handle both
-            if isinstance(getattr(addr, "ip_address", None), (bytes, bytearray)):
-                ip_str = str(ipaddress.IPv4Address(addr.ip_address))
-            else:
-                ip_str = str(getattr(addr, "ip_address", addr))
-
-            result.append({
-                'ip_address': ip_str,
-                'vrf_id': int(getattr(addr, "vrf_id", 0))
-            })
+        # addr.ip_address may be bytes or an object — the decoder handles both
+        result = [a.to_dict() for a in decode_all(NatAddress, cached_dump(v, 'nat44_address_dump'))
+                  if vrf_id is None or a.vrf_id == vrf_id]
 
-        return jsonify(result)
+        if resource is None:
+            return table_response(result)
+        return view_response(resource, version, result)
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in get_nat_addresses: {e}\n{error_trace}")
+        log.error("Error in get_nat_addresses: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': error_trace}), 500
 
 
@@ -205,32 +248,36 @@ def add_nat_address():
         if not ip_address:
             return jsonify({'error': 'IP address is required'}), 400
 
-        print(f"Adding NAT address: {ip_address}")
+        ip_obj = parse_ip4(ip_address)
+        vrf_id = int(data.get('vrf_id', 0))
 
-        ip_obj = ipaddress.IPv4Address(ip_address)
+        log.debug("Adding NAT address: %s (vrf %s)", ip_address, vrf_id)
 
         v.api.nat44_add_del_address_range(
             first_ip_address=ip_obj,
             last_ip_address=ip_obj,
-            vrf_id=0,
+            vrf_id=vrf_id,
             is_add=1,
             flags=0
         )
+        config_cache.invalidate('nat_addresses')
 
-        print(f"NAT address added successfully: {ip_address}")
+        log.debug("NAT address added successfully: %s", ip_address)
 
-        addresses = list(v.api.nat44_address_dump())
-        print(f"Current NAT addresses: {len(addresses)}")
+        if log.isEnabledFor(logging.DEBUG):
+            addresses = list(v.api.nat44_address_dump())
+            log.debug("Current NAT addresses: %s", len(addresses))
 
         return jsonify({
             'success': True,
             'message': 'NAT address added successfully',
-            'ip_address': ip_address
+            'ip_address': ip_address,
+            'vrf_id': vrf_id
         })
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in add_nat_address: {e}\n{error_trace}")
+        log.error("Error in add_nat_address: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': error_trace}), 500
 
 
@@ -248,29 +295,32 @@ def remove_nat_address():
         if not ip_address:
             return jsonify({'error': 'IP address is required'}), 400
 
-        print(f"Removing NAT address: {ip_address}")
+        ip_obj = parse_ip4(ip_address)
+        vrf_id = int(data.get('vrf_id', 0))
 
-        ip_obj = ipaddress.IPv4Address(ip_address)
+        log.debug("Removing NAT address: %s (vrf %s)", ip_address, vrf_id)
 
         v.api.nat44_add_del_address_range(
             first_ip_address=ip_obj,
             last_ip_address=ip_obj,
-            vrf_id=0,
+            vrf_id=vrf_id,
             is_add=0,
             flags=0
         )
+        config_cache.invalidate('nat_addresses')
 
-        print(f"NAT address removed successfully: {ip_address}")
+        log.debug("NAT address removed successfully: %s", ip_address)
 
         return jsonify({
             'success': True,
             'message': 'NAT address removed successfully',
-            'ip_address': ip_address
+            'ip_address': ip_address,
+            'vrf_id': vrf_id
         })
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in remove_nat_address: {e}\n{error_trace}")
+        log.error("Error in remove_nat_address: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': error_trace}), 500
 
 
@@ -286,73 +336,218 @@ def get_nat_sessions():
 
         try:
             for user in v.api.nat44_user_dump():
-                for session in v.api.nat44_user_session_dump(
+                sessions = v.api.nat44_user_session_dump(
                     ip_address=user.ip_address,
                     vrf_id=user.vrf_id
-                ):
-                    if isinstance(getattr(session, "inside_ip_address", None), (bytes, bytearray)):
-                        inside_ip = str(ipaddress.IPv4Address(session.inside_ip_address))
-                    else:
-                        inside_ip = str(getattr(session, "inside_ip_address", session))
-
-                    if isinstance(getattr(session, "outside_ip_address", None), (bytes, bytearray)):
-                        outside_ip = str(ipaddress.IPv4Address(session.outside_ip_address))
-                    else:
-                        outside_ip = str(getattr(session, "outside_ip_address", session))
-
-                    result.append({
-                        'inside_ip': inside_ip,
-                        'inside_port': int(getattr(session, "inside_port", 0)),
-                        'outside_ip': outside_ip,
-                        'outside_port': int(getattr(session, "outside_port", 0)),
-                        'protocol': int(getattr(session, "protocol", 0))
-                    })
+                )
+                result.extend(s.to_dict() for s in decode_all(Session, sessions))
         except Exception:
             # silent if session dump not available or fails
             pass
 
-        return jsonify(result)
+        fmt = negotiate_format()
+        if fmt != 'json':
+            return columns_response(fmt, to_columnar(result)['columns'] or
+                                    {name: [] for name in NAT_SESSION_SCHEMA}, NAT_SESSION_SCHEMA)
+
+        return table_response(result)
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in get_nat_sessions: {e}\n{error_trace}")
+        log.error("Error in get_nat_sessions: %s\n%s", e, error_trace)
         return jsonify([])
 
 
+def _index_status(snap):
+    return {
+        'ready': snap is not None,
+        'sessions': len(snap) if snap else 0,
+        'users': len(snap.user_rows) if snap else 0,
+        'built_at': snap.built_at if snap else None,
+        'build_ms': round(snap.build_ms, 3) if snap else None,
+        'interval': nat_indexer.interval,
+        'background': nat_indexer.is_alive(),
+        'last_error': nat_indexer.last_error
+    }
+
+
+@nat_bp.route('/api/nat/sessions/index', methods=['GET', 'POST'])
+@default_target_only
+def nat_session_index():
+    """Status of the NAT session index; POST rebuilds it now"""
+    try:
+        snap = nat_indexer.refresh() if request.method == 'POST' else nat_indexer.snapshot
+        return jsonify(_index_status(snap))
+
+    except Exception as e:
+        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
+
+
+@nat_bp.route('/api/nat/sessions/lookup', methods=['GET'])
+@default_target_only
+def lookup_nat_sessions():
+    """
+    Look up sessions in the NAT session index without dumping VPP:
+    ?outside_ip=&outside_port=&protocol= (who owns this translation),
+    ?inside_ip= (all sessions of one user) or ?inside_prefix= (a subnet),
+    both optionally limited to one ?vrf_id=.
+    """
+    try:
+        snap = nat_indexer.current()
+        if snap is None:
+            return jsonify({'error': 'NAT session index not available', 'detail': nat_indexer.last_error}), 503
+
+        args = request.args
+        limit = int(args.get('limit', 1000))
+        vrf_id = int(args['vrf_id']) if args.get('vrf_id') else None
+
+        if args.get('outside_ip'):
+            port = args.get('outside_port')
+            proto = args.get('protocol')
+            rows = snap.by_outside(args['outside_ip'],
+                                   int(port) if port else None,
+                                   int(proto) if proto and port else None)
+        elif args.get('inside_ip'):
+            rows = snap.by_inside(args['inside_ip'], vrf_id)
+        elif args.get('inside_prefix'):
+            rows = snap.by_inside_prefix(args['inside_prefix'], vrf_id)
+        else:
+            return jsonify({'error': 'outside_ip, inside_ip or inside_prefix is required'}), 400
+
+        return jsonify({
+            'total': len(rows),
+            'sessions': [snap.row(i) for i in rows[:limit]],
+            'index_built_at': snap.built_at
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
+
+
+@nat_bp.route('/api/nat/sessions/exports', methods=['GET'])
+@default_target_only
+def list_nat_session_exports():
+    """Columnar NAT session snapshots on disk, newest last; unreadable files are flagged with an error"""
+    try:
+        exports = []
+        for path in list_exports():
+            try:
+                footer = read_footer(path)
+            except (OSError, ValueError) as e:
+                log.warning("Unreadable NAT session export %s: %s", path, e)
+                exports.append({
+                    'name': os.path.basename(path)[:-len(FILE_SUFFIX)],
+                    'error': str(e),
+                    'bytes': os.path.getsize(path)
+                })
+                continue
+            exports.append({
+                'name': footer['name'],
+                'created': footer['created'],
+                'rows': footer['rows'],
+                'users': footer['users'],
+                'chunks': len(footer['chunks']),
+                'duration_ms': footer['duration_ms'],
+                'bytes': os.path.getsize(path)
+            })
+        return jsonify({
+            'exports': exports,
+            'running': nat_exporter.running,
+            'last_error': nat_exporter.last_error
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
+
+
+@nat_bp.route('/api/nat/sessions/exports', methods=['POST'])
+@default_target_only
+def start_nat_session_export():
+    """Start a NAT session export in the background"""
+    try:
+        if not nat_exporter.export_in_background():
+            return jsonify({'error': 'An export is already running'}), 409
+        return jsonify({'message': 'NAT session export started'}), 202
+
+    except Exception as e:
+        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
+
+
+@nat_bp.route('/api/nat/sessions/exports/<name>', methods=['GET'])
+@default_target_only
+def query_nat_session_export(name):
+    """
+    Sessions kept in one export: ?inside_ip= or ?inside_prefix= (chunks that
+    cannot match are skipped unread) and/or ?outside_ip=&outside_port=,
+    optionally limited to one ?vrf_id=, at most ?limit= rows.
+    """
+    try:
+        path = export_path(name)
+        args = request.args
+        limit = int(args.get('limit', 1000))
+
+        inside_range = None
+        if args.get('inside_ip'):
+            ip = ip_to_int(args['inside_ip'])
+            inside_range = (ip, ip)
+        elif args.get('inside_prefix'):
+            net = ipaddress.IPv4Network(args['inside_prefix'], strict=False)
+            inside_range = (int(net.network_address), int(net.broadcast_address))
+        outside_ip = ip_to_int(args['outside_ip']) if args.get('outside_ip') else None
+        if inside_range is None and outside_ip is None:
+            return jsonify({'error': 'inside_ip, inside_prefix or outside_ip is required'}), 400
+
+        started = time.perf_counter()
+        rows, total = query_export(
+            path, inside_range, outside_ip,
+            int(args['outside_port']) if args.get('outside_port') else None,
+            int(args['vrf_id']) if args.get('vrf_id') else None,
+            limit)
+        return jsonify({
+            'name': name,
+            'total': total,
+            'sessions': rows,
+            'query_ms': round((time.perf_counter() - started) * 1000.0, 3)
+        })
+
+    except FileNotFoundError:
+        return jsonify({'error': f'No NAT session export {name!r}'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
+
+
 @nat_bp.route('/api/nat/static', methods=['GET'])
 def get_static_mappings():
-    """Get all static NAT mappings"""
+    """Get static NAT mappings, optionally of one VRF (?vrf_id=N)"""
     try:
+        vrf_id = _vrf_arg()
+        resource = _vrf_view('nat_static', vrf_id)
+        cached = cached_view(resource)
+        if cached is not None:
+            return cached
+
         v = get_vpp_for_request()
         if not v:
             return jsonify({'error': 'Not connected to VPP'}), 500
+        resource = _cacheable_view(v, resource, vrf_id)
+        version = config_cache.version(resource) if resource else None
 
-        result = []
-        for mapping in v.api.nat44_static_mapping_dump():
-            if isinstance(getattr(mapping, "local_ip_address", None), (bytes, bytearray)):
-                local_ip = str(ipaddress.IPv4Address(mapping.local_ip_address))
-            else:
-                local_ip = str(getattr(mapping, "local_ip_address", mapping))
-
-            if isinstance(getattr(mapping, "external_ip_address", None), (bytes, bytearray)):
-                external_ip = str(ipaddress.IPv4Address(mapping.external_ip_address))
-            else:
-                external_ip = str(getattr(mapping, "external_ip_address", mapping))
-
-            result.append({
-                'local_ip': local_ip,
-                'local_port': int(getattr(mapping, "local_port", 0)) if getattr(mapping, "local_port", None) else None,
-                'external_ip': external_ip,
-                'external_port': int(getattr(mapping, "external_port", 0)) if getattr(mapping, "external_port", None) else None,
-                'protocol': int(getattr(mapping, "protocol", 0)) if getattr(mapping, "protocol", None) else None,
-                'vrf_id': int(getattr(mapping, "vrf_id", 0))
-            })
+        mappings = decode_all(StaticMapping, cached_dump(v, 'nat44_static_mapping_dump'))
+        result = [m.to_dict() for m in mappings if vrf_id is None or m.vrf_id == vrf_id]
 
-        return jsonify(result)
+        if resource is None:
+            return table_response(result)
+        return view_response(resource, version, result)
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in get_static_mappings: {e}\n{error_trace}")
+        log.error("Error in get_static_mappings: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': error_trace}), 500
 
 
@@ -370,25 +565,27 @@ def add_static_mapping():
         local_port = data.get('local_port')
         external_port = data.get('external_port')
         protocol = data.get('protocol', 6)
+        vrf_id = int(data.get('vrf_id', 0))
 
         if not local_ip or not external_ip:
             return jsonify({'error': 'Local and external IPs are required'}), 400
 
-        print(f"Adding static NAT mapping: {local_ip}:{local_port} -> {external_ip}:{external_port}")
+        log.debug("Adding static NAT mapping: %s:%s -> %s:%s", local_ip, local_port, external_ip, external_port)
 
         v.api.nat44_add_del_static_mapping(
             is_add=1,
-            local_ip_address=ipaddress.IPv4Address(local_ip),
-            external_ip_address=ipaddress.IPv4Address(external_ip),
+            local_ip_address=parse_ip4(local_ip),
+            external_ip_address=parse_ip4(external_ip),
             local_port=int(local_port) if local_port else 0,
             external_port=int(external_port) if external_port else 0,
             protocol=int(protocol),
-            vrf_id=0,
+            vrf_id=vrf_id,
             external_sw_if_index=0xFFFFFFFF,
             flags=0
         )
+        config_cache.invalidate('nat_static')
 
-        print(f"Static NAT mapping added successfully")
+        log.debug("Static NAT mapping added successfully")
 
         return jsonify({
             'success': True,
@@ -397,7 +594,7 @@ def add_static_mapping():
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in add_static_mapping: {e}\n{error_trace}")
+        log.error("Error in add_static_mapping: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': error_trace}), 500
 
 
@@ -415,25 +612,27 @@ def remove_static_mapping():
         local_port = data.get('local_port')
         external_port = data.get('external_port')
         protocol = data.get('protocol', 6)
+        vrf_id = int(data.get('vrf_id', 0))
 
         if not local_ip or not external_ip:
             return jsonify({'error': 'Local and external IPs are required'}), 400
 
-        print(f"Removing static NAT mapping: {local_ip}:{local_port} -> {external_ip}:{external_port}")
+        log.debug("Removing static NAT mapping: %s:%s -> %s:%s", local_ip, local_port, external_ip, external_port)
 
         v.api.nat44_add_del_static_mapping(
             is_add=0,
-            local_ip_address=ipaddress.IPv4Address(local_ip),
-            external_ip_address=ipaddress.IPv4Address(external_ip),
+            local_ip_address=parse_ip4(local_ip),
+            external_ip_address=parse_ip4(external_ip),
             local_port=int(local_port) if local_port else 0,
             external_port=int(external_port) if external_port else 0,
             protocol=int(protocol),
-            vrf_id=0,
+            vrf_id=vrf_id,
             external_sw_if_index=0xFFFFFFFF,
             flags=0
         )
+        config_cache.invalidate('nat_static')
 
-        print(f"Static NAT mapping removed successfully")
+        log.debug("Static NAT mapping removed successfully")
 
         return jsonify({
             'success': True,
@@ -442,5 +641,5 @@ def remove_static_mapping():
 
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in remove_static_mapping: {e}\n{error_trace}")
+        log.error("Error in remove_static_mapping: %s\n%s", e, error_trace)
         return jsonify({'error': str(e), 'trace': error_trace}), 500
@@ -1,48 +1,293 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from vpp_connection import get_vpp_for_request
-import ipaddress
+from vpp_cache import cached_dump, invalidate_on_write, config_cache, cached_view, view_response
+from vpp_address import (
+    format_prefix, format_nh, encode_address, AF_IP6, ZERO, FIB_PATH_NH_PROTO_IP4, FIB_PATH_NH_PROTO_IP6
+)
+from json_provider import table_response, wants_columnar
+from route_index import route_indexer, route_view, VPP_ROUTE_INDEX_INTERVAL
+import logging
+import os
+import time
 import traceback
-import socket
 
 routes_bp = Blueprint('routes', __name__)
+invalidate_on_write(routes_bp, 'ip_route_dump', 'ip_table_dump')
+log = logging.getLogger(__name__)
+
+# Connections used to dump VRFs in parallel for ?table_id=all and /api/vrfs
+VPP_VRF_WORKERS = int(os.environ.get("VPP_VRF_WORKERS", "4"))
+
+# Change feed: default page size, longest ?wait= and the re-dump period
+# while waiting when no background route indexer is running (seconds)
+ROUTE_FEED_LIMIT = 10000
+ROUTE_FEED_MAX_WAIT = 60.0
+ROUTE_FEED_POLL = 1.0
+
+
+def list_tables(v):
+    """[(table_id, is_ip6, name)] for every FIB table (VRF) known to VPP."""
+    return [(t.table.table_id, bool(t.table.is_ip6), t.table.name)
+            for t in cached_dump(v, 'ip_table_dump')]
+
+
+def known_table(v, table_id):
+    """True for table 0 and every VRF VPP has; only those get a cached view or an index."""
+    return table_id == 0 or any(tid == table_id for tid, _, _ in list_tables(v))
+
+
+def _check_table(v, table_id):
+    if not known_table(v, table_id):
+        raise ValueError(f"Unknown VRF {table_id}")
+
+
+def route_rows(v, table_id, is_ip6, if_names):
+    """Listing rows for one address family of one table."""
+    rows = []
+    for route in cached_dump(v, 'ip_route_dump', table={'table_id': table_id, 'is_ip6': is_ip6}):
+        dst_str = format_prefix(route.route.prefix)
+
+        for path in route.route.paths:
+            # Detect next-hop
+            if hasattr(path.nh, "address"):
+                nh_str = format_nh(path)
+            else:
+                nh_str = "direct"
+
+            rows.append({
+                "destination": dst_str,
+                "next_hop": nh_str,
+                "interface": if_names.get(path.sw_if_index, f"if{path.sw_if_index}"),
+                "sw_if_index": path.sw_if_index,
+                "table_id": table_id,
+                "af": 6 if is_ip6 else 4
+            })
+    return rows
+
+
+def _vrf_workers(v):
+    # config_apply imports this module for build_route_request
+    from config_apply import ApiWorkers
+    return ApiWorkers(v, VPP_VRF_WORKERS)
+
+
+def _stream_tables(v, dumps, if_names):
+    """
+    One JSON array merged from per-(table, family) dumps that run
+    concurrently; each table is written out as soon as its dump returns.
+    """
+    encode = current_app.json.dumps
+
+    def dump(conn, key):
+        return route_rows(conn, key[0], key[1], if_names)
+
+    def generate():
+        first = True
+        yield "["
+        with _vrf_workers(v) as workers:
+            for _, rows in workers.as_completed(dump, dumps):
+                if not rows:
+                    continue
+                chunk = ",".join(encode(row) for row in rows)
+                yield chunk if first else "," + chunk
+                first = False
+        yield "]"
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
 
 @routes_bp.route('/api/routes', methods=['GET'])
 def get_routes():
-    """List all IPv4 routes."""
+    """
+    List IPv4 and IPv6 routes of one table (?table_id=N, default 0), or of
+    every VRF with ?table_id=all (streamed).
+    """
     try:
+        table_arg = request.args.get('table_id', '0')
+        all_tables = table_arg == 'all'
+        table_id = 0 if all_tables else int(table_arg)
+
+        resource = route_view(table_id)
+        if not all_tables:
+            # routes also change outside the GUI; without the background indexer bumping
+            # the version when they do, re-dump a listing older than its interval
+            max_age = None if route_indexer.keeps_current() else VPP_ROUTE_INDEX_INTERVAL
+            cached = cached_view(resource, max_age)
+            if cached is not None:
+                return cached
+
         v = get_vpp_for_request()
         if not v:
             return jsonify({'error': 'Not connected to VPP'}), 500
+        if not all_tables:
+            _check_table(v, table_id)
+        version = config_cache.version(resource)
 
         # Map sw_if_index → interface name
-        interfaces = v.api.sw_interface_dump()
+        interfaces = cached_dump(v, 'sw_interface_dump')
         if_names = {iface.sw_if_index: iface.interface_name for iface in interfaces}
 
-        # Dump all IPv4 routes
-        routes = v.api.ip_route_dump(table={'table_id': 0, 'is_ip6': 0})
+        if all_tables:
+            dumps = sorted({(tid, int(is_ip6)) for tid, is_ip6, _ in list_tables(v)})
+            if not wants_columnar():
+                return _stream_tables(v, dumps, if_names)
+            result = []
+            with _vrf_workers(v) as workers:
+                for rows in workers.map(lambda conn, key: route_rows(conn, key[0], key[1], if_names), dumps):
+                    result.extend(rows)
+            return table_response(result)
 
         result = []
-        for route in routes:
-            prefix = route.route.prefix
-            dst_str = str(prefix)
-
-            for path in route.route.paths:
-                # Detect next-hop
-                if hasattr(path.nh, "address") and hasattr(path.nh.address, "ip4"):
-                    nh_ip = ipaddress.IPv4Address(path.nh.address.ip4)
-                    nh_str = str(nh_ip)
-                else:
-                    nh_str = "direct"
-
-                result.append({
-                    "destination": dst_str,
-                    "next_hop": nh_str,
-                    "interface": if_names.get(path.sw_if_index, f"if{path.sw_if_index}"),
-                    "sw_if_index": path.sw_if_index
-                })
+        for is_ip6 in (0, 1):
+            result.extend(route_rows(v, table_id, is_ip6, if_names))
+
+        return view_response(resource, version, result)
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "trace": traceback.format_exc()
+        }), 500
+
+
+def _route_index(table_id):
+    """Up-to-date LPM index of a table; connects to VPP only when it has to be refreshed."""
+    index = route_indexer.current(table_id)
+    if index is None:
+        v = get_vpp_for_request()
+        if not v:
+            return None
+        _check_table(v, table_id)
+        index = route_indexer.table(v, table_id)
+    return index
+
+
+def _paths_json(paths, if_names):
+    return [{
+        "next_hop": nh,
+        "interface": if_names.get(sw_if_index, f"if{sw_if_index}"),
+        "sw_if_index": sw_if_index
+    } for nh, sw_if_index in paths or ()]
+
 
+def _lookup_result(ip, match, if_names):
+    if match is None:
+        return {"ip": ip, "prefix": None, "paths": []}
+    prefix, paths = match
+    return {"ip": ip, "prefix": prefix, "paths": _paths_json(paths, if_names)}
+
+
+@routes_bp.route('/api/routes/lookup', methods=['GET', 'POST'])
+def lookup_routes():
+    """
+    Longest-prefix match against the in-process route index:
+    GET ?ip=X (repeat ip= for a few) or POST {"ips": [...]} for batches,
+    both with an optional table_id (default 0).
+    """
+    try:
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            ips = data.get('ips') or []
+            table_id = int(data.get('table_id', 0))
+        else:
+            ips = request.args.getlist('ip')
+            table_id = int(request.args.get('table_id', 0))
+        if not ips:
+            return jsonify({"error": "ip is required"}), 400
+
+        index = _route_index(table_id)
+        if index is None:
+            return jsonify({'error': 'Not connected to VPP'}), 500
+
+        started = time.perf_counter()
+        matches = [index.lookup(ip) for ip in ips]
+        lookup_us = round((time.perf_counter() - started) * 1e6, 1)
+
+        if_names = index.if_names
+        if request.method == 'GET' and len(ips) == 1:
+            result = _lookup_result(ips[0], matches[0], if_names)
+            result.update(table_id=table_id, lookup_us=lookup_us)
+            return jsonify(result), (200 if matches[0] is not None else 404)
+
+        return jsonify({
+            "table_id": table_id,
+            "count": len(ips),
+            "matched": sum(1 for m in matches if m is not None),
+            "lookup_us": lookup_us,
+            "results": [_lookup_result(ip, m, if_names) for ip, m in zip(ips, matches)]
+        })
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "trace": traceback.format_exc()
+        }), 500
+
+
+def _synced_route_index(table_id):
+    """
+    Route index of a table as VPP has it now: the background indexer keeps
+    it current when running, otherwise the table is re-dumped and diffed.
+    """
+    if route_indexer.keeps_current():
+        return _route_index(table_id)
+    v = get_vpp_for_request()
+    if not v:
+        return None
+    _check_table(v, table_id)
+    return route_indexer.refresh(v, table_id)
+
+
+@routes_bp.route('/api/routes/diff', methods=['GET'])
+def diff_routes():
+    """
+    Net route changes of a table (?table_id=, default 0) since ?since=<version>:
+    added, removed and changed prefixes. Without since, for a version of an
+    earlier build of the index, or once the change log no longer reaches
+    back that far, the whole table with "full": true.
+    """
+    try:
+        table_id = int(request.args.get('table_id', 0))
+        since = request.args.get('since') or None
+
+        index = _synced_route_index(table_id)
+        if index is None:
+            return jsonify({'error': 'Not connected to VPP'}), 500
+
+        if_names = index.if_names
+        since_version = index.parse_token(since)
+        added = None
+        if since_version is not None:
+            added, removed, changed, version, digest = index.diff(since_version)
+        result = {"table_id": table_id, "since": since}
+
+        if added is None:
+            entries, version, digest = index.snapshot()
+            result.update(full=True, version=index.token(version), digest=f"{digest:016x}", routes=[
+                {"prefix": prefix, "paths": _paths_json(paths, if_names)} for prefix, paths in entries.items()
+            ])
+            return jsonify(result)
+
+        result.update(
+            full=False,
+            version=index.token(version),
+            digest=f"{digest:016x}",
+            added=[{"prefix": prefix, "paths": _paths_json(paths, if_names)} for prefix, paths in added.items()],
+            removed=removed,
+            changed=[{
+                "prefix": prefix,
+                "paths": _paths_json(paths, if_names),
+                "old_paths": _paths_json(old, if_names)
+            } for prefix, (old, paths) in changed.items()]
+        )
         return jsonify(result)
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({
             "error": str(e),
@@ -50,10 +295,277 @@ def get_routes():
         }), 500
 
 
+@routes_bp.route('/api/routes/changes', methods=['GET'])
+def route_change_feed():
+    """
+    Ordered route change feed of a table: every prefix change after
+    ?since=<version>, at most ?limit= of them; resume from "next". With
+    ?wait=<seconds> the request is held until a change arrives. 410 when
+    the log no longer reaches back to since, or since is a version of an
+    earlier build of the index (resync with /api/routes/diff).
+    """
+    try:
+        table_id = int(request.args.get('table_id', 0))
+        since = request.args.get('since') or None
+        limit = int(request.args.get('limit', ROUTE_FEED_LIMIT))
+        wait = min(float(request.args.get('wait', 0)), ROUTE_FEED_MAX_WAIT)
+
+        deadline = time.monotonic() + wait
+        while True:
+            index = _synced_route_index(table_id)
+            if index is None:
+                return jsonify({'error': 'Not connected to VPP'}), 500
+            since_version = index.parse_token(since)
+            if since_version is None:
+                records, version = None, index.version
+                break
+            records, version, digest = index.changes_since(since_version, limit)
+            remaining = deadline - time.monotonic()
+            if records is None or records or remaining <= 0:
+                break
+            if route_indexer.keeps_current():
+                route_indexer.wait_for_change(remaining)
+            else:
+                time.sleep(min(remaining, ROUTE_FEED_POLL))
+
+        if records is None:
+            return jsonify({
+                "error": f"changes since version {since or 0} are no longer available; resync with /api/routes/diff",
+                "table_id": table_id,
+                "version": index.token(version)
+            }), 410
+
+        if_names = index.if_names
+        next_version = records[-1][0] if records else since_version
+        return jsonify({
+            "table_id": table_id,
+            "since": since,
+            "next": index.token(next_version),
+            "version": index.token(version),
+            "more": next_version < version,
+            # digest of the table at "version"; compare once next == version
+            "digest": f"{digest:016x}",
+            "changes": [{
+                "version": index.token(seq),
+                "op": "added" if old is None else "removed" if new is None else "changed",
+                "prefix": prefix,
+                "paths": _paths_json(new, if_names),
+                "old_paths": _paths_json(old, if_names)
+            } for seq, prefix, old, new in records]
+        })
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "trace": traceback.format_exc()
+        }), 500
+
+
+@routes_bp.route('/api/routes/index', methods=['GET', 'POST'])
+def route_index_status():
+    """Status of the route lookup index; POST rebuilds every table now"""
+    try:
+        if request.method == 'POST':
+            v = get_vpp_for_request()
+            if not v:
+                return jsonify({'error': 'Not connected to VPP'}), 500
+            route_indexer.refresh_all(v)
+
+        return jsonify({
+            "background": route_indexer.is_alive(),
+            "interval": route_indexer.interval,
+            "last_error": route_indexer.last_error,
+            "tables": [{
+                "table_id": t.table_id,
+                "prefixes": len(t),
+                "ipv4": len(t.trees[4]),
+                "ipv6": len(t.trees[6]),
+                "refreshed_at": t.refreshed_at,
+                "refresh_ms": round(t.refresh_ms, 3),
+                "last_changes": t.last_changes,
+                "version": t.token(t.version),
+                "digest": f"{t.digest:016x}",
+                "current": route_indexer.current(t.table_id) is not None
+            } for t in route_indexer.target_tables()]
+        })
+
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "trace": traceback.format_exc()
+        }), 500
+
+
+@routes_bp.route('/api/vrfs', methods=['GET'])
+def get_vrfs():
+    """VRF inventory: every FIB table with its route count and NAT pool / static mapping counts."""
+    try:
+        v = get_vpp_for_request()
+        if not v:
+            return jsonify({'error': 'Not connected to VPP'}), 500
+
+        tables = list_tables(v)
+
+        def count(conn, key):
+            return len(cached_dump(conn, 'ip_route_dump', table={'table_id': key[0], 'is_ip6': key[1]}))
+
+        keys = [(tid, int(is_ip6)) for tid, is_ip6, _ in tables]
+        with _vrf_workers(v) as workers:
+            route_counts = dict(workers.as_completed(count, keys))
+
+        nat_addresses, nat_static = {}, {}
+        try:
+            for addr in cached_dump(v, 'nat44_address_dump'):
+                nat_addresses[addr.vrf_id] = nat_addresses.get(addr.vrf_id, 0) + 1
+            for mapping in cached_dump(v, 'nat44_static_mapping_dump'):
+                nat_static[mapping.vrf_id] = nat_static.get(mapping.vrf_id, 0) + 1
+        except Exception as e:
+            # NAT plugin not loaded
+            log.debug("NAT dumps unavailable for VRF inventory: %s", e)
+
+        result = [{
+            "table_id": tid,
+            "name": name,
+            "af": 6 if is_ip6 else 4,
+            "routes": route_counts.get((tid, int(is_ip6)), 0),
+            # NAT44 pools and mappings belong to the IPv4 table
+            "nat_addresses": 0 if is_ip6 else nat_addresses.get(tid, 0),
+            "nat_static_mappings": 0 if is_ip6 else nat_static.get(tid, 0),
+        } for tid, is_ip6, name in tables]
+
+        return table_response(result)
+
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "trace": traceback.format_exc()
+        }), 500
+
+
+@routes_bp.route('/api/vrf', methods=['POST', 'DELETE'])
+def manage_vrf():
+    """
+    Create or delete a FIB table (VRF) -- both address families unless
+    is_ip6 is given. Table 0 always exists.
+    """
+    try:
+        data = request.get_json()
+        if not data or 'table_id' not in data:
+            return jsonify({"error": "Missing table_id"}), 400
+
+        table_id = int(data['table_id'])
+        if table_id == 0:
+            return jsonify({"error": "Table 0 is the default VRF"}), 400
+
+        v = get_vpp_for_request()
+        if not v:
+            return jsonify({"error": "VPP connection failed"}), 500
+
+        families = [bool(data["is_ip6"])] if "is_ip6" in data else [False, True]
+        for is_ip6 in families:
+            v.api.ip_table_add_del(
+                is_add=1 if request.method == "POST" else 0,
+                table={
+                    "table_id": table_id,
+                    "is_ip6": is_ip6,
+                    "name": data.get("name", "")
+                }
+            )
+        config_cache.invalidate('routes')
+
+        action = "added" if request.method == "POST" else "deleted"
+        return jsonify({"status": f"VRF {table_id} {action} successfully"}), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "trace": traceback.format_exc()
+        }), 500
+
+
+def build_route_request(v, dst, prefix_len, sw_if_index, next_hop, table_id=0):
+    """
+    Build the route argument for an IPv4 or IPv6 route add/del (the family
+    follows dst). Returns (message name, route) -- ip_route_add_del_v2 when
+    available (VPP >=24.06), ip_route_add_del for older versions.
+    """
+    dst_addr = encode_address(dst)
+    af = dst_addr["af"]
+    key = "ip6" if af == AF_IP6 else "ip4"
+
+    # Handle direct route
+    if next_hop in ["", "direct", None]:
+        next_hop = ZERO[6 if af == AF_IP6 else 4]
+    nh_addr = encode_address(next_hop)
+    if nh_addr["af"] != af:
+        raise ValueError(f"next hop {next_hop} is not in the same address family as {dst}")
+    dst_bin = dst_addr["un"][key]
+    nh_bin = nh_addr["un"][key]
+
+    # Choose correct API call
+    use_v2 = hasattr(v.api, "ip_route_add_del_v2")
+
+    # Base path entry
+    path_entry = {
+        "sw_if_index": sw_if_index,
+        "weight": 1,
+        "preference": 0,
+        "proto": FIB_PATH_NH_PROTO_IP6 if af == AF_IP6 else FIB_PATH_NH_PROTO_IP4,
+    }
+
+    # Add fields for new/old API versions
+    if use_v2:
+        empty_label = {"label": 0, "ttl": 0, "exp": 0, "is_uniform": 0}
+        label_stack = [empty_label] * 16
+
+        path_entry.update({
+            "nh": {key: nh_bin},
+            "n_labels": 0,
+            "label_stack": label_stack
+        })
+    else:
+        path_entry.update({
+            "table_id": table_id,
+            "type": 0,
+            "flags": 0,
+            "n_labels": 0,
+            "nh": {"address": {"af": af, "un": {key: nh_bin}}}
+        })
+
+    # Route wrapper for both API versions
+    if use_v2:
+        route_data = {
+            "table_id": table_id,
+            "prefix": {
+                "af": af,
+                "address": {key: dst_bin},
+                "len": prefix_len
+            },
+            "n_paths": 1,
+            "paths": [path_entry]
+        }
+    else:
+        route_data = {
+            "prefix": {
+                "address": {"af": af, "un": {key: dst_bin}},
+                "len": prefix_len
+            },
+            "table_id": table_id,
+            "n_paths": 1,
+            "paths": [path_entry]
+        }
+
+    return ("ip_route_add_del_v2" if use_v2 else "ip_route_add_del"), route_data
+
+
 @routes_bp.route('/api/route', methods=['POST', 'DELETE'])
 def manage_route():
     """
-    Add or delete an IPv4 route in VPP.
+    Add or delete an IPv4 or IPv6 route in VPP.
     Uses ip_route_add_del_v2 when available (VPP ≥24.06),
     falls back to ip_route_add_del for older versions.
     """
@@ -65,7 +577,8 @@ def manage_route():
         dst = data.get("destination", "0.0.0.0")
         prefix_len = int(data.get("prefix_len", 0))
         sw_if_index = int(data.get("sw_if_index", 0))
-        next_hop = data.get("next_hop", "0.0.0.0")
+        next_hop = data.get("next_hop", "direct")
+        table_id = int(data.get("table_id", 0))
 
         if not dst:
             return jsonify({"error": "Missing destination"}), 400
@@ -74,78 +587,18 @@ def manage_route():
         if not v:
             return jsonify({"error": "VPP connection failed"}), 500
 
-        # Convert IPs to binary
-        dst_bin = socket.inet_pton(socket.AF_INET, dst)
-
-        # Handle direct route
-        if next_hop in ["", "direct", None]:
-            nh_bin = b"\x00\x00\x00\x00"
-        else:
-            nh_bin = socket.inet_pton(socket.AF_INET, next_hop)
-
-        # Choose correct API call
-        use_v2 = hasattr(v.api, "ip_route_add_del_v2")
-        api_call = v.api.ip_route_add_del_v2 if use_v2 else v.api.ip_route_add_del
-
-        # Base path entry
-        path_entry = {
-            "sw_if_index": sw_if_index,
-            "weight": 1,
-            "preference": 0,
-            "proto": 0,  # IPv4
-        }
-
-        # Add fields for new/old API versions
-        if use_v2:
-            empty_label = {"label": 0, "ttl": 0, "exp": 0, "is_uniform": 0}
-            label_stack = [empty_label] * 16
-
-            path_entry.update({
-                "nh": {"ip4": nh_bin},
-                "n_labels": 0,
-                "label_stack": label_stack
-            })
-        else:
-            path_entry.update({
-                "table_id": 0,
-                "type": 0,
-                "flags": 0,
-                "n_labels": 0,
-                "nh": {"address": {"af": 0, "un": {"ip4": nh_bin}}}
-            })
-
-        # Route wrapper for both API versions
-        if use_v2:
-            route_data = {
-                "table_id": 0,
-                "prefix": {
-                    "af": 0,
-                    "address": {"ip4": dst_bin},
-                    "len": prefix_len
-                },
-                "n_paths": 1,
-                "paths": [path_entry]
-            }
-        else:
-            route_data = {
-                "prefix": {
-                    "address": {"af": 0, "un": {"ip4": dst_bin}},
-                    "len": prefix_len
-                },
-                "table_id": 0,
-                "n_paths": 1,
-                "paths": [path_entry]
-            }
+        msg, route_data = build_route_request(v, dst, prefix_len, sw_if_index, next_hop, table_id)
 
         # Execute add/delete
-        api_call(
+        getattr(v.api, msg)(
             is_add=1 if request.method == "POST" else 0,
             is_multipath=False,
             route=route_data
         )
+        config_cache.invalidate(route_view(table_id))
 
         action = "added" if request.method == "POST" else "deleted"
-        return jsonify({"status": f"Route {action} successfully"}), 200
+        return jsonify({"status": f"Route {action} successfully", "table_id": table_id}), 200
 
     except Exception as e:
         return jsonify({
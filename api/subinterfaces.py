@@ -0,0 +1,310 @@
+from flask import Blueprint, jsonify, request
+from vpp_connection import get_vpp_for_request
+from vpp_cache import cached_dump, config_cache, dump_flight, invalidate_on_write
+from config_apply import (
+    Change, ApiWorkers, execute, VPP_CONFIG_WORKERS,
+    SUB_IF_ONE_TAG, SUB_IF_TWO_TAGS, SUB_IF_EXACT_MATCH, L2_API_PORT_TYPE_NORMAL, L2_API_PORT_TYPE_BVI
+)
+from api.interfaces import select_interfaces
+import time
+import traceback
+import logging
+
+subinterfaces_bp = Blueprint('subinterfaces', __name__)
+log = logging.getLogger(__name__)
+# sw_interface_dump is patched in place after each write (see _update_interface_cache);
+# per-interface address dumps go stale when VPP reuses a deleted sw_if_index, and
+# deleting an interface also takes its routes and NAT interface config with it
+invalidate_on_write(subinterfaces_bp, 'ip_address_dump', 'ip_route_dump', 'nat44_interface_dump')
+
+
+def parse_vlans(spec):
+    """VLAN ids from "100-199,300", [100, "200-210"] or 100, sorted and unique."""
+    parts = spec if isinstance(spec, list) else str(spec).split(',')
+    vlans = set()
+    for part in parts:
+        part = str(part).strip()
+        if '-' in part:
+            first, last = (int(x) for x in part.split('-', 1))
+        else:
+            first = last = int(part)
+        if not 1 <= first <= last <= 4094:
+            raise ValueError(f"invalid VLAN range {part!r}")
+        vlans.update(range(first, last + 1))
+    return sorted(vlans)
+
+
+def _created(ctx, name):
+    if name not in ctx['sw_if_index']:
+        raise RuntimeError(f"{name} was not created")
+    return ctx['sw_if_index'][name]
+
+
+def _remember(name, created):
+    """on_reply hook keeping a created interface's sw_if_index for later calls and the response."""
+    def on_reply(ctx, reply):
+        ctx['sw_if_index'][name] = created[name] = int(reply.sw_if_index)
+    return on_reply
+
+
+def _follow_up(changes, name, up, bridge_domain, bvi=False, shg=0):
+    """Admin state / bridge membership of an interface created earlier in the same run."""
+    if up:
+        changes.append(Change('interfaces', 'up', name, 'sw_interface_set_flags',
+                              lambda ctx: {'sw_if_index': _created(ctx, name), 'flags': 1}))
+    if bridge_domain is not None:
+        port_type = L2_API_PORT_TYPE_BVI if bvi else L2_API_PORT_TYPE_NORMAL
+        changes.append(Change('bridge_add', f"bridge {bridge_domain}", name, 'sw_interface_set_l2_bridge',
+                              lambda ctx: {'rx_sw_if_index': _created(ctx, name), 'bd_id': int(bridge_domain),
+                                           'port_type': port_type, 'shg': shg, 'enable': True}))
+
+
+def plan_subifs(interfaces, spec, created):
+    """
+    Changes creating the sub-interfaces of one spec:
+      {"parent": name | "parent_sw_if_index": n, "vlans": "100-199",
+       "outer_vlan": 10, "up": true, "bridge_domain": 5}
+    Without outer_vlan each VLAN is a dot1q sub-interface <parent>.<vlan>;
+    with it the VLANs are inner tags of QinQ sub-interfaces
+    <parent>.<outer * 4096 + inner>. Created indexes are filled into created.
+    """
+    if 'parent_sw_if_index' in spec:
+        parents = [i for i in interfaces if int(i.sw_if_index) == int(spec['parent_sw_if_index'])]
+    else:
+        parents = [i for i in interfaces if i.interface_name == spec.get('parent')]
+    if not parents:
+        raise ValueError(f"unknown parent interface {spec.get('parent', spec.get('parent_sw_if_index'))!r}")
+    parent = parents[0]
+
+    outer = spec.get('outer_vlan')
+    if outer is not None and not 1 <= int(outer) <= 4094:
+        raise ValueError(f"invalid outer VLAN {outer!r}")
+
+    changes = []
+    for vlan in parse_vlans(spec['vlans']):
+        if outer is None:
+            sub_id, args = vlan, {'outer_vlan_id': vlan, 'inner_vlan_id': 0,
+                                  'sub_if_flags': SUB_IF_ONE_TAG | SUB_IF_EXACT_MATCH}
+        else:
+            sub_id, args = int(outer) * 4096 + vlan, {'outer_vlan_id': int(outer), 'inner_vlan_id': vlan,
+                                                      'sub_if_flags': SUB_IF_TWO_TAGS | SUB_IF_EXACT_MATCH}
+        name = f"{parent.interface_name}.{sub_id}"
+        changes.append(Change('interfaces_create', 'create', name, 'create_subif',
+                              dict(args, sw_if_index=int(parent.sw_if_index), sub_id=sub_id),
+                              on_reply=_remember(name, created)))
+        _follow_up(changes, name, spec.get('up', False), spec.get('bridge_domain'))
+    return parent, changes
+
+
+def _run(v, changes, dry_run):
+    """Execute changes (or just describe them); returns (results, phase timings ms)."""
+    if dry_run:
+        return [c.describe() for c in changes], {}
+    with ApiWorkers(v, VPP_CONFIG_WORKERS) as workers:
+        return execute(workers, changes, stop_on_error=False)
+
+
+def _update_interface_cache(v, name_filters=(), deleted=()):
+    """
+    Patch the kept sw_interface_dump instead of dropping it: removed
+    indexes are filtered out and new rows come from one name-filtered
+    dump per parent (or "loop") rather than a full re-dump.
+    """
+    if not dump_flight.cached('sw_interface_dump'):
+        return
+    deleted = set(deleted)
+    fresh = {}
+    for name_filter in name_filters:
+        for row in v.api.sw_interface_dump(name_filter_valid=True, name_filter=name_filter):
+            fresh[int(row.sw_if_index)] = row
+
+    def merge(rows):
+        merged = {int(r.sw_if_index): r for r in rows if int(r.sw_if_index) not in deleted}
+        merged.update(fresh)
+        return [merged[i] for i in sorted(merged)]
+
+    dump_flight.patch(merge, 'sw_interface_dump')
+
+
+def _response(started, results, created, phase_ms, dry_run, status=201):
+    errors = sum(1 for r in results if r.get('status') == 'error')
+    if errors:
+        status = 207
+    elif dry_run:
+        status = 200
+    return jsonify({
+        'dry_run': dry_run,
+        'success': not errors,
+        'created': created,
+        'results': results,
+        'errors': errors,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000.0, 3),
+        'phases_ms': phase_ms,
+    }), status
+
+
+def _dry_run():
+    return request.args.get('dry_run', '0') not in ('', '0', 'false', 'no')
+
+
+@subinterfaces_bp.route('/api/interfaces/subif', methods=['POST'])
+def create_subinterfaces():
+    """
+    Create dot1q / QinQ sub-interfaces in bulk. Body is one spec (see
+    plan_subifs) or {"specs": [...]}; ?dry_run=1 only plans.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected a JSON sub-interface spec'}), 400
+        specs = data.get('specs', [data])
+        dry_run = _dry_run()
+
+        started = time.perf_counter()
+        v = get_vpp_for_request()
+        if not v:
+            return jsonify({'error': 'Not connected to VPP'}), 500
+
+        interfaces = cached_dump(v, 'sw_interface_dump')
+        parents, changes, created = set(), [], {}
+        for spec in specs:
+            parent, spec_changes = plan_subifs(interfaces, spec, created)
+            parents.add(parent.interface_name)
+            changes.extend(spec_changes)
+
+        results, phase_ms = _run(v, changes, dry_run)
+        if created:
+            _update_interface_cache(v, name_filters=[f"{p}." for p in sorted(parents)])
+        log.info("Sub-interface create: %d call(s), %d created", len(changes), len(created))
+        return _response(started, results, created, phase_ms, dry_run)
+
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        log.error("Error in create_subinterfaces: %s\n%s", e, error_trace)
+        return jsonify({'error': str(e), 'trace': error_trace}), 500
+
+
+@subinterfaces_bp.route('/api/interfaces/loopback', methods=['POST'])
+def create_loopbacks():
+    """Create loopbacks: {"count": n, "up": bool, "bridge_domain": id, "bvi": bool}."""
+    try:
+        data = request.get_json(silent=True) or {}
+        count = int(data.get('count', 1))
+        if not 1 <= count <= 4096:
+            return jsonify({'error': 'count must be 1..4096'}), 400
+        dry_run = _dry_run()
+
+        started = time.perf_counter()
+        v = get_vpp_for_request()
+        if not v:
+            return jsonify({'error': 'Not connected to VPP'}), 500
+
+        changes, created = [], {}
+        for n in range(count):
+            # VPP names loopbacks itself; key the follow-up calls on a placeholder
+            name = f"loopback#{n}"
+            changes.append(Change('interfaces_create', 'create', name, 'create_loopback', {},
+                                  on_reply=_remember(name, created)))
+            _follow_up(changes, name, data.get('up', False), data.get('bridge_domain'),
+                       bvi=bool(data.get('bvi', False)))
+
+        results, phase_ms = _run(v, changes, dry_run)
+        if created:
+            _update_interface_cache(v, name_filters=['loop'])
+        log.info("Loopback create: %d created", len(created))
+        return _response(started, results, created, phase_ms, dry_run)
+
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        log.error("Error in create_loopbacks: %s\n%s", e, error_trace)
+        return jsonify({'error': str(e), 'trace': error_trace}), 500
+
+
+@subinterfaces_bp.route('/api/interfaces/virtual', methods=['DELETE'])
+def delete_virtual_interfaces():
+    """
+    Delete the sub-interfaces and loopbacks matching {"select": {...}}
+    (names, sw_if_index, glob, range). Physical interfaces are refused.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if 'select' not in data:
+            return jsonify({'error': 'Expected {"select": {...}}'}), 400
+        dry_run = _dry_run()
+
+        started = time.perf_counter()
+        v = get_vpp_for_request()
+        if not v:
+            return jsonify({'error': 'Not connected to VPP'}), 500
+
+        matched = select_interfaces(cached_dump(v, 'sw_interface_dump'), data['select'])
+        changes = []
+        for iface in matched:
+            i = int(iface.sw_if_index)
+            if int(iface.sup_sw_if_index) != i:
+                msg = 'delete_subif'
+            elif iface.interface_name.startswith('loop'):
+                msg = 'delete_loopback'
+            else:
+                return jsonify({'error': f'{iface.interface_name} is not a sub-interface or loopback'}), 400
+            changes.append(Change('interfaces_delete', 'delete', iface.interface_name, msg, {'sw_if_index': i}))
+
+        results, phase_ms = _run(v, changes, dry_run)
+        if not dry_run:
+            ok = {r['target'] for r in results if r.get('status') == 'ok'}
+            _update_interface_cache(v, deleted=[int(i.sw_if_index) for i in matched if i.interface_name in ok])
+            if ok:
+                # also drops the per-VRF route listings and with them the route index
+                config_cache.invalidate('routes', 'nat_interfaces')
+        log.info("Virtual interface delete: %d matched", len(matched))
+        return _response(started, results, {}, phase_ms, dry_run, status=200)
+
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        log.error("Error in delete_virtual_interfaces: %s\n%s", e, error_trace)
+        return jsonify({'error': str(e), 'trace': error_trace}), 500
+
+
+@subinterfaces_bp.route('/api/bridge-domain/<int:bd_id>/members', methods=['POST', 'DELETE'])
+def manage_bridge_members(bd_id):
+    """
+    Add (POST) or remove (DELETE) the interfaces matching {"select": {...}}
+    to/from a bridge domain. POST also takes "shg" and "bvi".
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if 'select' not in data:
+            return jsonify({'error': 'Expected {"select": {...}}'}), 400
+        dry_run = _dry_run()
+        enable = request.method == 'POST'
+
+        started = time.perf_counter()
+        v = get_vpp_for_request()
+        if not v:
+            return jsonify({'error': 'Not connected to VPP'}), 500
+
+        port_type = L2_API_PORT_TYPE_BVI if data.get('bvi') else L2_API_PORT_TYPE_NORMAL
+        changes = [
+            Change('bridge_add' if enable else 'bridge_del', 'add' if enable else 'delete',
+                   iface.interface_name, 'sw_interface_set_l2_bridge',
+                   {'rx_sw_if_index': int(iface.sw_if_index), 'bd_id': bd_id, 'port_type': port_type,
+                    'shg': int(data.get('shg', 0)), 'enable': enable})
+            for iface in select_interfaces(cached_dump(v, 'sw_interface_dump'), data['select'])
+        ]
+
+        results, phase_ms = _run(v, changes, dry_run)
+        log.info("Bridge domain %d: %d member change(s)", bd_id, len(changes))
+        return _response(started, results, {}, phase_ms, dry_run, status=200)
+
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        log.error("Error in manage_bridge_members: %s\n%s", e, error_trace)
+        return jsonify({'error': str(e), 'trace': error_trace}), 500
@@ -9,14 +9,32 @@ from api.nat import nat_bp
 from api.stats import stats_bp
 from api.dashboard import dashboard_bp
 from api.dhcp import dhcp_bp
+from api.debug import debug_bp
+from api.alerts import alerts_bp
+from api.config import config_bp
+from api.subinterfaces import subinterfaces_bp
+from api.fleet import fleet_bp
 
 # Import VPP teardown initializer
 from vpp_connection import init_vpp_teardown
+from json_provider import init_json_provider
+from vpp_trace import init_vpp_trace
+from vpp_profile import init_profiler
+from vpp_logging import init_logging
+from nat_index import init_nat_indexer
+from nat_export import init_nat_exporter
+from counter_store import init_counter_store
+from alerts import init_alerts
+from vpp_watchdog import init_vpp_watchdog
+from route_index import init_route_indexer
+from vpp_fleet import init_fleet
 
 
 def create_app():
     app = Flask(__name__)
+    init_logging(app)
     CORS(app)
+    init_json_provider(app)
 
     # Register all blueprints (no route changes!)
     app.register_blueprint(interfaces_bp)
@@ -26,10 +44,42 @@ def create_app():
     app.register_blueprint(stats_bp)
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(dhcp_bp)
+    app.register_blueprint(debug_bp)
+    app.register_blueprint(alerts_bp)
+    app.register_blueprint(config_bp)
+    app.register_blueprint(subinterfaces_bp)
+    app.register_blueprint(fleet_bp)
 
     # Register per-request VPP teardown cleanup
     init_vpp_teardown(app)
 
+    # Per-request VPP target selection and the fleet registry (VPP_FLEET_FILE)
+    init_fleet(app)
+
+    # Server-Timing headers / trace logs when VPP_TRACE is enabled
+    init_vpp_trace(app)
+
+    # ?profile= and the rolling sampler (both opt-in)
+    init_profiler(app)
+
+    # Background NAT session index (VPP_NAT_INDEX=1)
+    init_nat_indexer(app)
+
+    # Background refresh of the route LPM index (VPP_ROUTE_INDEX=1)
+    init_route_indexer(app)
+
+    # Periodic columnar NAT session exports (VPP_NAT_EXPORT_INTERVAL > 0)
+    init_nat_exporter(app)
+
+    # Memory-mapped interface counter history (VPP_COUNTER_STORE=1)
+    init_counter_store(app)
+
+    # Threshold / anomaly alerting (VPP_ALERTS=1)
+    init_alerts(app)
+
+    # Restart detection + replay of the last applied config (VPP_WATCHDOG=1)
+    init_vpp_watchdog(app)
+
     # Frontend route untouched
     @app.route('/')
     def index():
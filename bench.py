@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+API Benchmark Suite
+Drives every blueprint endpoint against the VPP simulator (vpp_sim) at
+increasing dataset sizes and records latency, throughput, memory growth
+and VPP API calls per request. Timed requests run cold (response caches
+dropped first) unless --warm is given.
+
+    python bench.py                                 # default scales, writes bench_results.json
+    python bench.py --warm                          # measure cache hits instead
+    python bench.py --scales 1,10,100 --iterations 50
+    python bench.py --compare old_results.json      # exit 1 on p50 regressions
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+ENDPOINTS = [
+    "/api/interfaces",
+    "/api/interfaces/stats",
+    "/api/interfaces/cli-stats",
+    "/api/routes",
+    "/api/acls",
+    "/api/nat/plugin",
+    "/api/nat/interfaces",
+    "/api/nat/addresses",
+    "/api/nat/sessions",
+    "/api/nat/static",
+    "/api/dashboard/stats",
+    "/api/dhcp/plugin",
+    "/api/dhcp/clients",
+    "/api/dhcp/proxy",
+]
+
+# Dataset size at scale 1; every field is multiplied by the scale factor
+BASE_DATASET = {
+    "VPP_SIM_INTERFACES": 16,
+    "VPP_SIM_ROUTES": 1000,
+    "VPP_SIM_ACLS": 10,
+    "VPP_SIM_NAT_USERS": 100,
+    "VPP_SIM_STATIC_MAPPINGS": 20,
+    "VPP_SIM_DHCP_CLIENTS": 4,
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def peak_rss_kb():
+    """Peak RSS of the whole worker process so far (it never goes down)."""
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Worker: runs inside a fresh interpreter for one dataset scale
+# ---------------------------------------------------------------------------
+
+def count_api_calls():
+    """Wrap every simulated API message so calls can be counted per request."""
+    import vpp_sim
+
+    counter = {"calls": 0}
+    lock = threading.Lock()
+
+    def wrap(fn):
+        def counted(*args, **kwargs):
+            with lock:
+                counter["calls"] += 1
+            return fn(*args, **kwargs)
+        return counted
+
+    for name, fn in list(vars(vpp_sim._SimApi).items()):
+        if callable(fn) and not name.startswith("_"):
+            setattr(vpp_sim._SimApi, name, wrap(fn))
+    return counter
+
+
+def drop_caches():
+    from vpp_cache import config_cache, dump_flight
+    config_cache.clear()
+    dump_flight.invalidate()
+
+
+def run_endpoint(client, counter, path, iterations, concurrency, cold=False):
+    latencies = []
+    calls = []
+    status = None
+
+    client.get(path)  # warm-up: imports, decoders and (with --warm) the response caches
+
+    for _ in range(iterations):
+        if cold:
+            drop_caches()
+        before = counter["calls"]
+        start = time.perf_counter()
+        response = client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        calls.append(counter["calls"] - before)
+        status = response.status_code
+
+    # Throughput with several concurrent clients
+    from app import app
+    per_thread = max(1, iterations // concurrency)
+
+    def hammer():
+        c = app.test_client()
+        for _ in range(per_thread):
+            c.get(path)
+
+    threads = [threading.Thread(target=hammer) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "status": status,
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "throughput_rps": round(per_thread * concurrency / elapsed, 2) if elapsed else None,
+        "concurrency": concurrency,
+        "vpp_api_calls": max(calls) if calls else 0,
+    }
+
+
+def worker(args):
+    # stdout carries the JSON results; send anything else written there to stderr
+    out = sys.stdout
+    sys.stdout = sys.stderr
+
+    counter = count_api_calls()
+    from app import app
+    client = app.test_client()
+
+    results = {}
+    for path in args.endpoints:
+        rss_before = peak_rss_kb()
+        results[path] = run_endpoint(client, counter, path, args.iterations, args.concurrency, args.cold)
+        # ru_maxrss is a process-wide high-water mark: report how far this
+        # endpoint pushed it, plus the peak itself for reference
+        process_peak = peak_rss_kb()
+        results[path]["peak_rss_growth_kb"] = (process_peak - rss_before) if rss_before is not None else None
+        results[path]["process_peak_rss_kb"] = process_peak
+        print(f"  {path:<32} p50={results[path]['p50_ms']:>9.2f}ms  p99={results[path]['p99_ms']:>9.2f}ms  "
+              f"calls={results[path]['vpp_api_calls']}", file=sys.stderr)
+
+    json.dump(results, out)
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def run_scale(scale, args):
+    env = dict(os.environ)
+    env["VPP_SIMULATOR"] = "1"
+    for name, base in BASE_DATASET.items():
+        env[name] = str(base * scale)
+
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker",
+           "--iterations", str(args.iterations),
+           "--concurrency", str(args.concurrency),
+           "--cold" if args.cold else "--warm",
+           "--endpoints", ",".join(args.endpoints)]
+    proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        raise RuntimeError(f"benchmark worker for scale {scale} failed")
+
+    return {
+        "scale": scale,
+        "dataset": {name: base * scale for name, base in BASE_DATASET.items()},
+        "endpoints": json.loads(proc.stdout),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """Print p50 regressions above threshold percent; return True if any were found."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    old = {(r["scale"], path): m for r in baseline["runs"] for path, m in r["endpoints"].items()}
+    regressed = False
+    for run in results["runs"]:
+        for path, m in run["endpoints"].items():
+            prev = old.get((run["scale"], path))
+            if not prev or not prev["p50_ms"]:
+                continue
+            change = (m["p50_ms"] - prev["p50_ms"]) / prev["p50_ms"] * 100.0
+            if change > threshold:
+                regressed = True
+                print(f"REGRESSION scale={run['scale']} {path}: p50 {prev['p50_ms']}ms -> {m['p50_ms']}ms (+{change:.0f}%)")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the VPP GUI API against the simulator")
+    parser.add_argument("--scales", default="1,10", help="comma separated dataset scale factors")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="previous results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=20.0, help="allowed p50 slowdown in percent")
+    parser.add_argument("--warm", dest="cold", action="store_false",
+                        help="keep the response caches between timed requests (default: drop them before each)")
+    parser.add_argument("--cold", dest="cold", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.set_defaults(cold=True)
+    args = parser.parse_args()
+    args.endpoints = [e for e in args.endpoints.split(",") if e]
+
+    if args.worker:
+        worker(args)
+        return
+
+    results = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "concurrency": args.concurrency,
+        "cold": args.cold,
+        "runs": [],
+    }
+
+    for scale in (int(s) for s in args.scales.split(",")):
+        print(f"Scale x{scale} ({'cold' if args.cold else 'warm'} caches):", file=sys.stderr)
+        results["runs"].append(run_scale(scale, args))
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import io
+from flask import current_app, jsonify, request
+
+# All binary encoders are optional -- a format is only offered if its library is installed
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+BINARY_MIMETYPES = {
+    'msgpack': 'application/msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'npz': 'application/x-npz',
+}
+
+_REQUIRED_LIBS = {
+    'msgpack': ('msgpack', lambda: msgpack),
+    'arrow': ('pyarrow', lambda: pa),
+    'npz': ('numpy', lambda: np),
+}
+
+# Column schemas for the bulk tables (Arrow type aliases, also valid numpy dtypes except 'string')
+INTERFACE_COUNTER_SCHEMA = {
+    'name': 'string',
+    'rx_bytes': 'uint64',
+    'tx_bytes': 'uint64',
+    'rx_packets': 'uint64',
+    'tx_packets': 'uint64',
+    'drops': 'uint64',
+}
+
+INTERFACE_HISTORY_SCHEMA = {
+    'ts': 'uint64',
+    'rx_bytes': 'uint64',
+    'tx_bytes': 'uint64',
+    'rx_packets': 'uint64',
+    'tx_packets': 'uint64',
+    'drops': 'uint64',
+}
+
+NAT_SESSION_SCHEMA = {
+    'inside_ip': 'string',
+    'inside_port': 'uint16',
+    'outside_ip': 'string',
+    'outside_port': 'uint16',
+    'protocol': 'uint8',
+}
+
+
+def negotiate_format():
+    """
+    Pick the response format from ?format= or the Accept header.
+    Returns 'json' unless the client explicitly asked for a binary format.
+    """
+    fmt = request.args.get('format')
+    if fmt in BINARY_MIMETYPES:
+        return fmt
+
+    best = request.accept_mimetypes.best_match(
+        ['application/json'] + list(BINARY_MIMETYPES.values()),
+        default='application/json'
+    )
+    for name, mimetype in BINARY_MIMETYPES.items():
+        if best == mimetype:
+            return name
+    return 'json'
+
+
+def sum_thread_counters(threads, n, field=None):
+    """
+    Sum a per-thread stats-segment counter vector into one total per interface.
+    Uses a contiguous uint64 numpy array when numpy is installed, so the
+    binary encoders can hand its buffer straight to the response.
+    """
+    if np is not None:
+        total = np.zeros(n, dtype=np.uint64)
+        for th in threads or []:
+            values = (c[field] for c in th[:n]) if field else iter(th[:n])
+            total += np.fromiter(values, dtype=np.uint64, count=n)
+        return total
+
+    total = [0] * n
+    for th in threads or []:
+        for i in range(n):
+            total[i] += th[i][field] if field else th[i]
+    return total
+
+
+def as_list(column):
+    """Plain Python list of a column, whichever way it was built."""
+    return column.tolist() if np is not None and isinstance(column, np.ndarray) else list(column)
+
+
+def _encode_msgpack(columns, count):
+    return msgpack.packb({
+        'count': count,
+        'columns': {name: as_list(col) for name, col in columns.items()}
+    })
+
+
+def _encode_arrow(columns, schema):
+    # pa.array() wraps numpy counter arrays without copying them
+    arrays = []
+    for name, col in columns.items():
+        arrays.append(pa.array(col, type=pa.type_for_alias(schema[name])))
+    batch = pa.record_batch(arrays, names=list(columns))
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def _encode_npz(columns, schema):
+    arrays = {}
+    for name, col in columns.items():
+        dtype = str if schema[name] == 'string' else schema[name]
+        arrays[name] = np.asarray(col, dtype=dtype)
+
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def columns_response(fmt, columns, schema):
+    """
+    Encode a column table ({name: list or numpy array}) as msgpack, Arrow IPC
+    stream or .npz. Returns 406 if the encoder for fmt is not installed.
+    """
+    lib_name, lib = _REQUIRED_LIBS[fmt]
+    if lib() is None:
+        return jsonify({'error': f'{fmt} format requires the {lib_name} package'}), 406
+
+    count = len(next(iter(columns.values()))) if columns else 0
+    if fmt == 'msgpack':
+        body = _encode_msgpack(columns, count)
+    elif fmt == 'arrow':
+        body = _encode_arrow(columns, schema)
+    else:
+        body = _encode_npz(columns, schema)
+
+    return current_app.response_class(body, mimetype=BINARY_MIMETYPES[fmt])
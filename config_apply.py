@@ -0,0 +1,791 @@
+"""
+Desired-state configuration apply.
+
+POST /api/config/apply takes one document describing interfaces, routes,
+ACLs, NAT and DHCP:
+
+    {
+      "prune": true,
+      "interfaces": [{"name": "GigabitEthernet0/0/0", "up": true, "addresses": ["10.0.0.1/24"]},
+                     {"name": "GigabitEthernet0/0/0.100", "up": true,
+                      "subif": {"parent": "GigabitEthernet0/0/0", "sub_id": 100, "outer_vlan": 100}},
+                     {"name": "loop0", "loopback": true, "addresses": ["192.0.2.1/24"]}],
+      "routes": [{"destination": "10.1.0.0/16", "next_hop": "10.0.0.254",
+                  "interface": "GigabitEthernet0/0/0"}],
+      "acls": [{"tag": "web", "rules": [{"action": "permit", "dst_port_min": 443, ...}]}],
+      "acl_bindings": [{"interface": "GigabitEthernet0/0/0", "input": ["web"], "output": []}],
+      "nat": {"enabled": true,
+              "interfaces": [{"interface": "GigabitEthernet0/0/1", "inside": false}],
+              "addresses": ["203.0.113.10"],
+              "static": [{"local_ip": "10.0.0.5", "external_ip": "203.0.113.10",
+                          "local_port": 80, "external_port": 8080, "protocol": 6}]},
+      "dhcp": {"clients": [{"interface": "GigabitEthernet0/0/2", "hostname": "edge"}]},
+      "bridges": [{"bd_id": 10, "members": [{"interface": "GigabitEthernet0/0/0.100"},
+                                            {"interface": "loop0", "bvi": true}]}]
+    }
+
+Only the sections present are managed. Sub-interfaces ("subif") and
+loopbacks ("loopback", named loopN) listed under interfaces are created
+when missing; they are created first and the rest of the document is
+planned against the new sw_if_indexes. With "prune" (the default) items
+missing from a managed section are removed; interfaces themselves are
+never deleted and only static routes (API-sourced, with a next hop) are
+pruned -- connected, receive, adjacency and routing-daemon routes are
+left alone.
+
+The current state is dumped in parallel, diffed into a minimal list of
+changes, and the changes run phase by phase in dependency order (removals
+of dependents first, then interfaces -> addresses -> routes, ACLs ->
+bindings, NAT plugin -> NAT interfaces / pool / static mappings). Changes
+within a phase are independent, so they are split into batches that run
+concurrently on a few worker connections.
+"""
+import ipaddress
+import logging
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from api.acls import build_acl_rule
+from api.routes import build_route_request
+from vpp_cache import config_cache, dump_flight
+from vpp_connection import DEFAULT_TARGET, connect_vpp, disconnect_vpp
+from vpp_records import AclRule, StaticMapping, NatAddress, decode, decode_all
+from vpp_address import ZERO, encode_prefix, family, format_nh, format_prefix, is_zero, parse_address, parse_ip4
+
+log = logging.getLogger(__name__)
+
+VPP_CONFIG_WORKERS = int(os.environ.get("VPP_CONFIG_WORKERS", "4"))
+VPP_CONFIG_BATCH = int(os.environ.get("VPP_CONFIG_BATCH", "32"))
+
+ALL_ACLS = 0xFFFFFFFF
+ANY_INTERFACE = 0xFFFFFFFF
+NAT_IF_INSIDE = 0x20
+NAT_IF_OUTSIDE = 0x10
+NAT_IF_CONNECTION_TRACKING = 0x02
+
+# fib_path_type_t: everything but NORMAL (receive/local, drop, icmp-*, dvr, ...) is VPP's own
+FIB_PATH_TYPE_NORMAL = 0
+# FIB source that ip_route_add_del installs routes with, as named by fib_source_dump
+FIB_SOURCE_API = "API"
+
+ALL_BRIDGES = 0xFFFFFFFF
+
+# vl_api_sub_if_flags_t
+SUB_IF_ONE_TAG = 0x02
+SUB_IF_TWO_TAGS = 0x04
+SUB_IF_EXACT_MATCH = 0x10
+
+L2_API_PORT_TYPE_NORMAL = 0
+L2_API_PORT_TYPE_BVI = 1
+
+SECTIONS = ("interfaces", "routes", "acls", "acl_bindings", "nat", "dhcp", "bridges")
+
+# Execution order. Removals of things that depend on others come first.
+PHASES = (
+    "nat_static_del", "nat_addresses_del", "nat_interfaces_del", "dhcp_del", "bridge_del",
+    "routes_del", "addresses_del", "interfaces_delete",
+    "interfaces_create", "interfaces",
+    "addresses_add", "bridge_add", "routes_add",
+    "acls", "acl_bindings", "acls_del",
+    "nat_plugin",
+    "nat_interfaces_add", "nat_addresses_add", "nat_static_add",
+    "dhcp_add",
+)
+
+# Dumps that go stale after an apply
+DUMP_MESSAGES = (
+    "sw_interface_dump", "ip_address_dump", "ip_route_dump", "acl_dump", "acl_interface_list_dump",
+    "nat44_interface_dump", "nat44_address_dump", "nat44_static_mapping_dump",
+)
+
+# Last successfully applied document per VPP target name, for replays:
+# {"document", "applied_at"}
+last_applied = {}
+
+# Stand-in for an interface the document creates, until it exists (negative sw_if_index)
+PendingInterface = namedtuple("PendingInterface", "sw_if_index interface_name flags")
+
+
+class Change:
+    """One VPP API call in the plan. kwargs may be a callable taking the apply context."""
+
+    __slots__ = ("phase", "action", "target", "msg", "kwargs", "on_reply")
+
+    def __init__(self, phase, action, target, msg, kwargs, on_reply=None):
+        self.phase = phase
+        self.action = action
+        self.target = target
+        self.msg = msg
+        self.kwargs = kwargs
+        self.on_reply = on_reply
+
+    def describe(self):
+        return {"phase": self.phase, "action": self.action, "target": self.target}
+
+    def run(self, v, ctx):
+        kwargs = self.kwargs(ctx) if callable(self.kwargs) else self.kwargs
+        reply = getattr(v.api, self.msg)(**kwargs)
+        retval = getattr(reply, "retval", 0)
+        if retval:
+            raise RuntimeError(f"{self.msg} returned {retval}")
+        if self.on_reply is not None:
+            self.on_reply(ctx, reply)
+
+
+class ApiWorkers:
+    """
+    Runs functions over a few threads that each hold their own VPP connection
+    (API clients are not shared between threads). With one worker everything
+    runs inline on the caller's connection.
+    """
+
+    def __init__(self, v, workers):
+        self.v = v
+        self.workers = max(workers, 1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="vpp-config") \
+            if self.workers > 1 else None
+
+    def _connection(self):
+        v = getattr(self._local, "v", None)
+        if v is None:
+            v = self._local.v = connect_vpp("vpp-gui-config", getattr(self.v, "target", None))
+            with self._lock:
+                self._connections.append(v)
+        return v
+
+    def map(self, fn, items):
+        """[fn(v, item) for item in items], concurrently when there are workers."""
+        if self._executor is None or len(items) < 2:
+            return [fn(self.v, item) for item in items]
+        return list(self._executor.map(lambda item: fn(self._connection(), item), items))
+
+    def as_completed(self, fn, items):
+        """Yield (item, fn(v, item)) in completion order, so callers can stream results."""
+        if self._executor is None or len(items) < 2:
+            for item in items:
+                yield item, fn(self.v, item)
+            return
+        futures = {self._executor.submit(lambda item: fn(self._connection(), item), item): item
+                   for item in items}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+        for v in self._connections:
+            disconnect_vpp(v)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# Current state
+# ---------------------------------------------------------------------------
+
+def _text(value):
+    return value if isinstance(value, str) else value.decode(errors="ignore")
+
+
+def _address_strings(addrs):
+    return {format_prefix(addr.prefix) for addr in addrs}
+
+
+def _static_routes(routes, source=None):
+    """
+    {(destination, next_hop, sw_if_index)} for the normal paths of routes.
+    With the API FIB source id (ip_route_v2_dump) other sources are skipped;
+    without it, host routes via their own address (ARP / ND adjacencies)
+    are the only other ones that can be told apart.
+    """
+    result = set()
+    for route in routes:
+        route = route.route
+        if source is not None and int(getattr(route, "src", source)) != source:
+            continue
+        dst = format_prefix(route.prefix)
+        network = ipaddress.ip_network(dst, strict=False)
+        host = network.prefixlen == network.max_prefixlen
+        for path in route.paths:
+            if int(getattr(path, "type", FIB_PATH_TYPE_NORMAL)) != FIB_PATH_TYPE_NORMAL:
+                continue
+            if hasattr(path.nh, "address"):
+                nh = format_nh(path)
+            else:
+                nh = ZERO[network.version]
+            if source is None and host and nh == str(network.network_address):
+                continue
+            result.add((dst, nh, int(path.sw_if_index)))
+    return result
+
+
+def _dump_bridges(v):
+    """{sw_if_index: (bd_id, shg, is_bvi)} for every bridge-domain member."""
+    if not hasattr(v.api, "bridge_domain_dump"):
+        return {}
+    members = {}
+    for bd in v.api.bridge_domain_dump(bd_id=ALL_BRIDGES, sw_if_index=ANY_INTERFACE):
+        for member in bd.sw_if_details[:bd.n_sw_ifs]:
+            i = int(member.sw_if_index)
+            members[i] = (int(bd.bd_id), int(member.shg), i == int(bd.bvi_sw_if_index))
+    return members
+
+
+def _api_fib_source(v):
+    """Id of the API FIB source, or None on VPP without fib_source_dump / ip_route_v2_dump."""
+    if not hasattr(v.api, "fib_source_dump") or not hasattr(v.api, "ip_route_v2_dump"):
+        return None
+    for details in v.api.fib_source_dump():
+        if _text(details.src.name) == FIB_SOURCE_API:
+            return int(details.src.id)
+    return None
+
+
+def _dump_static_routes(v):
+    """Static routes of the default table, both families."""
+    source = _api_fib_source(v)
+    routes = set()
+    for is_ip6 in (0, 1):
+        table = {"table_id": 0, "is_ip6": is_ip6}
+        if source is not None:
+            routes |= _static_routes(v.api.ip_route_v2_dump(src=source, table=table), source)
+        else:
+            routes |= _static_routes(v.api.ip_route_dump(table=table))
+    return routes
+
+
+def _interface_addresses(v, sw_if_index):
+    return (_address_strings(v.api.ip_address_dump(sw_if_index=sw_if_index, is_ipv6=False))
+            | _address_strings(v.api.ip_address_dump(sw_if_index=sw_if_index, is_ipv6=True)))
+
+
+def _rule_key(rule):
+    """Comparable form of an ACL rule, from a dump record or a build_acl_rule() dict."""
+    if isinstance(rule, dict):
+        return (int(rule["is_permit"]), str(rule["src_prefix"]), str(rule["dst_prefix"]), int(rule["proto"]),
+                int(rule["srcport_or_icmptype_first"]), int(rule["srcport_or_icmptype_last"]),
+                int(rule["dstport_or_icmpcode_first"]), int(rule["dstport_or_icmpcode_last"]))
+    r = decode(AclRule, rule)
+    return (r.is_permit, str(ipaddress.ip_network(r.src_prefix, strict=False)),
+            str(ipaddress.ip_network(r.dst_prefix, strict=False)), r.proto,
+            r.src_port_min, r.src_port_max, r.dst_port_min, r.dst_port_max)
+
+
+def _static_key(local_ip, local_port, external_ip, external_port, protocol):
+    local_port, external_port = int(local_port or 0), int(external_port or 0)
+    # address-only mappings are dumped with protocol 0 whatever they were added with
+    protocol = int(protocol or 0) if local_port or external_port else 0
+    return (str(local_ip), local_port, str(external_ip), external_port, protocol)
+
+
+def dump_state(workers, doc, all_addresses=False):
+    """
+    Dump everything the document's sections need, in parallel. Addresses are
+    read for the interfaces the document manages, or all with all_addresses.
+    """
+    wanted = {"interfaces": lambda v: list(v.api.sw_interface_dump())}
+    if "routes" in doc:
+        wanted["routes"] = _dump_static_routes
+    if "acls" in doc or "acl_bindings" in doc:
+        wanted["acls"] = lambda v: list(v.api.acl_dump(acl_index=ALL_ACLS))
+        wanted["acl_bindings"] = lambda v: list(v.api.acl_interface_list_dump(sw_if_index=ALL_ACLS))
+    if "nat" in doc:
+        wanted["nat_running"] = lambda v: v.api.nat44_show_running_config()
+        wanted["nat_interfaces"] = lambda v: list(v.api.nat44_interface_dump())
+        wanted["nat_addresses"] = lambda v: decode_all(NatAddress, v.api.nat44_address_dump())
+        wanted["nat_static"] = lambda v: decode_all(StaticMapping, v.api.nat44_static_mapping_dump())
+    if "dhcp" in doc:
+        wanted["dhcp_clients"] = lambda v: list(v.api.dhcp_client_dump())
+    if "bridges" in doc:
+        wanted["bridges"] = _dump_bridges
+
+    names = list(wanted)
+    state = dict(zip(names, workers.map(lambda v, name: wanted[name](v), names)))
+
+    state["by_name"] = {iface.interface_name: int(iface.sw_if_index) for iface in state["interfaces"]}
+    state["by_index"] = {int(iface.sw_if_index): iface for iface in state["interfaces"]}
+
+    # interfaces the document creates get a placeholder until they exist
+    state["pending"] = {}
+    for item in doc.get("interfaces", []):
+        name = item.get("name")
+        if ("subif" in item or item.get("loopback")) and name not in state["by_name"]:
+            i = -1 - len(state["pending"])
+            state["pending"][name] = i
+            state["by_name"][name] = i
+            state["by_index"][i] = PendingInterface(i, name, 0)
+
+    # second stage: addresses of the interfaces whose addresses are managed
+    if all_addresses:
+        managed = sorted(state["by_index"])
+    else:
+        managed = [_resolve(state, item) for item in doc.get("interfaces", []) if "addresses" in item]
+        managed = [i for i in managed if i >= 0]
+    addresses = workers.map(_interface_addresses, managed)
+    state["addresses"] = dict(zip(managed, addresses))
+    return state
+
+
+def _resolve(state, item, key="interface"):
+    """sw_if_index of the interface an item refers to by name or sw_if_index."""
+    if "sw_if_index" in item:
+        i = int(item["sw_if_index"])
+        if i not in state["by_index"]:
+            raise ValueError(f"unknown sw_if_index {i}")
+        return i
+    name = item.get(key) or item.get("name")
+    if name not in state["by_name"]:
+        raise ValueError(f"unknown interface {name!r}")
+    return state["by_name"][name]
+
+
+def _if_name(state, sw_if_index):
+    iface = state["by_index"].get(sw_if_index)
+    return iface.interface_name if iface is not None else f"if{sw_if_index}"
+
+
+# ---------------------------------------------------------------------------
+# Diff
+# ---------------------------------------------------------------------------
+
+def _create_change(state, item):
+    """The create_subif / create_loopback_instance call for an interface the document adds."""
+    name = item["name"]
+    if "subif" in item:
+        spec = item["subif"]
+        parent = _resolve(state, spec, key="parent")
+        if parent < 0:
+            raise ValueError(f"parent of {name} must exist before the sub-interface is created")
+        sub_id = int(spec["sub_id"])
+        if name != f"{_if_name(state, parent)}.{sub_id}":
+            raise ValueError(f"sub-interface {name!r} must be named <parent>.{sub_id}")
+        outer, inner = int(spec.get("outer_vlan", sub_id)), int(spec.get("inner_vlan", 0))
+        flags = (SUB_IF_TWO_TAGS if inner else SUB_IF_ONE_TAG) | SUB_IF_EXACT_MATCH
+        return Change("interfaces_create", "create", name, "create_subif",
+                      {"sw_if_index": parent, "sub_id": sub_id, "outer_vlan_id": outer,
+                       "inner_vlan_id": inner, "sub_if_flags": flags})
+
+    instance = re.fullmatch(r"loop(\d+)", name or "")
+    if instance is None:
+        raise ValueError(f"loopback {name!r} must be named loopN")
+    return Change("interfaces_create", "create", name, "create_loopback_instance",
+                  {"is_specified": True, "user_instance": int(instance.group(1))})
+
+
+def _plan_interfaces(doc, state, prune, changes):
+    for item in doc.get("interfaces", []):
+        i = _resolve(state, item)
+        name = _if_name(state, i)
+        if i < 0:
+            changes.append(_create_change(state, item))
+        if "up" in item:
+            up = bool(item["up"])
+            if bool(state["by_index"][i].flags & 1) != up:
+                changes.append(Change("interfaces", "up" if up else "down", name,
+                                      "sw_interface_set_flags", {"sw_if_index": i, "flags": 1 if up else 0}))
+        if "addresses" in item:
+            want = {str(ipaddress.ip_interface(a)) for a in item["addresses"]}
+            have = state["addresses"].get(i, set())
+            for cidr in sorted(want - have):
+                changes.append(Change("addresses_add", "add", f"{name} {cidr}", "sw_interface_add_del_address",
+                                      {"sw_if_index": i, "is_add": 1, "prefix": encode_prefix(cidr), "del_all": 0}))
+            if prune:
+                for cidr in sorted(have - want):
+                    changes.append(Change("addresses_del", "delete", f"{name} {cidr}",
+                                          "sw_interface_add_del_address",
+                                          {"sw_if_index": i, "is_add": 0, "prefix": encode_prefix(cidr), "del_all": 0}))
+
+
+def _route_change(v, phase, action, dst, nh, sw_if_index):
+    network = ipaddress.ip_network(dst, strict=False)
+    msg, route = build_route_request(v, str(network.network_address), network.prefixlen, sw_if_index, nh)
+    return Change(phase, action, f"{network} via {nh}", msg,
+                  {"is_add": 1 if action == "add" else 0, "is_multipath": True, "route": route})
+
+
+def _plan_routes(v, doc, state, prune, changes):
+    if "routes" not in doc:
+        return
+    have = state["routes"]
+    have_any_if = {(dst, nh) for dst, nh, _i in have}
+    wanted = set()
+    for item in doc["routes"]:
+        dst = item["destination"]
+        if "/" not in dst:
+            dst = f"{dst}/{int(item.get('prefix_len', 128 if family(dst) == 6 else 32))}"
+        network = ipaddress.ip_network(dst, strict=False)
+        dst = str(network)
+        nh = item.get("next_hop") or "direct"
+        nh = ZERO[network.version] if nh == "direct" else str(parse_address(nh))
+        has_if = "interface" in item or "sw_if_index" in item
+        sw_if_index = _resolve(state, item) if has_if else ANY_INTERFACE
+        wanted.add((dst, nh, sw_if_index))
+        present = (dst, nh, sw_if_index) in have if has_if else (dst, nh) in have_any_if
+        if not present:
+            changes.append(_route_change(v, "routes_add", "add", dst, nh, sw_if_index))
+
+    if prune:
+        wanted_any_if = {(dst, nh) for dst, nh, i in wanted if i == ANY_INTERFACE}
+        for dst, nh, sw_if_index in sorted(have):
+            if is_zero(nh) or (dst, nh, sw_if_index) in wanted or (dst, nh) in wanted_any_if:
+                continue
+            changes.append(_route_change(v, "routes_del", "delete", dst, nh, sw_if_index))
+
+
+def _plan_acls(doc, state, prune, changes):
+    if "acls" not in doc and "acl_bindings" not in doc:
+        return
+
+    by_tag = {}
+    for acl in state["acls"]:
+        by_tag.setdefault(_text(acl.tag), acl)
+
+    desired_tags = set()
+    for item in doc.get("acls", []):
+        tag = item["tag"]
+        desired_tags.add(tag)
+        rules = [build_acl_rule(rule) for rule in item.get("rules", [])]
+        current = by_tag.get(tag)
+        if current is not None:
+            if [_rule_key(r) for r in current.r] == [_rule_key(r) for r in rules]:
+                continue
+            acl_index, action = int(current.acl_index), "replace"
+        else:
+            acl_index, action = ALL_ACLS, "create"
+
+        def remember(ctx, reply, tag=tag):
+            ctx["acl_index"][tag] = int(reply.acl_index)
+
+        changes.append(Change("acls", action, tag, "acl_add_replace",
+                              {"acl_index": acl_index, "tag": tag, "count": len(rules), "r": rules},
+                              on_reply=remember))
+
+    # ACLs to delete: every ACL that is not the kept one for a desired tag
+    removed = set()
+    if "acls" in doc and prune:
+        for acl in state["acls"]:
+            tag = _text(acl.tag)
+            if tag not in desired_tags or by_tag[tag] is not acl:
+                removed.add(int(acl.acl_index))
+
+    # Bindings: as documented, else as now; pruned ACLs are always unbound first
+    current_bindings = {int(b.sw_if_index): (list(b.acls[:b.n_input]), list(b.acls[b.n_input:]))
+                        for b in state["acl_bindings"]}
+    desired_bindings = {i: (list(inp), list(out)) for i, (inp, out) in current_bindings.items()}
+    if "acl_bindings" in doc:
+        if prune:
+            desired_bindings = {}
+        for item in doc["acl_bindings"]:
+            desired_bindings[_resolve(state, item)] = (list(item.get("input", [])), list(item.get("output", [])))
+
+    index_by_tag = {tag: int(acl.acl_index) for tag, acl in by_tag.items()}
+
+    def resolve_tags(entries, ctx=None):
+        resolved = []
+        for entry in entries:
+            if isinstance(entry, int):
+                resolved.append(entry)
+            elif ctx is not None and entry in ctx["acl_index"]:
+                resolved.append(ctx["acl_index"][entry])
+            elif entry in index_by_tag:
+                resolved.append(index_by_tag[entry])
+            elif ctx is None and entry in desired_tags:
+                return None          # created during this apply, index known only then
+            else:
+                raise ValueError(f"unknown ACL {entry!r} in acl_bindings")
+        return [a for a in resolved if a not in removed]
+
+    for sw_if_index in sorted(set(current_bindings) | set(desired_bindings)):
+        inp, out = desired_bindings.get(sw_if_index, ([], []))
+        planned = (resolve_tags(inp), resolve_tags(out))
+        if None not in planned and planned == current_bindings.get(sw_if_index, ([], [])):
+            continue
+
+        def binding_args(ctx, sw_if_index=sw_if_index, inp=inp, out=out):
+            acl_in, acl_out = resolve_tags(inp, ctx), resolve_tags(out, ctx)
+            return {"sw_if_index": sw_if_index, "count": len(acl_in) + len(acl_out),
+                    "n_input": len(acl_in), "acls": acl_in + acl_out}
+
+        changes.append(Change("acl_bindings", "set", _if_name(state, sw_if_index),
+                              "acl_interface_set_acl_list", binding_args))
+
+    for acl_index in sorted(removed):
+        changes.append(Change("acls_del", "delete", str(acl_index), "acl_del", {"acl_index": acl_index}))
+
+
+def _nat_address_args(ip, is_add):
+    ip = parse_ip4(ip)
+    return {"first_ip_address": ip, "last_ip_address": ip, "vrf_id": 0, "is_add": is_add, "flags": 0}
+
+
+def _nat_static_args(key, is_add):
+    local_ip, local_port, external_ip, external_port, protocol = key
+    return {"is_add": is_add, "local_ip_address": parse_ip4(local_ip),
+            "external_ip_address": parse_ip4(external_ip),
+            "local_port": local_port, "external_port": external_port, "protocol": protocol,
+            "vrf_id": 0, "external_sw_if_index": 0xFFFFFFFF, "flags": 0}
+
+
+def _plan_nat(doc, state, prune, changes):
+    nat = doc.get("nat")
+    if nat is None:
+        return
+
+    # same heuristic as GET /api/nat/plugin
+    running = state["nat_running"]
+    enabled = bool(getattr(running, "sessions", 0) or state["nat_interfaces"] or state["nat_addresses"])
+    want_enabled = bool(nat.get("enabled", True))
+    if want_enabled != enabled:
+        changes.append(Change("nat_plugin", "enable" if want_enabled else "disable", "nat44",
+                              "nat44_ed_plugin_enable_disable", {"enable": want_enabled}))
+    if not want_enabled:
+        return
+
+    if "interfaces" in nat:
+        have = {int(n.sw_if_index): int(n.flags) for n in state["nat_interfaces"]}
+        want = {}
+        for item in nat["interfaces"]:
+            side = NAT_IF_INSIDE if item.get("inside", True) else NAT_IF_OUTSIDE
+            want[_resolve(state, item)] = side | NAT_IF_CONNECTION_TRACKING
+        for i, flags in sorted(want.items()):
+            current = have.get(i)
+            if current is not None and current & (NAT_IF_INSIDE | NAT_IF_OUTSIDE) == flags & (NAT_IF_INSIDE | NAT_IF_OUTSIDE):
+                continue
+            if current is not None:
+                changes.append(Change("nat_interfaces_del", "delete", _if_name(state, i),
+                                      "nat44_interface_add_del_feature",
+                                      {"sw_if_index": i, "is_add": 0, "flags": current}))
+            side = "inside" if flags & NAT_IF_INSIDE else "outside"
+            changes.append(Change("nat_interfaces_add", f"add {side}", _if_name(state, i),
+                                  "nat44_interface_add_del_feature", {"sw_if_index": i, "is_add": 1, "flags": flags}))
+        if prune:
+            for i, flags in sorted(have.items()):
+                if i not in want:
+                    changes.append(Change("nat_interfaces_del", "delete", _if_name(state, i),
+                                          "nat44_interface_add_del_feature",
+                                          {"sw_if_index": i, "is_add": 0, "flags": flags}))
+
+    if "addresses" in nat:
+        have = {a.ip_address for a in state["nat_addresses"]}
+        want = {str(parse_ip4(a)) for a in nat["addresses"]}
+        for ip in sorted(want - have):
+            changes.append(Change("nat_addresses_add", "add", ip, "nat44_add_del_address_range",
+                                  _nat_address_args(ip, 1)))
+        if prune:
+            for ip in sorted(have - want):
+                changes.append(Change("nat_addresses_del", "delete", ip, "nat44_add_del_address_range",
+                                      _nat_address_args(ip, 0)))
+
+    if "static" in nat:
+        have = {_static_key(m.local_ip, m.local_port, m.external_ip, m.external_port, m.protocol)
+                for m in state["nat_static"]}
+        want = {_static_key(m["local_ip"], m.get("local_port"), m["external_ip"], m.get("external_port"),
+                            m.get("protocol", 6))
+                for m in nat["static"]}
+        for key in sorted(want - have):
+            changes.append(Change("nat_static_add", "add", f"{key[0]}:{key[1]} -> {key[2]}:{key[3]}",
+                                  "nat44_add_del_static_mapping", _nat_static_args(key, 1)))
+        if prune:
+            for key in sorted(have - want):
+                changes.append(Change("nat_static_del", "delete", f"{key[0]}:{key[1]} -> {key[2]}:{key[3]}",
+                                      "nat44_add_del_static_mapping", _nat_static_args(key, 0)))
+
+
+def _dhcp_client_args(sw_if_index, hostname, is_add):
+    return {"is_add": is_add, "client": {
+        "sw_if_index": sw_if_index, "hostname": hostname[:64], "id": b"",
+        "want_dhcp_event": False, "set_broadcast_flag": False, "dscp": 0, "pid": 0,
+    }}
+
+
+def _plan_dhcp(doc, state, prune, changes):
+    dhcp = doc.get("dhcp")
+    if dhcp is None or "clients" not in dhcp:
+        return
+    have = {int(c.client.sw_if_index): _text(c.client.hostname) for c in state["dhcp_clients"]}
+    want = {_resolve(state, item): item.get("hostname", "") for item in dhcp["clients"]}
+    for i, hostname in sorted(want.items()):
+        if have.get(i) == hostname:
+            continue
+        if i in have:
+            changes.append(Change("dhcp_del", "delete", _if_name(state, i), "dhcp_client_config",
+                                  _dhcp_client_args(i, have[i], False)))
+        changes.append(Change("dhcp_add", "add", _if_name(state, i), "dhcp_client_config",
+                              _dhcp_client_args(i, hostname, True)))
+    if prune:
+        for i, hostname in sorted(have.items()):
+            if i not in want:
+                changes.append(Change("dhcp_del", "delete", _if_name(state, i), "dhcp_client_config",
+                                      _dhcp_client_args(i, hostname, False)))
+
+
+def _bridge_change(phase, state, i, member, enable):
+    bd_id, shg, bvi = member
+    return Change(phase, "add" if enable else "delete", f"{_if_name(state, i)} bridge {bd_id}",
+                  "sw_interface_set_l2_bridge",
+                  {"rx_sw_if_index": i, "bd_id": bd_id, "shg": shg, "enable": enable,
+                   "port_type": L2_API_PORT_TYPE_BVI if bvi else L2_API_PORT_TYPE_NORMAL})
+
+
+def _plan_bridges(doc, state, prune, changes):
+    if "bridges" not in doc:
+        return
+    have = state["bridges"]
+    want = {}
+    for bridge in doc["bridges"]:
+        bd_id = int(bridge["bd_id"])
+        for member in bridge.get("members", []):
+            want[_resolve(state, member)] = (bd_id, int(member.get("shg", 0)), bool(member.get("bvi", False)))
+
+    for i, member in sorted(want.items()):
+        current = have.get(i)
+        if current == member:
+            continue
+        if current is not None:
+            changes.append(_bridge_change("bridge_del", state, i, current, False))
+        changes.append(_bridge_change("bridge_add", state, i, member, True))
+    if prune:
+        for i, current in sorted(have.items()):
+            if i not in want:
+                changes.append(_bridge_change("bridge_del", state, i, current, False))
+
+
+def plan(v, doc, state):
+    """Minimal list of Changes taking state to doc, in PHASES order."""
+    prune = bool(doc.get("prune", True))
+    changes = []
+    _plan_interfaces(doc, state, prune, changes)
+    _plan_bridges(doc, state, prune, changes)
+    _plan_routes(v, doc, state, prune, changes)
+    _plan_acls(doc, state, prune, changes)
+    _plan_nat(doc, state, prune, changes)
+    _plan_dhcp(doc, state, prune, changes)
+    order = {phase: n for n, phase in enumerate(PHASES)}
+    changes.sort(key=lambda c: order[c.phase])
+    return changes
+
+
+# ---------------------------------------------------------------------------
+# Execute
+# ---------------------------------------------------------------------------
+
+def _run_batch(v, batch):
+    changes, ctx = batch
+    results = []
+    for change in changes:
+        try:
+            change.run(v, ctx)
+            results.append(None)
+        except Exception as e:
+            results.append(str(e))
+    return results
+
+
+def execute(workers, changes, batch_size=VPP_CONFIG_BATCH, stop_on_error=True):
+    """
+    Run changes phase by phase. Stops after the first phase with a failure,
+    since later phases may depend on it, unless stop_on_error is False.
+    Returns (results, phase timings ms).
+    """
+    ctx = {"acl_index": {}, "sw_if_index": {}}
+    results = []
+    timings = {}
+    failed = False
+    for phase in PHASES:
+        items = [c for c in changes if c.phase == phase]
+        if not items:
+            continue
+        if failed:
+            results.extend(dict(c.describe(), status="skipped") for c in items)
+            continue
+
+        started = time.perf_counter()
+        batches = [(items[k:k + batch_size], ctx) for k in range(0, len(items), batch_size)]
+        errors = [e for batch_errors in workers.map(_run_batch, batches) for e in batch_errors]
+        timings[phase] = round((time.perf_counter() - started) * 1000.0, 3)
+
+        for change, error in zip(items, errors):
+            entry = change.describe()
+            entry["status"] = "ok" if error is None else "error"
+            if error is not None:
+                entry["error"] = error
+                failed = stop_on_error
+            results.append(entry)
+    return results, timings
+
+
+def apply_config(v, doc, dry_run=False, workers=VPP_CONFIG_WORKERS):
+    """Dump, diff and (unless dry_run) apply a desired-state document."""
+    unknown = set(doc) - set(SECTIONS) - {"prune"}
+    if unknown:
+        raise ValueError(f"unknown sections: {', '.join(sorted(unknown))}")
+
+    started = time.perf_counter()
+    with ApiWorkers(v, workers) as pool:
+        t = time.perf_counter()
+        state = dump_state(pool, doc)
+        dump_ms = (time.perf_counter() - t) * 1000.0
+
+        t = time.perf_counter()
+        changes = plan(v, doc, state)
+        plan_ms = (time.perf_counter() - t) * 1000.0
+
+        if dry_run:
+            results, phase_ms = [c.describe() for c in changes], {}
+        elif state["pending"]:
+            # the rest of the plan needs the new interfaces' real sw_if_indexes:
+            # create them, then dump and plan again
+            creates = [c for c in changes if c.phase == "interfaces_create"]
+            results, phase_ms = execute(pool, creates)
+            if any(r["status"] == "error" for r in results):
+                changes = creates
+            else:
+                dump_flight.invalidate("sw_interface_dump")
+                t = time.perf_counter()
+                state = dump_state(pool, doc)
+                changes = plan(v, doc, state)
+                plan_ms += (time.perf_counter() - t) * 1000.0
+                more, more_ms = execute(pool, changes)
+                results += more
+                phase_ms.update(more_ms)
+                changes = creates + changes
+        else:
+            results, phase_ms = execute(pool, changes)
+
+    if changes and not dry_run:
+        config_cache.invalidate("acls", "routes", "nat_interfaces", "nat_addresses", "nat_static")
+        dump_flight.invalidate(*DUMP_MESSAGES)
+
+    errors = sum(1 for r in results if r.get("status") == "error")
+    # the watchdog replays the default target's one after a restart
+    if not dry_run and not errors:
+        last_applied[getattr(v, "target", DEFAULT_TARGET)] = {"document": doc, "applied_at": time.time()}
+
+    summary = {}
+    for change in changes:
+        summary[change.phase] = summary.get(change.phase, 0) + 1
+
+    return {
+        "dry_run": dry_run,
+        "success": not errors,
+        "changes": results,
+        "summary": summary,
+        "errors": errors,
+        "timings_ms": {
+            "dump": round(dump_ms, 3),
+            "plan": round(plan_ms, 3),
+            "phases": phase_ms,
+            "total": round((time.perf_counter() - started) * 1000.0, 3),
+        },
+    }
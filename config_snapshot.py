@@ -0,0 +1,244 @@
+"""
+Full-configuration snapshots.
+
+A snapshot is the running configuration written as a desired-state
+document (see config_apply): interfaces with admin state and addresses
+(sub-interfaces and loopbacks with what is needed to create them again),
+static routes, ACLs and their bindings, NAT44 interfaces / pool / static
+mappings, DHCP clients and bridge-domain membership. It is stored as one gzip-compressed JSON file
+and restored through apply_config(), so a restore only sends what differs
+and runs in the same parallel, dependency-ordered batches.
+
+Snapshots of every VPP target share one directory; each records the
+target it was taken from, and listing, restoring by name and the
+watchdog's replay only see the snapshots of one target.
+"""
+import gzip
+import ipaddress
+import json
+import os
+import re
+import time
+
+from config_apply import (
+    ApiWorkers, NAT_IF_INSIDE, VPP_CONFIG_WORKERS, _if_name, _text, apply_config, dump_state
+)
+from vpp_address import is_zero
+from vpp_connection import DEFAULT_TARGET
+from vpp_records import AclRule, decode
+
+VPP_CONFIG_SNAPSHOT_DIR = os.environ.get("VPP_CONFIG_SNAPSHOT_DIR", "config_snapshots")
+
+SNAPSHOT_FORMAT = "vpp-gui-config"
+SNAPSHOT_VERSION = 1
+FILE_SUFFIX = ".json.gz"
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9._-]+$")
+_NAME_UNSAFE_RE = re.compile(r"[^A-Za-z0-9._-]")
+_LOOPBACK_RE = re.compile(r"^loop\d+$")
+
+# Everything a snapshot covers; handed to dump_state() to request all sections
+_ALL_SECTIONS = {"routes": [], "acls": [], "acl_bindings": [], "nat": {}, "dhcp": {}, "bridges": []}
+
+
+def _acl_rule_json(rule):
+    """Inverse of build_acl_rule(): one dumped ACL rule as create_acl JSON."""
+    r = decode(AclRule, rule)
+    src = ipaddress.ip_network(r.src_prefix, strict=False)
+    dst = ipaddress.ip_network(r.dst_prefix, strict=False)
+    return {
+        "action": "permit" if r.is_permit else "deny",
+        "src_ip": str(src.network_address), "src_prefix_len": src.prefixlen,
+        "dst_ip": str(dst.network_address), "dst_prefix_len": dst.prefixlen,
+        "proto": r.proto,
+        "src_port_min": r.src_port_min, "src_port_max": r.src_port_max,
+        "dst_port_min": r.dst_port_min, "dst_port_max": r.dst_port_max,
+    }
+
+
+def _acl_tags(acls):
+    """acl_index -> tag; duplicate tags get '#<index>' so bindings stay unambiguous."""
+    tags = {}
+    seen = set()
+    for acl in acls:
+        tag = _text(acl.tag)
+        if tag in seen:
+            tag = f"{tag}#{int(acl.acl_index)}"
+        seen.add(tag)
+        tags[int(acl.acl_index)] = tag
+    return tags
+
+
+def export_config(v, workers=VPP_CONFIG_WORKERS):
+    """The running configuration as a desired-state document."""
+    with ApiWorkers(v, workers) as pool:
+        state = dump_state(pool, _ALL_SECTIONS, all_addresses=True)
+
+    def name(i):
+        return _if_name(state, i)
+
+    interfaces = []
+    for i, iface in sorted(state["by_index"].items()):
+        item = {
+            "name": iface.interface_name,
+            "up": bool(iface.flags & 1),
+            "addresses": sorted(state["addresses"].get(i, ())),
+        }
+        parent = int(iface.sup_sw_if_index)
+        if parent != i:
+            item["subif"] = {"parent": name(parent), "sub_id": int(iface.sub_id),
+                             "outer_vlan": int(iface.sub_outer_vlan_id),
+                             "inner_vlan": int(getattr(iface, "sub_inner_vlan_id", 0))}
+        elif _LOOPBACK_RE.match(iface.interface_name):
+            item["loopback"] = True
+        interfaces.append(item)
+
+    routes = []
+    for dst, nh, sw_if_index in sorted(state["routes"]):
+        if is_zero(nh):
+            continue
+        route = {"destination": dst, "next_hop": nh}
+        if sw_if_index in state["by_index"]:
+            route["interface"] = name(sw_if_index)
+        routes.append(route)
+
+    tags = _acl_tags(state["acls"])
+    acls = [{"tag": tags[int(acl.acl_index)], "rules": [_acl_rule_json(r) for r in acl.r]}
+            for acl in state["acls"]]
+    bindings = [{"interface": name(int(b.sw_if_index)),
+                 "input": [tags.get(int(a), int(a)) for a in b.acls[:b.n_input]],
+                 "output": [tags.get(int(a), int(a)) for a in b.acls[b.n_input:]]}
+                for b in state["acl_bindings"] if int(b.sw_if_index) in state["by_index"]]
+
+    running = state["nat_running"]
+    nat = {
+        "enabled": bool(getattr(running, "sessions", 0) or state["nat_interfaces"] or state["nat_addresses"]),
+        "interfaces": [{"interface": name(int(n.sw_if_index)), "inside": bool(n.flags & NAT_IF_INSIDE)}
+                       for n in state["nat_interfaces"] if int(n.sw_if_index) in state["by_index"]],
+        "addresses": sorted({a.ip_address for a in state["nat_addresses"]}),
+        "static": [{"local_ip": m.local_ip, "local_port": m.local_port or 0,
+                    "external_ip": m.external_ip, "external_port": m.external_port or 0,
+                    "protocol": m.protocol or 0}
+                   for m in state["nat_static"]],
+    }
+
+    dhcp = {"clients": [{"interface": name(int(c.client.sw_if_index)), "hostname": _text(c.client.hostname)}
+                        for c in state["dhcp_clients"] if int(c.client.sw_if_index) in state["by_index"]]}
+
+    members = {}
+    for i, (bd_id, shg, bvi) in sorted(state["bridges"].items()):
+        if i in state["by_index"]:
+            members.setdefault(bd_id, []).append({"interface": name(i), "shg": shg, "bvi": bvi})
+    bridges = [{"bd_id": bd_id, "members": m} for bd_id, m in sorted(members.items())]
+
+    return {
+        "prune": True,
+        "interfaces": interfaces,
+        "routes": routes,
+        "acls": acls,
+        "acl_bindings": bindings,
+        "nat": nat,
+        "dhcp": dhcp,
+        "bridges": bridges,
+    }
+
+
+def snapshot_path(name, directory=VPP_CONFIG_SNAPSHOT_DIR):
+    if not _NAME_RE.match(name):
+        raise ValueError(f"invalid snapshot name {name!r}")
+    return os.path.join(directory, name + FILE_SUFFIX)
+
+
+def save_snapshot(v, name=None, directory=VPP_CONFIG_SNAPSHOT_DIR):
+    """Export the running config to <directory>/<name>.json.gz; returns its summary."""
+    started = time.perf_counter()
+    created = time.time()
+    target = getattr(v, "target", DEFAULT_TARGET)
+    if name is None:
+        name = time.strftime("config-%Y%m%dT%H%M%S", time.gmtime(created))
+        if target != DEFAULT_TARGET:
+            name += "-" + _NAME_UNSAFE_RE.sub("_", target)
+    path = snapshot_path(name, directory)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            owner = snapshot_target(parse_snapshot(f.read()))
+        if owner != target:
+            raise ValueError(f"snapshot {name!r} belongs to VPP target {owner!r}")
+
+    doc = export_config(v)
+    body = json.dumps({"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION,
+                       "name": name, "target": target, "created": created, "document": doc},
+                      separators=(",", ":")).encode()
+
+    os.makedirs(directory, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(gzip.compress(body, compresslevel=9))
+    os.replace(tmp, path)
+
+    return dict(snapshot_info(path), elapsed_ms=round((time.perf_counter() - started) * 1000.0, 3))
+
+
+def parse_snapshot(data):
+    """Snapshot file contents (gzip or plain JSON) -> snapshot dict."""
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    snapshot = json.loads(data)
+    if snapshot.get("format") != SNAPSHOT_FORMAT or not isinstance(snapshot.get("document"), dict):
+        raise ValueError("not a configuration snapshot")
+    if snapshot.get("version", 0) > SNAPSHOT_VERSION:
+        raise ValueError(f"snapshot version {snapshot['version']} is newer than supported")
+    return snapshot
+
+
+def snapshot_target(snapshot):
+    """VPP target a snapshot was taken from (the default one for snapshots that predate targets)."""
+    return snapshot.get("target") or DEFAULT_TARGET
+
+
+def load_snapshot(name, directory=VPP_CONFIG_SNAPSHOT_DIR, target=None):
+    """A saved snapshot; FileNotFoundError if there is none, or none of `target`."""
+    with open(snapshot_path(name, directory), "rb") as f:
+        snapshot = parse_snapshot(f.read())
+    if target is not None and snapshot_target(snapshot) != target:
+        raise FileNotFoundError(f"no snapshot {name!r} of VPP target {target!r}")
+    return snapshot
+
+
+def snapshot_info(path):
+    with open(path, "rb") as f:
+        snapshot = parse_snapshot(f.read())
+    doc = snapshot["document"]
+    return {
+        "name": snapshot["name"],
+        "target": snapshot_target(snapshot),
+        "created": snapshot["created"],
+        "bytes": os.path.getsize(path),
+        "counts": {
+            "interfaces": len(doc.get("interfaces", [])),
+            "routes": len(doc.get("routes", [])),
+            "acls": len(doc.get("acls", [])),
+            "acl_bindings": len(doc.get("acl_bindings", [])),
+            "nat_addresses": len(doc.get("nat", {}).get("addresses", [])),
+            "nat_static": len(doc.get("nat", {}).get("static", [])),
+            "dhcp_clients": len(doc.get("dhcp", {}).get("clients", [])),
+            "bridge_members": sum(len(b.get("members", [])) for b in doc.get("bridges", [])),
+        },
+    }
+
+
+def list_snapshots(directory=VPP_CONFIG_SNAPSHOT_DIR, target=None):
+    """Summaries of the saved snapshots (of one VPP target if given), oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    paths = [os.path.join(directory, n) for n in os.listdir(directory) if n.endswith(FILE_SUFFIX)]
+    infos = (snapshot_info(p) for p in paths)
+    return sorted((info for info in infos if target is None or info["target"] == target),
+                  key=lambda info: info["created"])
+
+
+def restore_snapshot(v, snapshot, dry_run=False):
+    """Replay a snapshot dict through apply_config()."""
+    result = apply_config(v, snapshot["document"], dry_run=dry_run)
+    result["snapshot"] = snapshot.get("name")
+    return result
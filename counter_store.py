@@ -0,0 +1,351 @@
+"""
+Memory-mapped history of per-interface counters for the traffic tab.
+
+A background recorder samples the stats segment every VPP_COUNTER_INTERVAL
+seconds and appends one fixed-width record per interface to a ring file
+per tier:
+
+    1s  -> 1 day     every sample
+    1m  -> 7 days    first sample of each minute
+    1h  -> 1 year    first sample of each hour
+
+Records hold the raw cumulative counters (ts, rx/tx bytes, rx/tx packets,
+drops as little-endian uint64), so a coarser tier is just a subsample of
+the finer one and the rate between any two points is exact. Reads never
+recompute anything: a range query is a binary search on ts plus a copy
+of the matching strided slice of the mmap.
+
+At full size one interface takes ~5MB (the 1s tier alone is ~4MB), so
+capacities are scaled down to keep all ring files within
+VPP_COUNTER_MAX_MB for the number of interfaces recorded. A ring keeps
+the capacity it was created with. Ring files are named after the
+percent-encoded interface name; the rings of an interface that has been
+gone for VPP_COUNTER_PRUNE_AFTER seconds are closed and deleted.
+
+Ring file layout: 64 byte header (magic, step, capacity, records written)
+followed by capacity * 48 byte records.
+"""
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from urllib.parse import quote, unquote
+
+from vpp_connection import connect_vpp, connection_stale, disconnect_vpp
+
+log = logging.getLogger(__name__)
+
+VPP_COUNTER_STORE = os.environ.get("VPP_COUNTER_STORE", "0") not in ("", "0", "false", "no")
+VPP_COUNTER_DIR = os.environ.get("VPP_COUNTER_DIR", "counter_history")
+VPP_COUNTER_INTERVAL = float(os.environ.get("VPP_COUNTER_INTERVAL", "1"))
+VPP_COUNTER_MAX_POINTS = int(os.environ.get("VPP_COUNTER_MAX_POINTS", "2000"))
+# Budget for all ring files together (they are mapped into memory too)
+VPP_COUNTER_MAX_MB = float(os.environ.get("VPP_COUNTER_MAX_MB", "256"))
+# Seconds an interface must be missing before its history is deleted (VPP restarts
+# and config replays briefly drop sub-interfaces)
+VPP_COUNTER_PRUNE_AFTER = float(os.environ.get("VPP_COUNTER_PRUNE_AFTER", "3600"))
+
+# (tier name, step seconds, full capacity in records)
+TIERS = (
+    ("1s", 1, 86400),
+    ("1m", 60, 7 * 24 * 60),
+    ("1h", 3600, 365 * 24),
+)
+
+FIELDS = ("ts", "rx_bytes", "tx_bytes", "rx_packets", "tx_packets", "drops")
+
+MAGIC = b"VPPCTR1\0"
+HEADER = struct.Struct("<8sIIQ")
+HEADER_SIZE = 64
+RECORD = struct.Struct("<" + "Q" * len(FIELDS))
+_WRITTEN_OFFSET = 16
+MIN_CAPACITY = 60
+
+# numpy gives 2-D (record, field) views; without it we use strided memoryviews
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _file_name(interface):
+    # reversible, so two interfaces never share a file and interfaces() can list real names
+    return quote(interface, safe="")
+
+
+class CounterRing:
+    """
+    One interface / tier: a fixed-capacity ring of counter records in an
+    mmap. An existing ring file for the same step keeps its own capacity.
+    """
+
+    def __init__(self, path, step, capacity):
+        self.path = path
+        self.step = step
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            file_size = os.fstat(fd).st_size
+            if file_size >= HEADER_SIZE:
+                magic, file_step, file_capacity, _written = HEADER.unpack(os.pread(fd, HEADER.size, 0))
+                if (magic, file_step) == (MAGIC, step) and file_size == HEADER_SIZE + file_capacity * RECORD.size:
+                    capacity = file_capacity
+            self.capacity = capacity
+            size = HEADER_SIZE + capacity * RECORD.size
+            if file_size != size:
+                os.ftruncate(fd, size)
+            self.mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        magic, file_step, file_capacity, _written = HEADER.unpack_from(self.mm, 0)
+        if (magic, file_step, file_capacity) != (MAGIC, step, capacity):
+            # new file, or one laid out for a different tier -- start over
+            HEADER.pack_into(self.mm, 0, MAGIC, step, capacity, 0)
+
+        if np is not None:
+            self.records = np.frombuffer(self.mm, dtype="<u8", count=capacity * len(FIELDS),
+                                         offset=HEADER_SIZE).reshape(capacity, len(FIELDS))
+        else:
+            self.records = memoryview(self.mm)[HEADER_SIZE:].cast("Q")
+
+        self.last_bucket = self.ts_at(self.count - 1) // step if self.count else -1
+
+    @property
+    def written(self):
+        return struct.unpack_from("<Q", self.mm, _WRITTEN_OFFSET)[0]
+
+    @property
+    def count(self):
+        return min(self.written, self.capacity)
+
+    def _slot(self, k):
+        """Physical slot of the k-th oldest record."""
+        written = self.written
+        first = written - self.count
+        return (first + k) % self.capacity
+
+    def ts_at(self, k):
+        return struct.unpack_from("<Q", self.mm, HEADER_SIZE + self._slot(k) * RECORD.size)[0]
+
+    def append(self, ts, values):
+        """Store a sample unless this tier already has one for ts's bucket."""
+        bucket = ts // self.step
+        if bucket <= self.last_bucket:
+            return False
+        written = self.written
+        RECORD.pack_into(self.mm, HEADER_SIZE + (written % self.capacity) * RECORD.size, ts, *values)
+        struct.pack_into("<Q", self.mm, _WRITTEN_OFFSET, written + 1)
+        self.last_bucket = bucket
+        return True
+
+    def close(self):
+        records, self.records = self.records, None
+        if isinstance(records, memoryview):
+            records.release()
+        del records
+        self.mm.close()
+
+    def _search(self, ts):
+        """Index of the first record with timestamp >= ts."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts_at(mid) < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def oldest(self):
+        return self.ts_at(0) if self.count else None
+
+    def _field(self, lo, hi, f):
+        if np is not None:
+            return self.records[lo:hi, f]
+        width = len(FIELDS)
+        return self.records[lo * width + f:hi * width:width]
+
+    def columns(self, start, end):
+        """
+        {field: column} for records with start <= ts <= end, copied out of
+        the mmap so they stay valid after the store lock is released.
+        """
+        first, last = self._search(start), self._search(end + 1)
+        if first >= last:
+            return {name: [] for name in FIELDS}
+
+        lo, hi = self._slot(first), self._slot(last - 1) + 1
+        if lo < hi:
+            if np is not None:
+                return {name: self._field(lo, hi, f).copy() for f, name in enumerate(FIELDS)}
+            return {name: self._field(lo, hi, f).tolist() for f, name in enumerate(FIELDS)}
+
+        columns = {}
+        for f, name in enumerate(FIELDS):
+            head, tail = self._field(lo, self.capacity, f), self._field(0, hi, f)
+            columns[name] = np.concatenate((head, tail)) if np is not None else head.tolist() + tail.tolist()
+        return columns
+
+
+class CounterStore:
+    """Ring files for every interface and tier under one directory."""
+
+    def __init__(self, directory, tiers=TIERS, max_bytes=VPP_COUNTER_MAX_MB * 1024 * 1024,
+                 prune_after=VPP_COUNTER_PRUNE_AFTER):
+        self.directory = directory
+        self.tiers = tiers
+        self.max_bytes = max_bytes
+        self.prune_after = prune_after
+        self._rings = {}                 # file name -> {tier name: CounterRing}
+        self._missing = {}               # file name -> ts its interface was first seen missing
+        self._swept = False
+        self._lock = threading.Lock()
+
+    def capacities(self, interface_count):
+        """{tier name: capacity} so interface_count interfaces fit in max_bytes."""
+        full = sum(HEADER_SIZE + capacity * RECORD.size for _name, _step, capacity in self.tiers)
+        scale = min(1.0, self.max_bytes / (max(1, interface_count) * full))
+        return {name: max(MIN_CAPACITY, min(capacity, int(capacity * scale)))
+                for name, _step, capacity in self.tiers}
+
+    def _rings_for(self, interface, create, interface_count=1):
+        key = _file_name(interface)
+        rings = self._rings.get(key)
+        if rings is None:
+            base = os.path.join(self.directory, key)
+            if not create and not os.path.exists(f"{base}.{self.tiers[0][0]}.ring"):
+                return None
+            os.makedirs(self.directory, exist_ok=True)
+            capacities = self.capacities(max(interface_count, len(self._rings) + 1))
+            rings = {name: CounterRing(f"{base}.{name}.ring", step, capacities[name])
+                     for name, step, _capacity in self.tiers}
+            self._rings[key] = rings
+        return rings
+
+    def record(self, ts, columns):
+        """Append one sample for every interface in a collect_interface_counters() table."""
+        ts = int(ts)
+        names = columns["name"]
+        values = [columns[name] for name in FIELDS[1:]]
+        with self._lock:
+            for i, interface in enumerate(names):
+                sample = [int(col[i]) for col in values]
+                for ring in self._rings_for(interface, create=True, interface_count=len(names)).values():
+                    ring.append(ts, sample)
+            if names:
+                # an empty table is a failed stats read, not every interface gone
+                self._prune(ts, {_file_name(n) for n in names})
+
+    def _disk_keys(self):
+        if not os.path.isdir(self.directory):
+            return set()
+        suffix = f".{self.tiers[0][0]}.ring"
+        return {n[:-len(suffix)] for n in os.listdir(self.directory) if n.endswith(suffix)}
+
+    def _prune(self, ts, present):
+        """Close and delete the rings of interfaces missing for prune_after seconds."""
+        if not self._swept:
+            # files left by interfaces that were gone before we started
+            self._swept = True
+            for key in self._disk_keys() - present:
+                self._missing.setdefault(key, ts)
+        for key in self._rings.keys() - present:
+            self._missing.setdefault(key, ts)
+        for key, since in list(self._missing.items()):
+            if key in present:
+                del self._missing[key]
+            elif ts - since >= self.prune_after:
+                del self._missing[key]
+                self._remove(key)
+
+    def _remove(self, key):
+        for ring in (self._rings.pop(key, None) or {}).values():
+            ring.close()
+        for name, _step, _capacity in self.tiers:
+            try:
+                os.remove(os.path.join(self.directory, f"{key}.{name}.ring"))
+            except FileNotFoundError:
+                pass
+        log.info("Counter history of %s deleted: interface gone", unquote(key))
+
+    def interfaces(self):
+        """Recorded interfaces."""
+        with self._lock:
+            keys = set(self._rings) | self._disk_keys()
+        return sorted(unquote(key) for key in keys)
+
+    def pick_tier(self, rings, start, end, max_points):
+        """
+        Finest tier that still covers start and stays under max_points; if
+        no tier reaches back to start, the finest one under max_points.
+        """
+        fitting = [name for name, step, _capacity in self.tiers if (end - start) / step <= max_points]
+        for name in fitting:
+            oldest = rings[name].oldest()
+            if oldest is not None and oldest <= start:
+                return name
+        return fitting[0] if fitting else self.tiers[-1][0]
+
+    def query(self, interface, start, end, tier=None, max_points=VPP_COUNTER_MAX_POINTS):
+        """(tier name, step, {field: column}) or None if nothing was recorded for interface."""
+        with self._lock:
+            rings = self._rings_for(interface, create=False)
+            if rings is None:
+                return None
+            if tier is None:
+                tier = self.pick_tier(rings, start, end, max_points)
+            if tier not in rings:
+                raise ValueError(f"unknown tier {tier!r}, expected one of {', '.join(rings)}")
+            ring = rings[tier]
+            return tier, ring.step, ring.columns(start, end)
+
+
+counter_store = CounterStore(VPP_COUNTER_DIR)
+
+
+class CounterRecorder(threading.Thread):
+    """Samples interface counters into counter_store every interval seconds."""
+
+    def __init__(self, store, interval):
+        super().__init__(daemon=True, name="vpp-counter-recorder")
+        self.store = store
+        self.interval = interval
+        self.last_error = None
+
+    def run(self):
+        # imported here: api.interfaces imports this module for its history endpoint
+        from api.interfaces import collect_interface_counters
+
+        v = None
+        while True:
+            started = time.monotonic()
+            try:
+                if v is not None and connection_stale(v):
+                    disconnect_vpp(v)
+                    v = None
+                if v is None:
+                    v = connect_vpp("vpp-gui-counters")
+                    if v is None:
+                        raise ConnectionError("Not connected to VPP")
+                self.store.record(time.time(), collect_interface_counters(v))
+                self.last_error = None
+            except Exception as e:
+                if self.last_error != str(e):
+                    log.warning("Counter sample failed: %s", e)
+                self.last_error = str(e)
+                if v is not None:
+                    disconnect_vpp(v)
+                    v = None
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+counter_recorder = CounterRecorder(counter_store, VPP_COUNTER_INTERVAL)
+
+
+def init_counter_store(app):
+    """Call this from create_app() to start recording counter history (VPP_COUNTER_STORE=1)."""
+    if VPP_COUNTER_STORE and not counter_recorder.is_alive():
+        counter_recorder.start()
@@ -0,0 +1,81 @@
+from flask import jsonify, request
+from flask.json.provider import DefaultJSONProvider
+
+# orjson is optional -- without it we fall back to Flask's stdlib encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that encodes responses with orjson when available.
+    Output matches the default provider (sorted keys, compact), just faster
+    for the large route / ACL / NAT session listings. Datetimes and
+    dataclasses are passed through to the default provider's default(),
+    so they keep Flask's RFC 822 date format.
+    """
+
+    def _orjson_options(self):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        # Custom json.dumps arguments (indent, cls, ...) need the stdlib encoder
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None or (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+
+        obj = _response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_options())
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def _response_obj(args, kwargs):
+    """The object jsonify(*args, **kwargs) serializes (same rules as Flask's provider)."""
+    if args and kwargs:
+        raise TypeError("app.json.response() takes either args or kwargs, not both")
+    if not args and not kwargs:
+        return None
+    if len(args) == 1:
+        return args[0]
+    return args or kwargs
+
+
+def init_json_provider(app):
+    """
+    Call this from create_app() to switch the app to the fast JSON provider.
+    """
+    app.json = FastJSONProvider(app)
+
+
+def wants_columnar():
+    """True if the client asked for ?format=columnar."""
+    return request.args.get('format') == 'columnar'
+
+
+def to_columnar(rows):
+    """
+    Turn a list of same-shaped dicts into one list per column:
+    {"count": n, "columns": {"name": [...], ...}}
+    Repeated key names are sent once instead of once per row.
+    """
+    keys = list(rows[0].keys()) if rows else []
+    return {
+        'count': len(rows),
+        'columns': {key: [row.get(key) for row in rows] for key in keys}
+    }
+
+
+def table_response(rows):
+    """jsonify a table listing, honouring ?format=columnar (rows stay the default)."""
+    if wants_columnar():
+        return jsonify(to_columnar(rows))
+    return jsonify(rows)
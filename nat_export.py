@@ -0,0 +1,342 @@
+"""
+Streaming NAT44 session exporter for abuse / lawful-intercept retention.
+
+Walks nat44_user_dump / nat44_user_session_dump and appends sessions to
+fixed-size column chunks. Each full chunk is zlib-compressed column by
+column and written straight to disk, so memory stays bounded by
+VPP_NAT_EXPORT_CHUNK_ROWS no matter how many sessions exist.
+
+File layout (one file per snapshot, little-endian):
+
+    b"NATCOL1\\n"
+    chunk*      per column: compressed array bytes
+    footer      JSON index: columns, dtypes, and per chunk its offset,
+                rows, compressed column sizes and min/max inside ip /
+                last_heard (lets readers skip chunks)
+    u64         footer length
+    b"NATCOL1\\n"
+
+Snapshots are written to a .tmp file and renamed once complete; a failed
+export removes its .tmp file. query_export() reads one back for an
+inside address / subnet or an outside address[:port], skipping chunks
+whose inside ip range cannot match.
+"""
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+from nat_index import int_to_ip, ip_to_int
+from vpp_connection import connect_vpp, disconnect_vpp
+
+log = logging.getLogger(__name__)
+
+VPP_NAT_EXPORT_DIR = os.environ.get("VPP_NAT_EXPORT_DIR", "nat_exports")
+VPP_NAT_EXPORT_INTERVAL = float(os.environ.get("VPP_NAT_EXPORT_INTERVAL", "0"))
+VPP_NAT_EXPORT_CHUNK_ROWS = int(os.environ.get("VPP_NAT_EXPORT_CHUNK_ROWS", "65536"))
+VPP_NAT_EXPORT_KEEP = int(os.environ.get("VPP_NAT_EXPORT_KEEP", "0"))  # 0 = keep every snapshot
+
+MAGIC = b"NATCOL1\n"
+FILE_SUFFIX = ".ncol"
+
+# (column, array typecode, session field, is an ip address)
+COLUMNS = (
+    ("inside_ip", "I", "inside_ip_address", True),
+    ("inside_port", "H", "inside_port", False),
+    ("outside_ip", "I", "outside_ip_address", True),
+    ("outside_port", "H", "outside_port", False),
+    ("protocol", "B", "protocol", False),
+    ("vrf_id", "I", None, False),
+    ("last_heard", "Q", "last_heard", False),
+    ("ext_host_ip", "I", "ext_host_address", True),
+    ("ext_host_port", "H", "ext_host_port", False),
+    ("total_bytes", "Q", "total_bytes", False),
+    ("total_pkts", "Q", "total_pkts", False),
+)
+
+_SWAP = sys.byteorder != "little"
+
+# numpy filters a decompressed chunk in a few array operations, but is optional
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ChunkWriter:
+    """Buffers up to chunk_rows sessions as columns and flushes them to a file object."""
+
+    def __init__(self, f, chunk_rows):
+        self.f = f
+        self.chunk_rows = chunk_rows
+        self.chunks = []
+        self.rows = 0
+        self._new_chunk()
+
+    def _new_chunk(self):
+        self.cols = {name: array(code) for name, code, _field, _ip in COLUMNS}
+
+    def add(self, session, vrf_id):
+        cols = self.cols
+        for name, _code, field, is_ip in COLUMNS:
+            if field is None:
+                cols[name].append(int(vrf_id))
+                continue
+            value = getattr(session, field, None)
+            if value is None:
+                cols[name].append(0)
+            elif is_ip:
+                cols[name].append(ip_to_int(value))
+            else:
+                cols[name].append(int(value))
+        if len(cols["protocol"]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        n = len(self.cols["protocol"])
+        if not n:
+            return
+        chunk = {
+            "offset": self.f.tell(),
+            "rows": n,
+            "sizes": [],
+            "inside_ip_min": min(self.cols["inside_ip"]),
+            "inside_ip_max": max(self.cols["inside_ip"]),
+            "last_heard_min": min(self.cols["last_heard"]),
+            "last_heard_max": max(self.cols["last_heard"]),
+        }
+        for name, _code, _field, _ip in COLUMNS:
+            col = self.cols[name]
+            if _SWAP:
+                col.byteswap()
+            block = zlib.compress(col.tobytes(), 6)
+            self.f.write(block)
+            chunk["sizes"].append(len(block))
+
+        self.chunks.append(chunk)
+        self.rows += n
+        self._new_chunk()
+
+
+def export_sessions(v, directory=VPP_NAT_EXPORT_DIR, chunk_rows=VPP_NAT_EXPORT_CHUNK_ROWS):
+    """Write one snapshot of the NAT44 session table; returns its footer index."""
+    os.makedirs(directory, exist_ok=True)
+    started = time.time()
+    name = time.strftime("nat-%Y%m%dT%H%M%S", time.gmtime(started)) + f"-{int(started * 1000) % 1000:03d}"
+    path = os.path.join(directory, name + FILE_SUFFIX)
+    tmp = path + ".tmp"
+
+    try:
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            writer = ChunkWriter(f, chunk_rows)
+            users = 0
+            for user in v.api.nat44_user_dump():
+                users += 1
+                for session in v.api.nat44_user_session_dump(ip_address=user.ip_address, vrf_id=user.vrf_id):
+                    writer.add(session, user.vrf_id)
+            writer.flush()
+
+            footer = {
+                "name": name,
+                "created": started,
+                "duration_ms": round((time.time() - started) * 1000.0, 3),
+                "users": users,
+                "rows": writer.rows,
+                "columns": [{"name": n, "type": c} for n, c, _f, _ip in COLUMNS],
+                "compression": "zlib",
+                "chunks": writer.chunks,
+            }
+            data = json.dumps(footer).encode()
+            f.write(data)
+            f.write(struct.pack("<Q", len(data)))
+            f.write(MAGIC)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    footer["bytes"] = os.path.getsize(path)
+    return footer
+
+
+def read_footer(path):
+    with open(path, "rb") as f:
+        f.seek(-(8 + len(MAGIC)), os.SEEK_END)
+        (length,) = struct.unpack("<Q", f.read(8))
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a complete NAT export")
+        f.seek(-(8 + len(MAGIC) + length), os.SEEK_END)
+        return json.loads(f.read(length))
+
+
+def read_chunks(path, inside_ip_range=None):
+    """
+    Yield each chunk of an export as {column: array}. With inside_ip_range
+    (lo, hi) as ints, chunks whose min/max cannot match are skipped unread.
+    """
+    footer = read_footer(path)
+    with open(path, "rb") as f:
+        for chunk in footer["chunks"]:
+            if inside_ip_range:
+                lo, hi = inside_ip_range
+                if chunk["inside_ip_max"] < lo or chunk["inside_ip_min"] > hi:
+                    continue
+            f.seek(chunk["offset"])
+            cols = {}
+            for (name, code, _field, _ip), size in zip(COLUMNS, chunk["sizes"]):
+                col = array(code)
+                col.frombytes(zlib.decompress(f.read(size)))
+                if _SWAP:
+                    col.byteswap()
+                cols[name] = col
+            yield cols
+
+
+def _matching_rows(cols, filters):
+    """Row numbers of a chunk where every column equals, or lies in the (lo, hi) range of, its filter."""
+    n = len(cols["protocol"])
+    if np is not None:
+        mask = np.ones(n, dtype=bool)
+        for name, value in filters.items():
+            col = np.frombuffer(cols[name], dtype=cols[name].typecode)
+            if isinstance(value, tuple):
+                mask &= (col >= value[0]) & (col <= value[1])
+            else:
+                mask &= col == value
+        return np.flatnonzero(mask).tolist()
+
+    def match(i):
+        for name, value in filters.items():
+            x = cols[name][i]
+            if not (value[0] <= x <= value[1] if isinstance(value, tuple) else x == value):
+                return False
+        return True
+
+    return [i for i in range(n) if match(i)]
+
+
+def query_export(path, inside_ip_range=None, outside_ip=None, outside_port=None, vrf_id=None, limit=1000):
+    """
+    Sessions of an export matching every given filter (addresses as ints,
+    inside_ip_range as (lo, hi)), as (first `limit` rows, total matches).
+    """
+    filters = {}
+    if inside_ip_range is not None:
+        filters["inside_ip"] = tuple(inside_ip_range)
+    if outside_ip is not None:
+        filters["outside_ip"] = outside_ip
+    if outside_port is not None:
+        filters["outside_port"] = outside_port
+    if vrf_id is not None:
+        filters["vrf_id"] = vrf_id
+
+    rows = []
+    total = 0
+    for cols in read_chunks(path, inside_ip_range):
+        matches = _matching_rows(cols, filters)
+        total += len(matches)
+        for i in matches[:max(limit - len(rows), 0)]:
+            rows.append({name: int_to_ip(cols[name][i]) if is_ip else cols[name][i]
+                         for name, _code, _field, is_ip in COLUMNS})
+    return rows, total
+
+
+def export_path(name, directory=VPP_NAT_EXPORT_DIR):
+    """Path of a finished export by name; FileNotFoundError if there is none."""
+    for path in list_exports(directory):
+        if os.path.basename(path) == name + FILE_SUFFIX:
+            return path
+    raise FileNotFoundError(f"no NAT session export {name!r}")
+
+
+def list_exports(directory=VPP_NAT_EXPORT_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, n) for n in os.listdir(directory) if n.endswith(FILE_SUFFIX))
+
+
+def prune_exports(directory=VPP_NAT_EXPORT_DIR, keep=VPP_NAT_EXPORT_KEEP):
+    if keep <= 0:
+        return
+    for path in list_exports(directory)[:-keep]:
+        os.remove(path)
+
+
+class NatSessionExporter(threading.Thread):
+    """Runs exports on demand and, with VPP_NAT_EXPORT_INTERVAL, periodically."""
+
+    def __init__(self, interval):
+        super().__init__(daemon=True, name="nat-session-exporter")
+        self.interval = interval
+        self.running = False
+        self.last_result = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def _export(self):
+        # caller holds self._lock
+        self.running = True
+        v = None
+        try:
+            v = connect_vpp("vpp-gui-nat-export")
+            self.last_result = export_sessions(v)
+            self.last_error = None
+            prune_exports()
+            log.info("NAT session export %s: %d sessions, %d bytes",
+                     self.last_result["name"], self.last_result["rows"], self.last_result["bytes"])
+        except Exception as e:
+            self.last_error = str(e)
+            log.error("NAT session export failed: %s", e)
+        finally:
+            self.running = False
+            if v is not None:
+                disconnect_vpp(v)
+        return self.last_result
+
+    def export_now(self):
+        with self._lock:
+            return self._export()
+
+    def export_in_background(self):
+        """Start an export without blocking; False if one is already running."""
+        # taking the lock here is the test-and-set; the export thread releases it
+        if not self._lock.acquire(blocking=False):
+            return False
+
+        def export_once():
+            try:
+                self._export()
+            finally:
+                self._lock.release()
+
+        try:
+            threading.Thread(target=export_once, daemon=True, name="nat-export-once").start()
+        except Exception:
+            self._lock.release()
+            raise
+        return True
+
+    def run(self):
+        while True:
+            self.export_now()
+            time.sleep(self.interval)
+
+
+nat_exporter = NatSessionExporter(VPP_NAT_EXPORT_INTERVAL)
+
+
+def init_nat_exporter(app):
+    """Call this from create_app() to start periodic exports (VPP_NAT_EXPORT_INTERVAL > 0)."""
+    if VPP_NAT_EXPORT_INTERVAL > 0 and not nat_exporter.is_alive():
+        nat_exporter.start()
@@ -0,0 +1,230 @@
+"""
+Background NAT44 session indexer.
+
+Every VPP_NAT_INDEX_INTERVAL seconds (in the background, or on the next
+lookup without the background thread) the session table is walked once
+(nat44_user_dump + nat44_user_session_dump) into compact array-backed
+columns. Lookups are then answered from the snapshot without touching VPP:
+
+* outside ip:port -> owning session: sorted index over (ip, port, proto)
+* inside user -> all sessions: hash of (vrf, user ip) -> contiguous row
+  range, plus a sorted user list for address and subnet queries, so the
+  same inside address in two VRFs stays two users
+"""
+import ipaddress
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from vpp_connection import connect_vpp, disconnect_vpp
+
+log = logging.getLogger(__name__)
+
+VPP_NAT_INDEX = os.environ.get("VPP_NAT_INDEX", "0") not in ("", "0", "false", "no")
+VPP_NAT_INDEX_INTERVAL = float(os.environ.get("VPP_NAT_INDEX_INTERVAL", "30"))
+
+# numpy makes the outside-key sort ~10x faster on multi-million row tables, but is optional
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def ip_to_int(value):
+    if isinstance(value, (bytes, bytearray)):
+        return int.from_bytes(value[:4], "big")
+    return int(ipaddress.IPv4Address(value))
+
+
+def int_to_ip(value):
+    return str(ipaddress.IPv4Address(value))
+
+
+def _outside_key(ip, port, proto):
+    return (ip << 24) | (port << 8) | proto
+
+
+class NatSessionSnapshot:
+    """Immutable columnar copy of the NAT44 session table plus its indexes."""
+
+    def __init__(self):
+        self.inside_ip = array("I")
+        self.inside_port = array("H")
+        self.outside_ip = array("I")
+        self.outside_port = array("H")
+        self.proto = array("B")
+        self.last_heard = array("Q")
+        self.vrf_id = array("I")
+
+        self.user_rows = {}             # (vrf id, inside ip (int)) -> (first row, end row)
+        self.sorted_users = array("I")  # inside ips of user_rows, ascending
+        self.sorted_user_vrfs = array("I")  # vrf id for each entry of sorted_users
+        self.outside_keys = array("Q")  # sorted (ip, port, proto) keys
+        self.outside_rows = array("I")  # row for each entry of outside_keys
+
+        self.built_at = 0.0
+        self.build_ms = 0.0
+
+    def __len__(self):
+        return len(self.proto)
+
+    def add_user(self, user_ip, vrf_id, sessions):
+        start = len(self.proto)
+        for s in sessions:
+            self.inside_ip.append(user_ip)
+            self.inside_port.append(int(getattr(s, "inside_port", 0)))
+            self.outside_ip.append(ip_to_int(s.outside_ip_address))
+            self.outside_port.append(int(getattr(s, "outside_port", 0)))
+            self.proto.append(int(getattr(s, "protocol", 0)) & 0xFF)
+            self.last_heard.append(int(getattr(s, "last_heard", 0)))
+            self.vrf_id.append(int(vrf_id))
+        if len(self.proto) > start:
+            self.user_rows[(int(vrf_id), user_ip)] = (start, len(self.proto))
+
+    def finish(self):
+        """Build the sorted indexes once all users are added."""
+        users = sorted(self.user_rows, key=lambda user: (user[1], user[0]))
+        self.sorted_users = array("I", (ip for _vrf, ip in users))
+        self.sorted_user_vrfs = array("I", (vrf for vrf, _ip in users))
+
+        n = len(self.proto)
+        keys = array("Q", (_outside_key(self.outside_ip[i], self.outside_port[i], self.proto[i])
+                           for i in range(n)))
+        if np is not None and n:
+            np_keys = np.frombuffer(keys, dtype=np.uint64)
+            order = np.argsort(np_keys, kind="stable")
+            self.outside_rows = array("I", order.astype(np.uint32).tobytes())
+            self.outside_keys = array("Q", np_keys[order].tobytes())
+        else:
+            order = sorted(range(n), key=keys.__getitem__)
+            self.outside_rows = array("I", order)
+            self.outside_keys = array("Q", (keys[i] for i in order))
+
+    def row(self, i):
+        return {
+            'inside_ip': int_to_ip(self.inside_ip[i]),
+            'inside_port': self.inside_port[i],
+            'outside_ip': int_to_ip(self.outside_ip[i]),
+            'outside_port': self.outside_port[i],
+            'protocol': self.proto[i],
+            'last_heard': self.last_heard[i],
+            'vrf_id': self.vrf_id[i],
+        }
+
+    def by_outside(self, ip, port=None, proto=None):
+        """Rows translated to outside ip[:port[/proto]]."""
+        ip = ip_to_int(ip)
+        if port is None:
+            lo, hi = _outside_key(ip, 0, 0), _outside_key(ip, 0xFFFF, 0xFF)
+        elif proto is None:
+            lo, hi = _outside_key(ip, port, 0), _outside_key(ip, port, 0xFF)
+        else:
+            lo = hi = _outside_key(ip, port, proto)
+        first = bisect_left(self.outside_keys, lo)
+        last = bisect_right(self.outside_keys, hi)
+        return [self.outside_rows[k] for k in range(first, last)]
+
+    def _users_between(self, lo, hi, vrf_id=None):
+        first = bisect_left(self.sorted_users, lo)
+        last = bisect_right(self.sorted_users, hi)
+        result = []
+        for k in range(first, last):
+            vrf = self.sorted_user_vrfs[k]
+            if vrf_id is None or vrf == vrf_id:
+                result.extend(range(*self.user_rows[(vrf, self.sorted_users[k])]))
+        return result
+
+    def by_inside(self, ip, vrf_id=None):
+        """Rows owned by one inside user (in every VRF unless vrf_id is given)."""
+        ip = ip_to_int(ip)
+        if vrf_id is not None:
+            rows = self.user_rows.get((vrf_id, ip))
+            return list(range(*rows)) if rows else []
+        return self._users_between(ip, ip)
+
+    def by_inside_prefix(self, network, vrf_id=None):
+        """Rows for every inside user within a prefix, e.g. 10.0.1.0/24, optionally in one VRF."""
+        net = ipaddress.IPv4Network(network, strict=False)
+        return self._users_between(int(net.network_address), int(net.broadcast_address), vrf_id)
+
+
+def build_snapshot(v):
+    """Walk the NAT44 session table once and return a NatSessionSnapshot."""
+    started = time.perf_counter()
+    snap = NatSessionSnapshot()
+    for user in v.api.nat44_user_dump():
+        sessions = v.api.nat44_user_session_dump(ip_address=user.ip_address, vrf_id=user.vrf_id)
+        snap.add_user(ip_to_int(user.ip_address), user.vrf_id, sessions)
+    snap.finish()
+    snap.built_at = time.time()
+    snap.build_ms = (time.perf_counter() - started) * 1000.0
+    return snap
+
+
+class NatSessionIndexer(threading.Thread):
+    """Rebuilds the snapshot periodically; readers just take self.snapshot."""
+
+    def __init__(self, interval):
+        super().__init__(daemon=True, name="nat-session-indexer")
+        self.interval = interval
+        self.snapshot = None
+        self.last_error = None
+        self._wake = threading.Event()
+        self._refresh_lock = threading.Lock()
+
+    def _fresh(self, snap):
+        # the background thread rebuilds every interval plus the time a build takes
+        max_age = self.interval * (2 if self.is_alive() else 1)
+        return snap is not None and time.time() - snap.built_at <= max_age
+
+    def current(self):
+        """The snapshot, rebuilt first when there is none or it is older than the interval."""
+        snap = self.snapshot
+        if self._fresh(snap):
+            return snap
+        return self.refresh(if_stale=True)
+
+    def refresh(self, if_stale=False):
+        with self._refresh_lock:
+            if if_stale and self._fresh(self.snapshot):
+                # another request rebuilt it while we waited
+                return self.snapshot
+            v = None
+            try:
+                v = connect_vpp("vpp-gui-nat-index")
+                self.snapshot = build_snapshot(v)
+                self.last_error = None
+                log.debug("NAT session index rebuilt: %d sessions in %.1fms",
+                          len(self.snapshot), self.snapshot.build_ms)
+            except Exception as e:
+                self.last_error = str(e)
+                log.warning("NAT session index refresh failed: %s", e)
+            finally:
+                if v is not None:
+                    disconnect_vpp(v)
+        return self.snapshot
+
+    def request_refresh(self):
+        self._wake.set()
+
+    def run(self):
+        while True:
+            self.refresh()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+nat_indexer = NatSessionIndexer(VPP_NAT_INDEX_INTERVAL)
+
+
+def init_nat_indexer(app):
+    """
+    Call this from create_app() to start the background indexer (VPP_NAT_INDEX=1).
+    Without it, lookups build a snapshot on first use and rebuild it once it
+    is older than the interval.
+    """
+    if VPP_NAT_INDEX and not nat_indexer.is_alive():
+        nat_indexer.start()
@@ -0,0 +1,458 @@
+"""
+Longest-prefix-match index over the VPP FIB.
+
+Each table (VRF) is mirrored into two path-compressed binary radix
+(Patricia) trees, one per address family, built from ip_route_dump.
+"Which route and interface does traffic to X take?" is then a walk of at
+most a few dozen nodes in-process instead of a dump of the whole table.
+
+Refreshes are incremental: a new dump is compared with the per-prefix
+path signatures of the last one and only added, removed or changed
+prefixes touch the trees. A table is refreshed
+
+* before a lookup when one of our own route writes bumped its config
+  cache version since it was built, or it is older than
+  VPP_ROUTE_INDEX_INTERVAL seconds (so routes installed outside the GUI
+  show up without the background thread too),
+* every VPP_ROUTE_INDEX_INTERVAL seconds by the background thread
+  (VPP_ROUTE_INDEX=1), which picks up routes installed outside the GUI
+  (BGP, CLI). It follows the default VPP target; tables of other fleet
+  targets are indexed per target and refreshed on demand.
+
+A refresh that finds changes also bumps the table's config cache
+version, so the cached /api/routes listing (and its ETag) follows routes
+installed outside the GUI.
+
+Every structural tree change is a single attribute store of a fully
+built node, so lookups never lock and see either the old or the new
+route for a prefix that is being replaced.
+
+Each table also keeps a version number, bumped once per changed prefix,
+a bounded log of those changes (VPP_ROUTE_CHANGELOG) and a digest -- the
+XOR of a 64-bit hash per route -- so clients can sync with a diff since
+the version they hold and check the result, instead of re-downloading
+the table. Versions are handed out as "<epoch>:<version>" tokens: the
+epoch changes whenever a table is rebuilt from scratch (GUI or VPP
+restart), so a token from an older build is never mistaken for a
+version of the new one.
+"""
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+from itertools import count, islice
+
+from vpp_address import format_nh, format_prefix, parse_address
+from vpp_cache import cached_dump, config_cache
+from vpp_connection import DEFAULT_TARGET, connect_vpp, current_target, disconnect_vpp
+
+log = logging.getLogger(__name__)
+
+VPP_ROUTE_INDEX = os.environ.get("VPP_ROUTE_INDEX", "0") not in ("", "0", "false", "no")
+VPP_ROUTE_INDEX_INTERVAL = float(os.environ.get("VPP_ROUTE_INDEX_INTERVAL", "10"))
+# Prefix changes kept per table for /api/routes/diff and /api/routes/changes
+VPP_ROUTE_CHANGELOG = int(os.environ.get("VPP_ROUTE_CHANGELOG", "100000"))
+
+WIDTH = {4: 32, 6: 128}
+
+
+def _common_length(a, alen, b, blen):
+    """Number of leading bits two right-aligned prefixes share."""
+    n = min(alen, blen)
+    diff = (a >> (alen - n)) ^ (b >> (blen - n))
+    return n - diff.bit_length()
+
+
+class _Node:
+    __slots__ = ("key", "length", "value", "left", "right")
+
+    def __init__(self, key, length, value=None):
+        self.key = key          # the prefix bits, right-aligned
+        self.length = length
+        self.value = value      # route entry, None on branch-only nodes
+        self.left = None
+        self.right = None
+
+
+class RadixTree:
+    """Path-compressed binary trie of prefixes of one address width."""
+
+    def __init__(self, width):
+        self.width = width
+        self.root = _Node(0, 0)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def _bit(key, length, depth):
+        """Bit `depth` (0 = most significant) of a right-aligned prefix."""
+        return (key >> (length - depth - 1)) & 1
+
+    def _set_child(self, parent, bit, node):
+        if bit:
+            parent.right = node
+        else:
+            parent.left = node
+
+    def insert(self, key, length, value):
+        node = self.root
+        while True:
+            if node.length == length:
+                if node.value is None:
+                    self.size += 1
+                node.value = value
+                return
+            bit = self._bit(key, length, node.length)
+            child = node.right if bit else node.left
+            if child is None:
+                self._set_child(node, bit, _Node(key, length, value))
+                self.size += 1
+                return
+            common = _common_length(child.key, child.length, key, length)
+            if common == child.length:
+                node = child
+                continue
+            # split: a new node at the shared prefix takes child's place
+            mid = _Node(key >> (length - common), common, value if common == length else None)
+            self._set_child(mid, self._bit(child.key, child.length, common), child)
+            if common < length:
+                self._set_child(mid, self._bit(key, length, common), _Node(key, length, value))
+            self._set_child(node, bit, mid)
+            self.size += 1
+            return
+
+    def remove(self, key, length):
+        parent, node = None, self.root
+        while node is not None and node.length < length:
+            if (key >> (length - node.length)) != node.key:
+                return False
+            parent = node
+            node = node.right if self._bit(key, length, node.length) else node.left
+        if node is None or node.length != length or node.key != key or node.value is None:
+            return False
+        node.value = None
+        self.size -= 1
+        if node is self.root:
+            return True
+        # splice out branch-only nodes with fewer than two children
+        if node.left is None or node.right is None:
+            self._set_child(parent, self._bit(key, length, parent.length), node.left or node.right)
+        return True
+
+    def lookup(self, addr):
+        """Most specific node whose prefix covers addr (an int), or None."""
+        width = self.width
+        node, best = self.root, None
+        while node is not None:
+            length = node.length
+            if (addr >> (width - length)) != node.key:
+                break
+            if node.value is not None:
+                best = node
+            if length == width:
+                break
+            node = node.right if (addr >> (width - length - 1)) & 1 else node.left
+        return best
+
+
+def address_int(ip):
+    """(family, int) for an address string; inet_pton is several times faster than ipaddress."""
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+    except (OSError, TypeError):
+        pass
+    try:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), "big")
+    except (OSError, TypeError):
+        raise ValueError(f"{ip!r} is not an IPv4 or IPv6 address") from None
+
+
+def _prefix_key(prefix):
+    """(family, right-aligned bits, length) for "addr/len"."""
+    addr, length = prefix.split("/")
+    ip = parse_address(addr)
+    length = int(length)
+    return ip.version, int(ip) >> (WIDTH[ip.version] - length), length
+
+
+def route_entries(routes):
+    """{prefix: ((next_hop, sw_if_index), ...)} for an ip_route_dump result."""
+    entries = {}
+    for route in routes:
+        paths = tuple((format_nh(path) if hasattr(path.nh, "address") else "direct", path.sw_if_index)
+                      for path in route.route.paths)
+        entries[format_prefix(route.route.prefix)] = paths
+    return entries
+
+
+def route_view(table_id):
+    """Config cache resource for one table's listing; invalidating 'routes' drops them all."""
+    return "routes" if table_id == 0 else f"routes:{table_id}"
+
+
+def route_hash(prefix, paths):
+    """Stable 64-bit hash of one route; a table's digest is the XOR over its routes."""
+    return int.from_bytes(hashlib.blake2b(f"{prefix} {paths}".encode(), digest_size=8).digest(), "big")
+
+
+_epochs = count(1)
+
+
+class RouteTable:
+    """
+    LPM trees and path signatures of one FIB table, both families, plus a
+    change log. Every added, removed or changed prefix after the first
+    build gets the next version number; the first build is version 1.
+    """
+
+    def __init__(self, table_id, target=DEFAULT_TARGET):
+        self.table_id = table_id
+        self.target = target
+        self.trees = {4: RadixTree(WIDTH[4]), 6: RadixTree(WIDTH[6])}
+        self.entries = {}            # prefix -> paths, as of the last refresh
+        self.if_names = {}           # sw_if_index -> name, as of the last refresh
+        self.cache_version = None    # config cache version the trees reflect
+        self.refreshed_at = 0.0
+        self.refresh_ms = 0.0
+        self.last_changes = {"added": 0, "removed": 0, "changed": 0}
+        self.version = 0
+        self.epoch = f"{config_cache._boot}.{next(_epochs)}"
+        self.digest = 0
+        self.changes = deque(maxlen=VPP_ROUTE_CHANGELOG)   # (version, prefix, old paths, new paths)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def token(self, version):
+        """The "<epoch>:<version>" token clients hold for a version of this build."""
+        return f"{self.epoch}:{version}"
+
+    def parse_token(self, token):
+        """
+        The version number of a token, 0 without one, or None when it was
+        handed out by another build of the table (the client has to resync).
+        """
+        if not token:
+            return 0
+        epoch, _, version = token.rpartition(":")
+        version = int(version)
+        return version if epoch == self.epoch else None
+
+    def _log(self, prefix, old, new):
+        self.version += 1
+        self.changes.append((self.version, prefix, old, new))
+
+    def apply(self, entries):
+        """Bring the trees in line with a fresh {prefix: paths}; returns the change counts."""
+        with self._lock:
+            old = self.entries
+            first = self.version == 0
+            added = removed = changed = 0
+            for prefix, paths in entries.items():
+                previous = old.get(prefix)
+                if previous == paths:
+                    continue
+                family, key, length = _prefix_key(prefix)
+                self.trees[family].insert(key, length, (prefix, paths))
+                self.digest ^= route_hash(prefix, paths)
+                if previous is None:
+                    added += 1
+                else:
+                    self.digest ^= route_hash(prefix, previous)
+                    changed += 1
+                if not first:
+                    self._log(prefix, previous, paths)
+            for prefix in old.keys() - entries.keys():
+                family, key, length = _prefix_key(prefix)
+                self.trees[family].remove(key, length)
+                self.digest ^= route_hash(prefix, old[prefix])
+                self._log(prefix, old[prefix], None)
+                removed += 1
+            if first:
+                self.version = 1
+            self.entries = entries
+        return {"added": added, "removed": removed, "changed": changed}
+
+    def _since(self, since):
+        """Log records after `since`, or None when the log does not reach back that far."""
+        # versions in the log are contiguous, so the record after `since` sits at since - horizon
+        horizon = self.changes[0][0] - 1 if self.changes else self.version
+        if since < max(horizon, 1) or since > self.version:
+            return None
+        return list(islice(self.changes, since - horizon, None))
+
+    def snapshot(self):
+        """(entries, version, digest) as of the same moment."""
+        with self._lock:
+            return self.entries, self.version, self.digest
+
+    def changes_since(self, since, limit=None):
+        """(records, version, digest) -- records is None if the client has to resync in full."""
+        with self._lock:
+            records = self._since(since)
+            if records is not None and limit is not None:
+                records = records[:limit]
+            return records, self.version, self.digest
+
+    def diff(self, since):
+        """
+        Net change since version `since` as (added, removed, changed, version,
+        digest): added {prefix: paths}, removed [prefix], changed {prefix:
+        (old paths, paths)}. None instead of the three when a resync is needed.
+        """
+        with self._lock:
+            records = self._since(since)
+            if records is None:
+                return None, None, None, self.version, self.digest
+            before = {}
+            for _, prefix, old, _ in records:
+                before.setdefault(prefix, old)
+            added, removed, changed = {}, [], {}
+            for prefix, old in before.items():
+                new = self.entries.get(prefix)
+                if old is None and new is not None:
+                    added[prefix] = new
+                elif new is None and old is not None:
+                    removed.append(prefix)
+                elif old != new:
+                    changed[prefix] = (old, new)
+            return added, removed, changed, self.version, self.digest
+
+    def lookup(self, ip):
+        """(prefix, paths) of the longest matching route for an address string, or None."""
+        family, addr = address_int(ip)
+        node = self.trees[family].lookup(addr)
+        return node.value if node is not None else None
+
+
+class RouteIndexer(threading.Thread):
+    """Per-(target, table) LPM index; readers call table(v, table_id)."""
+
+    def __init__(self, interval):
+        super().__init__(daemon=True, name="route-indexer")
+        self.interval = interval
+        self.tables = {}             # (target, table_id) -> RouteTable
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+
+    def refresh(self, v, table_id, if_stale=False):
+        """Re-dump one table and apply the difference to its trees."""
+        with self._lock:
+            current = self.current(table_id) if if_stale else None
+            if current is not None:
+                # another request refreshed it while we waited
+                return current
+            key = (v.target, table_id)
+            table = self.tables.get(key) or RouteTable(table_id, v.target)
+            first = table.version == 0
+            version = config_cache.version(route_view(table_id))
+            started = time.perf_counter()
+            entries = {}
+            for is_ip6 in (0, 1):
+                entries.update(route_entries(
+                    cached_dump(v, "ip_route_dump", table={"table_id": table_id, "is_ip6": is_ip6})))
+            table.last_changes = table.apply(entries)
+            if not first and any(table.last_changes.values()):
+                # the table may have changed outside the GUI (BGP, CLI): the cached listing is stale too
+                version = config_cache.advance(route_view(table_id), version) or version
+            table.if_names = {i.sw_if_index: i.interface_name for i in cached_dump(v, "sw_interface_dump")}
+            table.cache_version = version
+            table.refreshed_at = time.time()
+            table.refresh_ms = (time.perf_counter() - started) * 1000.0
+            self.tables[key] = table
+            log.debug("Route index table %d: %d prefixes, %s in %.1fms",
+                      table_id, len(table), table.last_changes, table.refresh_ms)
+        if any(table.last_changes.values()):
+            with self._changed:
+                self._changed.notify_all()
+        return table
+
+    def wait_for_change(self, timeout):
+        """Block until some table changes or timeout passes (change-feed long polls)."""
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def current(self, table_id):
+        """
+        The index for table_id if it is up to date, else None (answering
+        needs no VPP call). Up to date means no write of ours since it was
+        built and refreshed within the last interval, background thread or not.
+        """
+        table = self.tables.get((current_target(), table_id))
+        if table is None or table.cache_version != config_cache.version(route_view(table_id)):
+            return None
+        # the background thread refreshes every interval plus the time a refresh takes
+        max_age = self.interval * (2 if self.keeps_current() else 1)
+        if time.time() - table.refreshed_at > max_age:
+            return None
+        return table
+
+    def keeps_current(self):
+        """True if the background thread keeps the current request's target up to date."""
+        return self.is_alive() and current_target() == DEFAULT_TARGET
+
+    def target_tables(self):
+        """Indexed tables of the current request's target, by table id."""
+        target = current_target()
+        return sorted((t for (name, _), t in list(self.tables.items()) if name == target),
+                      key=lambda t: t.table_id)
+
+    def table(self, v, table_id):
+        """The index for table_id, refreshed first if it is missing or our own writes made it stale."""
+        table = self.current(table_id)
+        if table is None:
+            table = self.refresh(v, table_id, if_stale=True)
+        return table
+
+    def reset(self, target=DEFAULT_TARGET):
+        """Forget a target's tables after its VPP restarted; they are rebuilt from scratch."""
+        with self._lock:
+            for key in [k for k in self.tables if k[0] == target]:
+                del self.tables[key]
+        with self._changed:
+            self._changed.notify_all()
+
+    def refresh_all(self, v):
+        table_ids = sorted({t.table.table_id for t in cached_dump(v, "ip_table_dump")})
+        for table_id in table_ids:
+            self.refresh(v, table_id)
+        with self._lock:
+            for key in [k for k in self.tables if k[0] == v.target and k[1] not in table_ids]:
+                del self.tables[key]
+
+    def run(self):
+        v = None
+        while True:
+            try:
+                if v is None:
+                    v = connect_vpp("vpp-gui-route-index")
+                self.refresh_all(v)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                log.warning("Route index refresh failed: %s", e)
+                if v is not None:
+                    disconnect_vpp(v)
+                    v = None
+            time.sleep(self.interval)
+
+
+route_indexer = RouteIndexer(VPP_ROUTE_INDEX_INTERVAL)
+
+
+def init_route_indexer(app):
+    """
+    Call this from create_app() to keep every table's index refreshed in the
+    background (VPP_ROUTE_INDEX=1). Without it, a table is indexed on its
+    first lookup and refreshed on the first lookup after a route write made
+    through the GUI or once it is older than the interval.
+    """
+    if VPP_ROUTE_INDEX and not route_indexer.is_alive():
+        route_indexer.start()
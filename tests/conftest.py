@@ -0,0 +1,28 @@
+"""
+Unit tests: run `python -m pytest` from the repository root. VPP calls go to
+the simulator (vpp_sim), so neither VPP nor vpp_papi is needed.
+"""
+import os
+import sys
+
+os.environ.setdefault("VPP_SIMULATOR", "1")
+for _var in ("VPP_SIM_CALL_LATENCY_US", "VPP_SIM_ITEM_LATENCY_US", "VPP_SIM_CONNECT_LATENCY_US"):
+    os.environ.setdefault(_var, "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def vpp(monkeypatch):
+    """A connection to a fresh simulated dataplane, with empty dump and listing caches."""
+    import vpp_sim
+    from vpp_cache import config_cache, dump_flight
+    from vpp_connection import connect_vpp, disconnect_vpp
+
+    monkeypatch.setattr(vpp_sim, "dataplane", vpp_sim.SimDataplane())
+    dump_flight.invalidate()
+    config_cache.clear()
+    v = connect_vpp("vpp-gui-test")
+    yield v
+    disconnect_vpp(v)
@@ -0,0 +1,87 @@
+import ipaddress
+
+import pytest
+
+import config_apply
+import vpp_sim
+from config_apply import FIB_PATH_TYPE_NORMAL, _static_key, _static_routes, apply_config
+from config_snapshot import export_config
+
+
+def route(dst, *paths, path_type=FIB_PATH_TYPE_NORMAL):
+    """An ip_route_dump record as the simulator builds them; paths are (next hop, sw_if_index)."""
+    network = ipaddress.ip_network(dst)
+    proto = 1 if network.version == 6 else 0
+    fib_paths = [vpp_sim.FibPath(sw_if_index, 0, 0, 1, 0, path_type, 0, proto,
+                                 vpp_sim.FibPathNh(vpp_sim._address(ipaddress.ip_address(nh).packed).un,
+                                                   None, 0, 0), 0, [])
+                 for nh, sw_if_index in paths]
+    return vpp_sim.IpRouteDetails(vpp_sim.IpRoute(0, 0, network, len(fib_paths), fib_paths))
+
+
+def targets(result, phase=None):
+    return sorted(c["target"] for c in result["changes"] if phase is None or c["phase"] == phase)
+
+
+def test_static_routes_keeps_normal_paths_only():
+    routes = [
+        route("10.1.0.0/16", ("10.0.1.254", 1), ("10.0.2.254", 2)),
+        route("2001:db8::/32", ("fe80::1", 1)),
+        route("10.0.1.5/32", ("10.0.1.5", 1)),                  # adjacency
+        route("10.0.1.1/32", ("0.0.0.0", 1), path_type=2),      # receive
+    ]
+    assert _static_routes(routes) == {
+        ("10.1.0.0/16", "10.0.1.254", 1), ("10.1.0.0/16", "10.0.2.254", 2), ("2001:db8::/32", "fe80::1", 1)}
+
+
+def test_static_key_normalises_address_only_mappings():
+    assert _static_key("10.0.0.5", None, "203.0.113.1", None, 6) == ("10.0.0.5", 0, "203.0.113.1", 0, 0)
+    assert _static_key("10.0.0.5", "80", "203.0.113.1", 8080, 6) == ("10.0.0.5", 80, "203.0.113.1", 8080, 6)
+
+
+def test_exported_config_applies_without_changes(vpp):
+    result = apply_config(vpp, export_config(vpp))
+    assert result["success"]
+    assert result["changes"] == [] and result["summary"] == {}
+
+
+def test_dry_run_plans_without_touching_vpp(vpp, monkeypatch):
+    monkeypatch.setattr(config_apply, "last_applied", {})
+    doc = {"prune": False, "routes": [{"destination": "198.51.100.0/24", "next_hop": "10.0.1.254",
+                                       "interface": "GigabitEthernet0/0/0"}]}
+    result = apply_config(vpp, doc, dry_run=True)
+    assert result["dry_run"] and result["summary"] == {"routes_add": 1}
+    assert targets(result) == ["198.51.100.0/24 via 10.0.1.254"]
+    assert apply_config(vpp, doc, dry_run=True)["summary"] == {"routes_add": 1}
+    assert config_apply.last_applied == {}
+
+
+def test_apply_adds_what_is_missing_and_is_then_idempotent(vpp, monkeypatch):
+    monkeypatch.setattr(config_apply, "last_applied", {})
+    doc = {"prune": False,
+           "interfaces": [{"name": "GigabitEthernet0/0/0", "addresses": ["10.0.1.1/24", "10.9.0.1/24"]}],
+           "routes": [{"destination": "198.51.100.0/24", "next_hop": "10.9.0.254"}]}
+    result = apply_config(vpp, doc)
+    assert result["success"]
+    assert result["summary"] == {"addresses_add": 1, "routes_add": 1}
+    assert targets(result, "addresses_add") == ["GigabitEthernet0/0/0 10.9.0.1/24"]
+    assert config_apply.last_applied[vpp.target]["document"] is doc
+
+    assert apply_config(vpp, doc)["changes"] == []
+
+
+def test_prune_removes_static_routes_but_not_connected_ones(vpp):
+    vpp.api.ip_route_add_del(is_add=True, route={
+        "table_id": 0, "prefix": ipaddress.ip_network("10.50.0.0/24"), "paths": [{"sw_if_index": 1}]})
+    keep = [{"destination": "100.0.0.0/24", "next_hop": "10.0.1.254", "interface": "GigabitEthernet0/0/0"}]
+    result = apply_config(vpp, {"routes": keep}, dry_run=True)
+    removed = targets(result, "routes_del")
+    assert len(removed) == 999
+    assert "100.0.0.0/24 via 10.0.1.254" not in removed
+    assert not any(t.startswith("10.50.0.0/24") for t in removed)
+    assert set(result["summary"]) == {"routes_del"}
+
+
+def test_unknown_sections_are_rejected(vpp):
+    with pytest.raises(ValueError):
+        apply_config(vpp, {"rutes": []})
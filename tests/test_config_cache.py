@@ -0,0 +1,75 @@
+import time
+
+from flask import Flask
+
+from vpp_cache import ConfigCache, cached_view, config_cache, view_response
+
+
+def test_put_and_get_at_the_current_version():
+    cache = ConfigCache()
+    version = cache.version("acls")
+    assert cache.get("acls") is None
+    assert cache.put("acls", version, ["a"]) == version
+    assert cache.get("acls") == (version, ["a"])
+
+
+def test_put_after_a_racing_write_is_dropped():
+    cache = ConfigCache()
+    version = cache.version("acls")
+    cache.invalidate("acls")
+    cache.put("acls", version, ["stale"])
+    assert cache.get("acls") is None
+
+
+def test_invalidate_reaches_registered_sub_views():
+    cache = ConfigCache()
+    for resource in ("routes", "routes:5", "routesx"):
+        cache.put(resource, cache.version(resource), [resource])
+
+    cache.invalidate("routes")
+    assert cache.get("routes") is None
+    assert cache.get("routes:5") is None
+    assert cache.get("routesx") == (0, ["routesx"])
+
+
+def test_clear_bumps_every_registered_version():
+    cache = ConfigCache()
+    versions = {r: cache.version(r) for r in ("acls", "nat_static:1")}
+    cache.clear()
+    for resource, version in versions.items():
+        assert cache.version(resource) == version + 1
+
+
+def test_max_age_expires_entries_and_changed_data_gets_a_new_version():
+    cache = ConfigCache()
+    version = cache.version("routes")
+    cache.put("routes", version, ["r1"])
+    time.sleep(0.02)
+    assert cache.get("routes", max_age=60) == (version, ["r1"])
+    assert cache.get("routes", max_age=0.01) is None
+
+    # unchanged re-dump keeps the version (and ETag); a changed one moves on
+    assert cache.put("routes", version, ["r1"]) == version
+    assert cache.put("routes", version, ["r1", "r2"]) == version + 1
+    assert cache.get("routes") == (version + 1, ["r1", "r2"])
+
+
+def test_advance_only_bumps_the_version_it_was_given():
+    cache = ConfigCache()
+    version = cache.version("routes")
+    assert cache.advance("routes", version) == version + 1
+    assert cache.advance("routes", version) is None
+
+
+def test_cached_view_answers_304_for_a_matching_etag():
+    app = Flask(__name__)
+    with app.test_request_context("/api/acls"):
+        view_response("acls-view-test", 0, [{"a": 1}])
+        tag = config_cache.etag("acls-view-test", 0)
+
+    with app.test_request_context("/api/acls", headers={"If-None-Match": f'"{tag}"'}):
+        assert cached_view("acls-view-test").status_code == 304
+    with app.test_request_context("/api/acls"):
+        response = cached_view("acls-view-test")
+        assert response.status_code == 200
+        assert response.get_etag()[0] == tag
@@ -0,0 +1,82 @@
+import gzip
+import json
+
+import pytest
+
+from config_snapshot import (
+    FILE_SUFFIX, SNAPSHOT_FORMAT, list_snapshots, load_snapshot, parse_snapshot, restore_snapshot, save_snapshot
+)
+from vpp_connection import DEFAULT_TARGET
+
+
+def test_save_and_load_round_trip(vpp, tmp_path):
+    info = save_snapshot(vpp, "before", directory=str(tmp_path))
+    assert info["name"] == "before" and info["target"] == vpp.target
+    assert info["counts"]["routes"] == 1000 and info["counts"]["dhcp_clients"] == 4
+    assert (tmp_path / ("before" + FILE_SUFFIX)).exists()
+
+    snapshot = load_snapshot("before", directory=str(tmp_path))
+    assert snapshot["document"]["routes"][0]["destination"] == "100.0.0.0/24"
+    assert [s["name"] for s in list_snapshots(str(tmp_path))] == ["before"]
+
+
+def test_restore_undoes_changes_made_since(vpp, tmp_path):
+    save_snapshot(vpp, "before", directory=str(tmp_path))
+    snapshot = load_snapshot("before", directory=str(tmp_path))
+    assert restore_snapshot(vpp, snapshot)["changes"] == []
+
+    vpp.api.sw_interface_set_flags(sw_if_index=1, flags=0)
+    result = restore_snapshot(vpp, snapshot, dry_run=True)
+    assert result["snapshot"] == "before"
+    assert result["changes"] == [{"phase": "interfaces", "action": "up", "target": "GigabitEthernet0/0/0"}]
+
+    assert restore_snapshot(vpp, snapshot)["success"]
+    assert restore_snapshot(vpp, snapshot, dry_run=True)["changes"] == []
+
+
+def test_parse_snapshot_rejects_other_documents():
+    with pytest.raises(ValueError):
+        parse_snapshot(json.dumps({"routes": []}).encode())
+    with pytest.raises(ValueError):
+        parse_snapshot(json.dumps({"format": SNAPSHOT_FORMAT, "version": 99, "document": {}}).encode())
+
+
+def test_bad_names_are_rejected(vpp, tmp_path):
+    with pytest.raises(ValueError):
+        save_snapshot(vpp, "../escape", directory=str(tmp_path))
+
+
+def write_snapshot(directory, name, target, created=1.0):
+    """A minimal snapshot file as another target's save_snapshot() would leave it."""
+    body = {"format": SNAPSHOT_FORMAT, "version": 1, "name": name, "target": target,
+            "created": created, "document": {"routes": []}}
+    (directory / (name + FILE_SUFFIX)).write_bytes(gzip.compress(json.dumps(body).encode()))
+
+
+def test_snapshots_are_kept_per_target(vpp, tmp_path):
+    write_snapshot(tmp_path, "edge-1", "edge")
+    save_snapshot(vpp, "mine", directory=str(tmp_path))
+
+    assert [s["name"] for s in list_snapshots(str(tmp_path))] == ["edge-1", "mine"]
+    assert [s["name"] for s in list_snapshots(str(tmp_path), target="edge")] == ["edge-1"]
+    assert [s["name"] for s in list_snapshots(str(tmp_path), target=vpp.target)] == ["mine"]
+
+    assert load_snapshot("edge-1", directory=str(tmp_path), target="edge")["name"] == "edge-1"
+    with pytest.raises(FileNotFoundError):
+        load_snapshot("edge-1", directory=str(tmp_path), target=vpp.target)
+
+
+def test_snapshots_without_a_target_belong_to_the_default_one(tmp_path):
+    write_snapshot(tmp_path, "old", None)
+    assert list_snapshots(str(tmp_path), target=DEFAULT_TARGET)[0]["target"] == DEFAULT_TARGET
+    assert load_snapshot("old", directory=str(tmp_path), target=DEFAULT_TARGET)["name"] == "old"
+
+
+def test_save_refuses_to_overwrite_another_targets_snapshot(vpp, tmp_path):
+    write_snapshot(tmp_path, "shared", "edge")
+    with pytest.raises(ValueError):
+        save_snapshot(vpp, "shared", directory=str(tmp_path))
+    assert load_snapshot("shared", directory=str(tmp_path))["target"] == "edge"
+
+    save_snapshot(vpp, "mine", directory=str(tmp_path))
+    assert save_snapshot(vpp, "mine", directory=str(tmp_path))["target"] == vpp.target
@@ -0,0 +1,72 @@
+from collections import deque
+
+import pytest
+
+from route_index import RouteTable
+
+PATH_A = (("192.0.2.1", 1),)
+PATH_B = (("192.0.2.2", 2),)
+
+
+@pytest.fixture
+def table():
+    table = RouteTable(0)
+    table.apply({"10.0.0.0/8": PATH_A, "10.1.0.0/16": PATH_A, "10.2.0.0/16": PATH_A})
+    return table
+
+
+def test_diff_reports_net_changes(table):
+    table.apply({"10.0.0.0/8": PATH_B, "10.1.0.0/16": PATH_A, "172.16.0.0/12": PATH_A})
+    added, removed, changed, version, digest = table.diff(1)
+    assert added == {"172.16.0.0/12": PATH_A}
+    assert removed == ["10.2.0.0/16"]
+    assert changed == {"10.0.0.0/8": (PATH_A, PATH_B)}
+    assert version == table.version and digest == table.digest
+
+
+def test_diff_cancels_changes_that_were_undone(table):
+    table.apply({"10.0.0.0/8": PATH_B, "10.1.0.0/16": PATH_A, "10.2.0.0/16": PATH_A,
+                 "192.168.0.0/16": PATH_A})
+    table.apply({"10.0.0.0/8": PATH_A, "10.1.0.0/16": PATH_A, "10.2.0.0/16": PATH_A})
+    assert table.version == 5
+    assert table.diff(1)[:3] == ({}, [], {})
+    # from the middle, the undo is the change
+    added, removed, changed, _, _ = table.diff(3)
+    assert added == {} and removed == ["192.168.0.0/16"]
+    assert changed == {"10.0.0.0/8": (PATH_B, PATH_A)}
+
+
+def test_diff_at_the_current_version_is_empty(table):
+    table.apply({"10.0.0.0/8": PATH_B})
+    assert table.diff(table.version)[:3] == ({}, [], {})
+
+
+def test_changes_since_pages_through_the_log(table):
+    table.apply({"10.0.0.0/8": PATH_B})
+    records, version, _ = table.changes_since(1, limit=1)
+    assert version == 4
+    assert len(records) == 1 and records[0][0] == 2
+    records, _, _ = table.changes_since(records[-1][0])
+    assert [record[0] for record in records] == [3, 4]
+    assert table.changes_since(4)[0] == []
+
+
+def test_resync_when_the_log_is_truncated_or_ahead(table):
+    table.changes = deque(maxlen=2)
+    table.apply({})
+    assert table.version == 4
+    assert table.changes_since(1)[0] is None
+    assert table.diff(1)[:3] == (None, None, None)
+    assert table.changes_since(2)[0] is not None
+    assert table.changes_since(5)[0] is None
+    assert table.diff(5)[0] is None
+
+
+def test_tokens_are_bound_to_one_build(table):
+    token = table.token(table.version)
+    assert table.parse_token(token) == 1
+    assert table.parse_token("") == 0
+    assert table.parse_token(None) == 0
+    assert RouteTable(0).parse_token(token) is None
+    with pytest.raises(ValueError):
+        table.parse_token(f"{table.epoch}:nope")
@@ -0,0 +1,119 @@
+import ipaddress
+import random
+
+import pytest
+
+from route_index import RadixTree, RouteTable, _prefix_key, address_int
+
+
+def build(prefixes, width=32):
+    tree = RadixTree(width)
+    for prefix in prefixes:
+        _family, key, length = _prefix_key(prefix)
+        tree.insert(key, length, prefix)
+    return tree
+
+
+def lookup(tree, ip):
+    node = tree.lookup(address_int(ip)[1])
+    return node.value if node is not None else None
+
+
+def brute_force(prefixes, ip):
+    addr = ipaddress.ip_address(ip)
+    matches = [ipaddress.ip_network(p) for p in prefixes if addr in ipaddress.ip_network(p)]
+    return str(max(matches, key=lambda n: n.prefixlen)) if matches else None
+
+
+def test_longest_prefix_wins():
+    tree = build(["10.0.0.0/8", "10.1.0.0/16", "10.1.2.0/24", "0.0.0.0/0"])
+    assert lookup(tree, "10.1.2.3") == "10.1.2.0/24"
+    assert lookup(tree, "10.1.3.3") == "10.1.0.0/16"
+    assert lookup(tree, "10.200.0.1") == "10.0.0.0/8"
+    assert lookup(tree, "192.0.2.1") == "0.0.0.0/0"
+    assert len(tree) == 4
+
+
+def test_no_default_route_means_no_match():
+    tree = build(["10.0.0.0/8"])
+    assert lookup(tree, "11.0.0.1") is None
+
+
+def test_host_routes_and_ipv6():
+    tree = build(["2001:db8::/32", "2001:db8:1::/48", "2001:db8:1::1/128"], width=128)
+    assert lookup(tree, "2001:db8:1::1") == "2001:db8:1::1/128"
+    assert lookup(tree, "2001:db8:1::2") == "2001:db8:1::/48"
+    assert lookup(tree, "2001:db8:ffff::1") == "2001:db8::/32"
+    assert lookup(tree, "2001:db9::1") is None
+
+
+def test_remove_falls_back_to_the_covering_prefix():
+    tree = build(["10.0.0.0/8", "10.1.0.0/16", "10.1.2.0/24"])
+    _f, key, length = _prefix_key("10.1.0.0/16")
+    assert tree.remove(key, length)
+    assert not tree.remove(key, length)
+    assert lookup(tree, "10.1.3.3") == "10.0.0.0/8"
+    assert lookup(tree, "10.1.2.3") == "10.1.2.0/24"
+    assert len(tree) == 2
+
+
+def test_matches_brute_force_on_random_tables():
+    rng = random.Random(7)
+    prefixes = set()
+    while len(prefixes) < 300:
+        length = rng.randint(0, 32)
+        net = ipaddress.ip_network((rng.getrandbits(32), length), strict=False)
+        prefixes.add(str(net))
+    prefixes = sorted(prefixes)
+    tree = build(prefixes)
+    removed = set(rng.sample(prefixes, 100))
+    for prefix in removed:
+        _f, key, length = _prefix_key(prefix)
+        assert tree.remove(key, length)
+    kept = [p for p in prefixes if p not in removed]
+
+    for _ in range(2000):
+        ip = str(ipaddress.IPv4Address(rng.getrandbits(32)))
+        assert lookup(tree, ip) == brute_force(kept, ip)
+    for prefix in kept:
+        ip = str(ipaddress.ip_network(prefix).network_address)
+        assert lookup(tree, ip) == brute_force(kept, ip)
+
+
+def test_address_int_rejects_garbage():
+    with pytest.raises(ValueError):
+        address_int("not-an-ip")
+
+
+PATH_A = (("192.0.2.1", 1),)
+PATH_B = (("192.0.2.2", 2),)
+
+
+def test_first_build_is_version_one_without_log():
+    table = RouteTable(0)
+    counts = table.apply({"10.0.0.0/8": PATH_A, "10.1.0.0/16": PATH_A})
+    assert counts == {"added": 2, "removed": 0, "changed": 0}
+    assert table.version == 1
+    assert not table.changes
+    assert table.lookup("10.1.2.3") == ("10.1.0.0/16", PATH_A)
+
+
+def test_refreshes_log_one_version_per_changed_prefix():
+    table = RouteTable(0)
+    table.apply({"10.0.0.0/8": PATH_A, "10.1.0.0/16": PATH_A})
+    counts = table.apply({"10.0.0.0/8": PATH_B, "172.16.0.0/12": PATH_A})
+    assert counts == {"added": 1, "removed": 1, "changed": 1}
+    assert table.version == 4
+    assert sorted((v, prefix) for v, prefix, _old, _new in table.changes) == [
+        (2, "10.0.0.0/8"), (3, "172.16.0.0/12"), (4, "10.1.0.0/16")]
+    assert table.lookup("10.1.2.3") == ("10.0.0.0/8", PATH_B)
+
+
+def test_digest_depends_only_on_the_routes():
+    a, b = RouteTable(0), RouteTable(0)
+    a.apply({"10.0.0.0/8": PATH_A})
+    a.apply({"10.0.0.0/8": PATH_A, "2001:db8::/32": PATH_B})
+    b.apply({"2001:db8::/32": PATH_B, "10.0.0.0/8": PATH_A})
+    assert a.digest == b.digest
+    a.apply({})
+    assert a.digest == 0
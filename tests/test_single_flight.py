@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from vpp_cache import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def dump():
+        calls.append(1)
+        release.wait(5)
+        return ["result"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do(("msg", "", "default"), dump)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert results == [["result"]] * 8
+
+
+def test_without_ttl_every_call_after_the_first_dumps_again():
+    flight = SingleFlight()
+    calls = []
+    assert flight.do("k", lambda: calls.append(1) or len(calls)) == 1
+    assert flight.do("k", lambda: calls.append(1) or len(calls)) == 2
+
+
+def test_ttl_keeps_result_until_invalidated():
+    flight = SingleFlight(ttl=60)
+    assert flight.do(("sw_interface_dump", "", "default"), lambda: 1) == 1
+    assert flight.do(("sw_interface_dump", "", "default"), lambda: 2) == 1
+
+    flight.invalidate("acl_dump")
+    assert flight.do(("sw_interface_dump", "", "default"), lambda: 3) == 1
+
+    flight.invalidate("sw_interface_dump")
+    assert flight.do(("sw_interface_dump", "", "default"), lambda: 4) == 4
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flight = SingleFlight(ttl=60)
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise IOError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", failing)
+        except IOError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert errors == ["boom"] * 4
+    assert flight.do("k", lambda: "ok") == "ok"
+
+
+def test_invalidate_during_a_dump_does_not_keep_its_result():
+    flight = SingleFlight(ttl=60)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "before write"
+
+    t = threading.Thread(target=flight.do, args=(("ip_route_dump", "", "default"), slow))
+    t.start()
+    started.wait(5)
+    flight.invalidate("ip_route_dump")
+    release.set()
+    t.join(5)
+
+    assert flight.do(("ip_route_dump", "", "default"), lambda: "after write") == "after write"
+
+
+def test_patch_updates_a_kept_result():
+    flight = SingleFlight(ttl=60)
+    flight.do(("acl_dump", repr([]), "default"), lambda: [1, 2])
+    flight.patch(lambda result: result + [3], "acl_dump")
+    assert flight.do(("acl_dump", repr([]), "default"), lambda: pytest.fail("dumped again")) == [1, 2, 3]
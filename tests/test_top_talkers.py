@@ -0,0 +1,103 @@
+import pytest
+
+import top_talkers
+from top_talkers import CounterSnapshots, sample_top_talkers, snapshots_for
+
+
+def table(names, rx_bytes, tx_bytes=None, drops=None):
+    n = len(names)
+    return {
+        "name": list(names),
+        "rx_bytes": list(rx_bytes),
+        "tx_bytes": list(tx_bytes or [0] * n),
+        "rx_packets": [b // 100 for b in rx_bytes],
+        "tx_packets": [0] * n,
+        "drops": list(drops or [0] * n),
+    }
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(top_talkers, "np", None)
+    elif top_talkers.np is None:
+        pytest.skip("numpy not installed")
+    return request.param
+
+
+def test_ranks_by_rate_and_aggregates_the_rest(backend):
+    then = table(["a", "b", "c", "d"], [0, 0, 0, 0])
+    now = table(["a", "b", "c", "d"], [1000, 5000, 3000, 10])
+    result = top_talkers.top_talkers(10.0, now, 0.0, then, metric="bps", k=2)
+
+    assert [row["name"] for row in result["top"]] == ["b", "c"]
+    assert result["top"][0]["bps"] == pytest.approx(5000 * 8 / 10)
+    assert result["other"]["count"] == 2
+    assert result["other"]["bps"] == pytest.approx((1000 + 10) * 8 / 10)
+
+
+def test_counter_resets_count_as_zero(backend):
+    then = table(["a", "b"], [5000, 100])
+    now = table(["a", "b"], [10, 600])
+    result = top_talkers.top_talkers(1.0, now, 0.0, then, k=5)
+    rates = {row["name"]: row["rx_bps"] for row in result["top"]}
+    assert rates == {"b": 4000.0, "a": 0.0}
+
+
+def test_rates_align_on_interface_name(backend):
+    then = table(["a", "b"], [100, 200])
+    now = table(["new", "b", "a"], [999, 1200, 300])
+    result = top_talkers.top_talkers(1.0, now, 0.0, then, k=3)
+    rates = {row["name"]: row["rx_bps"] for row in result["top"]}
+    # an interface without a baseline has no rate yet
+    assert rates == {"b": 8000.0, "a": 1600.0, "new": 0.0}
+
+
+def test_k_zero_returns_only_the_aggregate(backend):
+    now = table(["a", "b"], [100, 200])
+    result = top_talkers.top_talkers(1.0, now, 0.0, table(["a", "b"], [0, 0]), k=0)
+    assert result["top"] == []
+    assert result["other"]["count"] == 2
+
+
+def test_drops_and_direction(backend):
+    then = table(["a", "b"], [0, 0], tx_bytes=[0, 0], drops=[0, 0])
+    now = table(["a", "b"], [100, 0], tx_bytes=[0, 900], drops=[7, 1])
+    assert top_talkers.top_talkers(1.0, now, 0.0, then, metric="drops", k=1)["top"][0]["name"] == "a"
+    assert top_talkers.top_talkers(1.0, now, 0.0, then, direction="tx", k=1)["top"][0]["name"] == "b"
+    assert top_talkers.top_talkers(1.0, now, 0.0, then, direction="rx", k=1)["top"][0]["name"] == "a"
+
+
+def test_snapshots_keep_one_table_per_spacing_interval():
+    snaps = CounterSnapshots(max_age=100, min_spacing=1.0)
+    for ts in (0.0, 0.2, 0.4, 0.6, 1.5, 1.55):
+        snaps.add(ts, {"ts": ts})
+    assert len(snaps) == 3
+    assert snaps.baseline(1.7, window=1.0)[0] == 0.6
+
+
+def test_snapshots_drop_tables_older_than_max_age():
+    snaps = CounterSnapshots(max_age=10, min_spacing=0)
+    for ts in range(0, 30, 5):
+        snaps.add(float(ts), {})
+    assert snaps.baseline(25.0, window=100)[0] == 15.0
+
+
+def test_baseline_is_the_newest_table_at_least_window_old():
+    snaps = CounterSnapshots(max_age=100, min_spacing=0)
+    for ts in (0.0, 5.0, 8.0, 9.0):
+        snaps.add(ts, {})
+    assert snaps.baseline(10.0, window=4)[0] == 5.0
+    assert snaps.baseline(10.0, window=60)[0] == 0.0
+    assert snaps.baseline(0.0, window=1) is None
+
+
+def test_snapshot_history_is_kept_per_target():
+    assert snapshots_for("a") is snapshots_for("a")
+    assert snapshots_for("a") is not snapshots_for("b")
+
+
+def test_sample_takes_a_baseline_on_first_call(backend):
+    readings = iter([table(["a"], [0]), table(["a"], [800])])
+    result = sample_top_talkers(lambda: next(readings), CounterSnapshots(), window=0.05)
+    assert result["top"][0]["rx_bps"] > 0
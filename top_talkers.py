@@ -0,0 +1,190 @@
+"""
+Top-talker ranking from successive interface counter snapshots.
+
+Every /api/interfaces/top request reads the counters once and keeps the
+table in a short history, one per VPP target. Rates are taken against the snapshot closest to
+`window` seconds ago, and only the top K interfaces plus an "other"
+aggregate are returned.
+"""
+import heapq
+import threading
+import time
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+METRICS = ("bps", "pps", "drops")
+DIRECTIONS = ("both", "rx", "tx")
+
+# Snapshots older than this are dropped -- bounds the history whatever window is asked for
+MAX_WINDOW = 3600.0
+# Snapshots closer together than this replace each other, so the history holds
+# at most MAX_WINDOW / MIN_SPACING tables however often the endpoint is polled
+MIN_SPACING = 1.0
+
+
+class CounterSnapshots:
+    """Recent collect_interface_counters() tables, oldest first."""
+
+    def __init__(self, max_age=MAX_WINDOW, min_spacing=MIN_SPACING):
+        self.max_age = max_age
+        self.min_spacing = min_spacing
+        self._snaps = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._snaps)
+
+    def add(self, ts, columns):
+        with self._lock:
+            if len(self._snaps) > 1 and ts - self._snaps[-2][0] < self.min_spacing:
+                # keep the newest table of each spacing interval
+                self._snaps[-1] = (ts, columns)
+            else:
+                self._snaps.append((ts, columns))
+            while self._snaps and ts - self._snaps[0][0] > self.max_age:
+                self._snaps.popleft()
+
+    def baseline(self, ts, window):
+        """The newest snapshot at least `window` seconds before ts, else the oldest one before ts."""
+        with self._lock:
+            best = None
+            for snap_ts, columns in self._snaps:
+                if snap_ts >= ts:
+                    break
+                if best is None or snap_ts <= ts - window:
+                    best = (snap_ts, columns)
+            return best
+
+
+_snapshots = {}                  # VPP target name -> CounterSnapshots
+_snapshots_lock = threading.Lock()
+
+
+def snapshots_for(target):
+    """The snapshot history of one VPP target, so rates never mix two instances' counters."""
+    with _snapshots_lock:
+        snapshots = _snapshots.get(target)
+        if snapshots is None:
+            snapshots = _snapshots[target] = CounterSnapshots()
+        return snapshots
+
+
+def _per_second(now, then, elapsed):
+    """Counter deltas per second, aligned on interface name; resets count as 0."""
+    names = now["name"]
+    if list(then["name"]) == list(names):
+        index = None
+    else:
+        position = {name: i for i, name in enumerate(then["name"])}
+        index = [position.get(name) for name in names]
+
+    rates = {}
+    for field in ("rx_bytes", "tx_bytes", "rx_packets", "tx_packets", "drops"):
+        cur, prev = now[field], then[field]
+        if np is not None and index is None:
+            cur = np.asarray(cur, dtype=np.int64)
+            delta = cur - np.asarray(prev, dtype=np.int64)
+            rates[field] = np.clip(delta, 0, None) / elapsed
+        else:
+            col = []
+            for i in range(len(names)):
+                j = i if index is None else index[i]
+                delta = int(cur[i]) - int(prev[j]) if j is not None else 0
+                col.append(max(delta, 0) / elapsed)
+            rates[field] = np.asarray(col) if np is not None else col
+    return rates
+
+
+def _metric_column(rates, metric, direction):
+    if metric == "drops":
+        return rates["drops"]
+    field = "bytes" if metric == "bps" else "packets"
+    scale = 8 if metric == "bps" else 1
+    parts = [rates[f"{d}_{field}"] for d in (("rx", "tx") if direction == "both" else (direction,))]
+    if np is not None:
+        return sum(parts) * scale
+    return [sum(values) * scale for values in zip(*parts)]
+
+
+def _select_top(column, k):
+    """Row indexes of the k largest values, largest first."""
+    n = len(column)
+    if k <= 0:
+        return []
+    if k >= n:
+        return sorted(range(n), key=column.__getitem__, reverse=True)
+    if np is not None:
+        top = np.argpartition(column, n - k)[n - k:]
+        return top[np.argsort(column[top])[::-1]].tolist()
+    return heapq.nlargest(k, range(n), key=column.__getitem__)
+
+
+def _row(rates, i):
+    rx_bps, tx_bps = float(rates["rx_bytes"][i]) * 8, float(rates["tx_bytes"][i]) * 8
+    rx_pps, tx_pps = float(rates["rx_packets"][i]), float(rates["tx_packets"][i])
+    return {
+        "rx_bps": rx_bps, "tx_bps": tx_bps, "bps": rx_bps + tx_bps,
+        "rx_pps": rx_pps, "tx_pps": tx_pps, "pps": rx_pps + tx_pps,
+        "drops_per_sec": float(rates["drops"][i]),
+    }
+
+
+def top_talkers(now_ts, now, then_ts, then, metric="bps", k=10, direction="both"):
+    """
+    Rank interfaces by metric over [then_ts, now_ts]. Returns the top k rows
+    plus an "other" row summing every remaining interface.
+    """
+    elapsed = max(now_ts - then_ts, 1e-6)
+    rates = _per_second(now, then, elapsed)
+    column = _metric_column(rates, metric, direction)
+    top = _select_top(column, k)
+
+    rows = []
+    for i in top:
+        row = _row(rates, i)
+        row["name"] = now["name"][i]
+        rows.append(row)
+
+    # "other" = column totals minus the top rows, no second pass per interface
+    totals = {field: float(sum(col)) for field, col in rates.items()}
+    rx_bps, tx_bps = totals["rx_bytes"] * 8, totals["tx_bytes"] * 8
+    other = {
+        "rx_bps": rx_bps, "tx_bps": tx_bps, "bps": rx_bps + tx_bps,
+        "rx_pps": totals["rx_packets"], "tx_pps": totals["tx_packets"],
+        "pps": totals["rx_packets"] + totals["tx_packets"],
+        "drops_per_sec": totals["drops"],
+    }
+    for row in rows:
+        for key in other:
+            other[key] = max(other[key] - row[key], 0.0)
+    other["count"] = len(now["name"]) - len(rows)
+
+    return {
+        "metric": metric,
+        "direction": direction,
+        "elapsed": round(elapsed, 3),
+        "interfaces": len(now["name"]),
+        "top": rows,
+        "other": other,
+    }
+
+
+def sample_top_talkers(collect, snapshots, metric="bps", k=10, window=10.0, direction="both"):
+    """
+    Take a counter snapshot with collect(), remember it in `snapshots`, and
+    rank against the snapshot from about `window` seconds ago. The very first call has no
+    baseline, so it takes a second snapshot after min(window, 1) seconds.
+    """
+    now_ts, now = time.time(), collect()
+    baseline = snapshots.baseline(now_ts, window)
+    snapshots.add(now_ts, now)
+    if baseline is None:
+        time.sleep(min(window, 1.0))
+        baseline = (now_ts, now)
+        now_ts, now = time.time(), collect()
+        snapshots.add(now_ts, now)
+    return top_talkers(now_ts, now, baseline[0], baseline[1], metric, k, direction)
@@ -0,0 +1,122 @@
+"""
+Shared IPv4 / IPv6 address codec.
+
+Every blueprint converts VPP address fields through these helpers instead
+of hardcoding IPv4. Decoding accepts what vpp_papi (or the simulator)
+hands back -- raw bytes, ipaddress objects, vl_api_address_t (af + union),
+bare unions and prefixes -- and formats through one bytes-keyed memo, so
+the same next hop or pool address in a 100k-entry dump is formatted once.
+Encoding turns strings into the dicts the add/del messages take.
+"""
+import ipaddress
+import socket
+from functools import lru_cache
+
+# vl_api_address_family_t
+AF_IP4 = 0
+AF_IP6 = 1
+
+# vl_api_fib_path_nh_proto_t
+FIB_PATH_NH_PROTO_IP4 = 0
+FIB_PATH_NH_PROTO_IP6 = 1
+
+ZERO = {4: "0.0.0.0", 6: "::"}
+
+FORMAT_CACHE_SIZE = 1 << 16
+
+
+# ---------------------------------------------------------------------------
+# Decoding (VPP -> str)
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_packed(raw):
+    """Text form of a packed 4 or 16 byte address."""
+    if len(raw) == 4:
+        return socket.inet_ntoa(raw)
+    return socket.inet_ntop(socket.AF_INET6, raw)
+
+
+def format_union(un, af):
+    """Text form of a vl_api_address_union_t for the given family."""
+    value = un.ip6 if af == AF_IP6 else un.ip4
+    return format_address(value)
+
+
+def format_address(value):
+    """Text form of any VPP address value; None stays None."""
+    if isinstance(value, (bytes, bytearray)):
+        return format_packed(bytes(value))
+    if isinstance(value, ipaddress._BaseAddress):
+        return format_packed(value.packed)
+    if isinstance(value, str) or value is None:
+        return value
+    if hasattr(value, "af"):
+        return format_union(value.un, value.af)
+    if hasattr(value, "ip4"):
+        # a bare union: only one member is set by simple producers
+        return format_address(value.ip4 if value.ip4 is not None else value.ip6)
+    return str(value)
+
+
+def format_prefix(prefix):
+    """Prefix as "addr/len" from an ipaddress network / interface or a vl_api_prefix_t-like value."""
+    if isinstance(prefix, (ipaddress._BaseNetwork, ipaddress._BaseAddress)) or isinstance(prefix, str):
+        return str(prefix)
+    return f"{format_address(prefix.address)}/{prefix.len}"
+
+
+def format_nh(path):
+    """Next hop of a FIB path as text, using the path proto to pick the union member."""
+    nh = path.nh.address
+    if not hasattr(nh, "ip4"):
+        return format_address(nh)
+    af = AF_IP6 if getattr(path, "proto", FIB_PATH_NH_PROTO_IP4) == FIB_PATH_NH_PROTO_IP6 else AF_IP4
+    if af == AF_IP4 and nh.ip4 is None:
+        af = AF_IP6
+    return format_union(nh, af)
+
+
+def is_zero(address):
+    """True for 0.0.0.0 / :: (no next hop)."""
+    return address in ("0.0.0.0", "::")
+
+
+# ---------------------------------------------------------------------------
+# Encoding (str -> VPP)
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def parse_address(text):
+    """ipaddress object for an IPv4 / IPv6 address string; raises ValueError."""
+    return ipaddress.ip_address(text)
+
+
+def family(text):
+    """4 or 6."""
+    return parse_address(text.split("/", 1)[0]).version
+
+
+def address_family(version):
+    return AF_IP6 if version == 6 else AF_IP4
+
+
+def encode_address(text):
+    """vl_api_address_t dict for an address string."""
+    ip = parse_address(text)
+    key = "ip6" if ip.version == 6 else "ip4"
+    return {"af": address_family(ip.version), "un": {key: ip.packed}}
+
+
+def encode_prefix(cidr):
+    """vl_api_prefix_t dict for "addr/len" (host bits kept, as interface addresses need)."""
+    iface = ipaddress.ip_interface(cidr)
+    return {"address": encode_address(str(iface.ip)), "len": iface.network.prefixlen}
+
+
+def parse_ip4(text):
+    """IPv4Address for IPv4-only features (NAT44, DHCPv4); ValueError for anything else."""
+    ip = parse_address(text)
+    if ip.version != 4:
+        raise ValueError(f"{text} is not an IPv4 address")
+    return ip
@@ -0,0 +1,250 @@
+import os
+import threading
+import time
+from flask import make_response, request
+from json_provider import table_response, wants_columnar
+from vpp_connection import DEFAULT_TARGET, current_target
+
+# Seconds a finished dump stays reusable. 0 = only coalesce concurrent calls.
+VPP_DUMP_TTL = float(os.environ.get("VPP_DUMP_TTL", "0"))
+
+
+class _Call:
+    """One in-flight dump that concurrent callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = 0.0
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent read-only VPP API calls.
+    The first caller runs the dump, everyone else with the same key waits
+    and gets the same decoded result.
+    """
+
+    def __init__(self, ttl=0.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call.done.is_set():
+                if call.error is None and time.monotonic() - call.finished_at < self.ttl:
+                    return call.result
+                call = None
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+        call.finished_at = time.monotonic()
+        call.done.set()
+
+        with self._lock:
+            # Keep finished calls only while they can still serve the TTL
+            if (call.error is not None or self.ttl <= 0) and self._calls.get(key) is call:
+                del self._calls[key]
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def invalidate(self, *messages):
+        """Drop results for the given message names (all if none given)."""
+        with self._lock:
+            for key in list(self._calls):
+                if messages and key[0] not in messages:
+                    continue
+                # An in-flight call may have read VPP before the write: it still
+                # answers the callers already waiting on it, but leaves the map
+                # so later callers start a fresh dump and its result is not kept.
+                del self._calls[key]
+
+    def cached(self, msg, **kwargs):
+        """True if a finished result for this dump is being kept (only with a TTL)."""
+        with self._lock:
+            call = self._calls.get(_make_key(msg, kwargs))
+            return call is not None and call.done.is_set() and call.error is None
+
+    def patch(self, fn, msg, **kwargs):
+        """
+        Replace the kept result for this dump with fn(result), so a write that
+        knows exactly what changed can update the cache instead of dropping it.
+        """
+        with self._lock:
+            call = self._calls.get(_make_key(msg, kwargs))
+            if call is not None and call.done.is_set() and call.error is None:
+                call.result = fn(call.result)
+
+
+dump_flight = SingleFlight(ttl=VPP_DUMP_TTL)
+
+
+def _make_key(msg, kwargs, target=None):
+    # dumps of different VPP targets never share a result
+    return (msg, repr(sorted(kwargs.items())), target or current_target())
+
+
+def cached_dump(v, msg, **kwargs):
+    """
+    Run a read-only VPP API call (e.g. sw_interface_dump) through the
+    single-flight layer and return its decoded result as a list.
+    """
+    api_call = getattr(v.api, msg)
+    key = _make_key(msg, kwargs, getattr(v, "target", DEFAULT_TARGET))
+    return dump_flight.do(key, lambda: list(api_call(**kwargs)))
+
+
+def invalidate_on_write(bp, *messages):
+    """
+    Register an after_request hook on a blueprint that drops cached dumps
+    for the given messages whenever one of its mutating endpoints runs.
+    """
+
+    @bp.after_request
+    def _invalidate_dumps(response):
+        if request.method not in ("GET", "HEAD", "OPTIONS"):
+            dump_flight.invalidate(*messages)
+        return response
+
+    return _invalidate_dumps
+
+
+class ConfigCache:
+    """
+    Versioned cache of decoded config listings (ACLs, NAT tables, routes).
+    These mostly change through our own POST/DELETE endpoints, which bump the
+    resource version so the next GET re-dumps from VPP. Listings that also
+    change outside the GUI (routes) are read with a max_age, and a re-dump
+    that finds different data moves them to a new version. Resources are
+    kept per VPP target (the current request's, see vpp_fleet).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._boot = format(int(time.time() * 1000), "x")
+        self._versions = {}
+        self._entries = {}
+
+    def version(self, resource):
+        key = (current_target(), resource)
+        with self._lock:
+            # registered so a parent invalidate() reaches it before the first put()
+            return self._versions.setdefault(key, 0)
+
+    def etag(self, resource, version):
+        # columnar and row views of the same version are different representations
+        fmt = "c" if wants_columnar() else "r"
+        return f"{self._boot}-{current_target()}-{resource}-{version}-{fmt}"
+
+    def get(self, resource, max_age=None):
+        """Return (version, data) if a current entry (stored at most max_age seconds ago) exists, else None."""
+        key = (current_target(), resource)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self._versions.get(key, 0):
+                return None
+            if max_age is not None and time.monotonic() - entry[2] > max_age:
+                return None
+            return entry[:2]
+
+    def put(self, resource, version, data):
+        """Store a listing dumped at `version`; returns the version it is tagged with."""
+        key = (current_target(), resource)
+        with self._lock:
+            # A write that raced with the dump already bumped the version
+            if version != self._versions.get(key, 0):
+                return version
+            old = self._entries.get(key)
+            if old is not None and old[1] != data:
+                # re-dumped after max_age and changed outside the GUI: clients' ETags are stale
+                version = self._versions[key] = version + 1
+            self._entries[key] = (version, data, time.monotonic())
+            return version
+
+    def advance(self, resource, version):
+        """
+        Bump a resource that was found changed outside the GUI as of
+        `version`. Returns the new version, or None if a write bumped it
+        meanwhile (so the caller's copy is already behind).
+        """
+        key = (current_target(), resource)
+        with self._lock:
+            if self._versions.get(key, 0) != version:
+                return None
+            self._bump([key])
+            return self._versions[key]
+
+    def invalidate(self, *resources):
+        """Bump each resource and its "resource:..." sub-views (per-VRF listings)."""
+        target = current_target()
+        with self._lock:
+            for resource in resources:
+                prefix = resource + ":"
+                keys = [(target, resource)] + [k for k in self._versions
+                                               if k[0] == target and k[1].startswith(prefix)]
+                self._bump(keys)
+
+    def _bump(self, keys):
+        for key in keys:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Invalidate every listing of every target, including ones being dumped right now."""
+        with self._lock:
+            self._bump(list(self._versions))
+
+
+config_cache = ConfigCache()
+
+
+def cached_view(resource, max_age=None):
+    """
+    Serve a GET from the config cache: 304 if the client's If-None-Match
+    matches the current version, the cached listing otherwise.
+    Returns None when the listing has to be dumped from VPP again.
+    """
+    entry = config_cache.get(resource, max_age)
+    if entry is None:
+        return None
+
+    version, data = entry
+    tag = config_cache.etag(resource, version)
+    if request.if_none_match.contains(tag):
+        response = make_response("", 304)
+        response.set_etag(tag)
+        return response
+
+    response = table_response(data)
+    response.set_etag(tag)
+    return response
+
+
+def view_response(resource, version, data):
+    """Store a freshly dumped listing and return it with its ETag."""
+    version = config_cache.put(resource, version, data)
+    tag = config_cache.etag(resource, version)
+    if request.if_none_match.contains(tag):
+        # re-dumped after max_age, unchanged
+        response = make_response("", 304)
+    else:
+        response = table_response(data)
+    response.set_etag(tag)
+    return response
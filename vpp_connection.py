@@ -1,69 +1,307 @@
-from flask import g
-from vpp_papi.vpp_papi import VPPApiClient
-from vpp_papi.vpp_stats import VPPStats
+from flask import g, has_request_context
+from vpp_trace import traced_api
+import itertools
+import json
 import logging
+import os
+import threading
 
-VPP_API_SOCKET = "/run/vpp/api.sock"
-VPP_STATS_SOCKET = "/dev/shm/vpp/stats.sock"
+log = logging.getLogger(__name__)
+
+VPP_API_SOCKET = os.environ.get("VPP_API_SOCKET", "/run/vpp/api.sock")
+VPP_STATS_SOCKET = os.environ.get("VPP_STATS_SOCKET", "/dev/shm/vpp/stats.sock")
+
+# Fleet mode: JSON list of {"name", "api_socket", "stats_socket", "timeout"}
+# registered next to the "default" target built from the two sockets above
+VPP_FLEET_FILE = os.environ.get("VPP_FLEET_FILE", "")
+# Idle API connections kept per target between requests (0 = connect per request)
+VPP_POOL_SIZE = int(os.environ.get("VPP_POOL_SIZE", "4"))
+# Seconds a target gets to answer an API call or a fleet fan-out query
+VPP_TARGET_TIMEOUT = float(os.environ.get("VPP_TARGET_TIMEOUT", "5"))
+
+DEFAULT_TARGET = "default"
+
+# VPP_SIMULATOR=1 swaps in the synthetic dataplane from vpp_sim (load tests, benchmarks)
+VPP_SIMULATOR = os.environ.get("VPP_SIMULATOR", "0") not in ("", "0", "false", "no")
+
+if VPP_SIMULATOR:
+    from vpp_sim import SimVPPApiClient as VPPApiClient
+    from vpp_sim import SimVPPStats as VPPStats
+else:
+    from vpp_papi.vpp_papi import VPPApiClient
+    from vpp_papi.vpp_stats import VPPStats
+
+# Bumped when VPP restarts; long-lived connections from an older generation are dead
+_generations = itertools.count(1)
+connection_generation = next(_generations)
+
+
+def new_connection_generation():
+    """Mark every open connection stale (called by the watchdog after a VPP restart)."""
+    global connection_generation
+    connection_generation = next(_generations)
+    return connection_generation
+
+
+def connection_stale(v):
+    """True if v was opened before the last VPP restart and should be reconnected."""
+    return getattr(v, "generation", connection_generation) != connection_generation
+
+
+class VppTarget:
+    """One VPP instance the GUI manages: its API and stats sockets."""
+
+    def __init__(self, name, api_socket, stats_socket=None, timeout=VPP_TARGET_TIMEOUT):
+        if not name or "/" in name:
+            raise ValueError(f"invalid target name {name!r}")
+        if not api_socket:
+            raise ValueError(f"target {name}: api_socket is required")
+        self.name = name
+        self.api_socket = api_socket
+        self.stats_socket = stats_socket
+        self.timeout = float(timeout)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("name"), data.get("api_socket"), data.get("stats_socket"),
+                   data.get("timeout", VPP_TARGET_TIMEOUT))
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "api_socket": self.api_socket,
+            "stats_socket": self.stats_socket,
+            "timeout": self.timeout,
+        }
+
+
+class ConnectionPool:
+    """
+    Idle API connections to one target, each with its own stats segment
+    mapping, handed out to one request at a time. A connection is pinged
+    before reuse, so one left behind by a VPP restart is replaced.
+    """
+
+    def __init__(self, target, size):
+        self.target = target
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = []
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def acquire(self, client_name):
+        while True:
+            with self._lock:
+                v = self._idle.pop() if self._idle else None
+            if v is None:
+                break
+            if not connection_stale(v):
+                try:
+                    v.api.control_ping()
+                    with self._lock:
+                        self.reused += 1
+                    return v
+                except Exception as e:
+                    log.debug("Dropping dead pooled connection to %s: %s", self.target.name, e)
+            with self._lock:
+                self.discarded += 1
+            disconnect_vpp(v)
+
+        v = connect_vpp(client_name, self.target)
+        with self._lock:
+            self.created += 1
+        return v
+
+    def release(self, v, broken=False):
+        """Keep v for reuse, unless it failed, is stale or was opened to a since replaced target."""
+        reusable = not broken and getattr(v, "vpp_target", None) is self.target and not connection_stale(v)
+        with self._lock:
+            if reusable and len(self._idle) < self.size:
+                self._idle.append(v)
+                return
+        disconnect_vpp(v)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for v in idle:
+            disconnect_vpp(v)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded,
+            }
+
+
+_registry_lock = threading.Lock()
+_targets = {DEFAULT_TARGET: VppTarget(DEFAULT_TARGET, VPP_API_SOCKET, VPP_STATS_SOCKET)}
+_pools = {}
+
+
+def targets():
+    """Registered targets, default first."""
+    with _registry_lock:
+        return sorted(_targets.values(), key=lambda t: (t.name != DEFAULT_TARGET, t.name))
+
+
+def get_target(name):
+    with _registry_lock:
+        return _targets.get(name)
+
+
+def register_target(target):
+    """Add or replace a target; connections to a replaced one are closed."""
+    with _registry_lock:
+        _targets[target.name] = target
+        old = _pools.pop(target.name, None)
+    if old is not None:
+        old.close()
+    return target
+
+
+def unregister_target(name):
+    if name == DEFAULT_TARGET:
+        raise ValueError("the default target cannot be removed")
+    with _registry_lock:
+        target = _targets.pop(name, None)
+        old = _pools.pop(name, None)
+    if old is not None:
+        old.close()
+    return target
+
+
+def load_fleet_file(path):
+    """Register every target listed in a VPP_FLEET_FILE."""
+    with open(path) as f:
+        entries = json.load(f)
+    loaded = [register_target(VppTarget.from_dict(entry)) for entry in entries]
+    log.info("Fleet: %d target(s) from %s", len(loaded), path)
+    return loaded
+
+
+def target_pool(name):
+    """Connection pool of a registered target; KeyError if it is unknown."""
+    with _registry_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = _pools[name] = ConnectionPool(_targets[name], VPP_POOL_SIZE)
+        return pool
+
+
+def current_target():
+    """Target of the current request (see vpp_fleet); the default target outside requests."""
+    if has_request_context():
+        return g.get("vpp_target", DEFAULT_TARGET)
+    return DEFAULT_TARGET
+
+
+def connect_vpp(client_name, target=None):
+    """
+    Open a VPP API connection (plus stats segment if available) outside of a
+    Flask request, e.g. for background workers. target is a VppTarget or a
+    registered name, the default target if omitted. Raises if VPP is
+    unreachable; close it again with disconnect_vpp().
+    """
+    if not isinstance(target, VppTarget):
+        name = target or DEFAULT_TARGET
+        target = get_target(name)
+        if target is None:
+            raise ValueError(f"unknown VPP target {name!r}")
+
+    generation = connection_generation
+    v = VPPApiClient(server_address=target.api_socket, read_timeout=target.timeout)
+    v.connect(client_name)
+    v.api = traced_api(v.api)
+    v.generation = generation
+    v.target = target.name
+    v.vpp_target = target        # the exact registration, see ConnectionPool.release()
+
+    v.vpp_stats = None
+    if target.stats_socket:
+        try:
+            v.vpp_stats = VPPStats(socketname=target.stats_socket)
+        except Exception as e:
+            log.warning("⚠ Could not connect to VPP stats of %s: %s", target.name, e)
+    return v
+
+
+def disconnect_vpp(v):
+    """Close a connection opened with connect_vpp()."""
+    try:
+        v.disconnect()
+    except Exception:
+        log.exception("Error disconnecting VPP API")
+
+    stats = getattr(v, "vpp_stats", None)
+    if stats is not None and hasattr(stats, "close"):
+        try:
+            stats.close()
+        except Exception:
+            log.exception("Error closing VPP stats")
 
 
 def get_vpp_for_request():
     """
-    Provides a fresh VPP connection for the current Flask request.
-    Connection is closed automatically in teardown_appcontext.
+    Provides a VPP connection to the request's target for the current Flask
+    request, taken from the target's pool. It goes back to the pool (or is
+    closed) automatically in teardown_appcontext.
     """
     # If already created during this request -- use it
     if hasattr(g, "vpp") and g.vpp is not None:
         return g.vpp
 
     try:
-        # Create API client
-        v = VPPApiClient(server_address=VPP_API_SOCKET, read_timeout=5)
-        v.connect("vpp-gui-request")
-        logging.info("✓ Connected to VPP API (per-request)")
-
-        # Try connecting stats
-        try:
-            stats = VPPStats(socketname=VPP_STATS_SOCKET)
-            v.vpp_stats = stats
-            g.vpp_stats = stats
-        except Exception as e:
-            logging.warning(f"⚠ Could not connect to VPP stats: {e}")
-            g.vpp_stats = None
+        # Pooled API client (and stats, if available)
+        v = target_pool(current_target()).acquire("vpp-gui-request")
+        log.debug("✓ Connected to VPP API %s (per-request)", v.target)
+        g.vpp_stats = v.vpp_stats
 
         # store in flask.g so route handlers can reuse within same request
         g.vpp = v
         return v
 
     except Exception as e:
-        logging.error(f"❌ Failed to connect to VPP API: {e}")
+        log.error("❌ Failed to connect to VPP API: %s", e)
         g.vpp = None
         g.vpp_stats = None
         return None
 
 
+def mark_failed_request(response):
+    """
+    A 5xx answer may come from a connection in a bad state: don't pool it
+    again. Hooks that replace the response call this first.
+    """
+    if response.status_code >= 500:
+        g.vpp_broken = True
+    return response
+
+
 def close_vpp_connection(response_or_exc):
     """
     This function will be called automatically after each request.
-    It cleans up VPP API & stats connections.
+    It hands the request's VPP connection back to its target's pool; the
+    pool closes it (API and stats) if it is full or the request failed:
+    raised, answered 5xx, or saw an API call fail (g.vpp_broken).
     """
     v = g.pop("vpp", None)
-    stats = g.pop("vpp_stats", None)
+    g.pop("vpp_stats", None)
+    failed = g.pop("vpp_broken", False)
 
-    # Close VPP API connection
     if v:
+        broken = failed or isinstance(response_or_exc, BaseException)
         try:
-            v.disconnect()
-            logging.info("✓ VPP API disconnected (per-request)")
-        except Exception:
-            logging.exception("Error disconnecting VPP API")
-
-    # Close stats connection if possible
-    if stats and hasattr(stats, "close"):
-        try:
-            stats.close()
-        except Exception:
-            logging.exception("Error closing VPP stats")
+            target_pool(v.target).release(v, broken=broken)
+        except KeyError:
+            # target unregistered during the request
+            disconnect_vpp(v)
 
     return response_or_exc
 
@@ -72,4 +310,5 @@ def init_vpp_teardown(app):
     """
     Call this from create_app() to register automatic cleanup.
     """
+    app.after_request(mark_failed_request)
     app.teardown_appcontext(close_vpp_connection)
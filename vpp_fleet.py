@@ -0,0 +1,129 @@
+"""
+Fleet mode: one GUI backend managing many VPP instances.
+
+Targets are registered in vpp_connection (the "default" one from
+VPP_API_SOCKET / VPP_STATS_SOCKET, more from VPP_FLEET_FILE or
+/api/fleet/targets). Every existing endpoint works against any target;
+a request picks it with
+
+  * a path prefix:   /fleet/<target>/api/routes
+  * a header:        X-VPP-Target: <target>
+  * a query arg:     /api/routes?target=<target>
+
+and gets a pooled connection to it from get_vpp_for_request(). Dump and
+listing caches, the route index and the top-talker history are kept per
+target. Background services (counter recorder, alerts, NAT session index
+and exports, watchdog) follow the default target; their endpoints refuse
+others.
+
+fan_out() runs one function against many targets concurrently in a
+thread pool, each bounded by its target's timeout.
+"""
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import g, jsonify, request
+
+from vpp_connection import (
+    DEFAULT_TARGET, VPP_FLEET_FILE, current_target, get_target, load_fleet_file, target_pool, targets
+)
+
+log = logging.getLogger(__name__)
+
+# Threads shared by all fan-out queries
+VPP_FLEET_WORKERS = int(os.environ.get("VPP_FLEET_WORKERS", "16"))
+
+PATH_PREFIX = "/fleet/"
+TARGET_HEADER = "X-VPP-Target"
+
+_executor = ThreadPoolExecutor(VPP_FLEET_WORKERS, thread_name_prefix="vpp-fleet")
+
+
+class TargetPrefixMiddleware:
+    """Rewrites /fleet/<target>/api/... to /api/... and remembers the target in the environ."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if path.startswith(PATH_PREFIX):
+            name, sep, rest = path[len(PATH_PREFIX):].partition("/")
+            if name and sep:
+                environ["vpp.target"] = name
+                environ["PATH_INFO"] = "/" + rest
+        return self.wsgi_app(environ, start_response)
+
+
+def _select_target():
+    name = (request.environ.get("vpp.target")
+            or request.headers.get(TARGET_HEADER)
+            or request.args.get("target")
+            or DEFAULT_TARGET)
+    if get_target(name) is None:
+        return jsonify({"error": f"Unknown VPP target {name!r}"}), 404
+    g.vpp_target = name
+
+
+def default_target_only(view):
+    """For endpoints backed by a background service, which only watches the default target."""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_target() != DEFAULT_TARGET:
+            return jsonify({"error": f"Only available for the {DEFAULT_TARGET!r} VPP target"}), 400
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def _run(name, fn):
+    pool = target_pool(name)
+    started = time.perf_counter()
+    v = pool.acquire("vpp-gui-fleet")
+    broken = True
+    try:
+        result = fn(v)
+        broken = False
+        return result, (time.perf_counter() - started) * 1000.0
+    finally:
+        pool.release(v, broken=broken)
+
+
+def fan_out(fn, names=None, timeout=None):
+    """
+    Run fn(v) against every target (or the named ones) concurrently.
+    Returns {name: {"ok": True, "result", "ms"} | {"ok": False, "error"}};
+    a target that has not answered within its timeout (or `timeout`)
+    is reported as failed while its call finishes in the background.
+    """
+    selected = [t for t in targets() if names is None or t.name in names]
+    unknown = set(names or ()) - {t.name for t in selected}
+    if unknown:
+        raise ValueError(f"unknown VPP target(s): {', '.join(sorted(unknown))}")
+
+    started = time.monotonic()
+    futures = {t.name: (t, _executor.submit(_run, t.name, fn)) for t in selected}
+    results = {}
+    for name, (target, future) in futures.items():
+        limit = timeout if timeout is not None else target.timeout
+        try:
+            result, ms = future.result(timeout=max(0.0, started + limit - time.monotonic()))
+            results[name] = {"ok": True, "result": result, "ms": round(ms, 3)}
+        except FutureTimeoutError:
+            results[name] = {"ok": False, "error": f"timed out after {limit:g}s"}
+        except Exception as e:
+            log.warning("Fleet query on %s failed: %s", name, e)
+            results[name] = {"ok": False, "error": str(e)}
+    return results
+
+
+def init_fleet(app):
+    """Call this from create_app() to enable per-request target selection (and load VPP_FLEET_FILE)."""
+    if VPP_FLEET_FILE:
+        load_fleet_file(VPP_FLEET_FILE)
+    app.wsgi_app = TargetPrefixMiddleware(app.wsgi_app)
+    app.before_request(_select_target)
@@ -0,0 +1,76 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+# Root level, e.g. VPP_LOG_LEVEL=DEBUG brings back the per-call handler messages
+VPP_LOG_LEVEL = os.environ.get("VPP_LOG_LEVEL", "INFO").upper()
+
+# Per-module overrides: VPP_LOG_LEVELS="api.nat=DEBUG,vpp.trace=INFO,werkzeug=WARNING"
+VPP_LOG_LEVELS = os.environ.get("VPP_LOG_LEVELS", "")
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s"
+
+_listener = None
+log = logging.getLogger(__name__)
+
+
+def parse_levels(spec):
+    """'api.nat=DEBUG,werkzeug=WARNING' -> {'api.nat': 'DEBUG', 'werkzeug': 'WARNING'}"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def valid_level(level):
+    """True for a level name logging knows, e.g. 'DEBUG' (but not 'VERBOSE')."""
+    return isinstance(logging.getLevelName(level), int)
+
+
+def set_module_levels(levels):
+    for name, level in levels.items():
+        if not valid_level(level):
+            log.warning("Ignoring invalid log level %r for %s", level, name)
+            continue
+        logging.getLogger(name).setLevel(level)
+
+
+def init_logging(app=None):
+    """
+    Route all logging through a queue so request threads never block on
+    log I/O. A single QueueListener thread does the formatting and writing.
+    Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.SimpleQueue()
+
+    output = logging.StreamHandler()
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(VPP_LOG_LEVEL if valid_level(VPP_LOG_LEVEL) else logging.INFO)
+
+    # Flask adds its own stderr handler to app.logger; let records go through the queue instead
+    if app is not None:
+        app.logger.handlers.clear()
+        app.logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    # warn once the handler is in place
+    if not valid_level(VPP_LOG_LEVEL):
+        log.warning("Invalid VPP_LOG_LEVEL %r, using INFO", VPP_LOG_LEVEL)
+    set_module_levels(parse_levels(VPP_LOG_LEVELS))
+    return _listener
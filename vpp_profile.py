@@ -0,0 +1,306 @@
+"""
+Opt-in live profiling for hot endpoints.
+
+Two surfaces, both off by default:
+
+* ?profile=1 (JSON summary), ?profile=folded (flamegraph text) or
+  ?profile=cprofile (pstats text) on any request, allowed only when the
+  X-Profile-Token header matches VPP_PROFILE_TOKEN.
+* A rolling stack sampler (VPP_PROFILE_SAMPLER=1) for the blueprints
+  listed in VPP_PROFILE_BLUEPRINTS, served at /api/debug/profile.
+
+Stacks are emitted in the folded "frame;frame;frame count" format that
+flamegraph.pl / speedscope read. Every sample is also attributed to VPP
+I/O, decoding, JSON encoding or other.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from flask import g, jsonify, request, current_app
+
+from vpp_connection import mark_failed_request
+
+VPP_PROFILE_TOKEN = os.environ.get("VPP_PROFILE_TOKEN", "")
+VPP_PROFILE_SAMPLER = os.environ.get("VPP_PROFILE_SAMPLER", "0") not in ("", "0", "false", "no")
+VPP_PROFILE_BLUEPRINTS = {b for b in os.environ.get("VPP_PROFILE_BLUEPRINTS", "").split(",") if b}
+VPP_PROFILE_INTERVAL = float(os.environ.get("VPP_PROFILE_INTERVAL", "0.005"))
+VPP_PROFILE_WINDOW = float(os.environ.get("VPP_PROFILE_WINDOW", "300"))
+
+CATEGORIES = ("vpp_io", "decoding", "encoding", "other")
+
+# Matched against a frame's module file name, or for packages its directory
+_VPP_IO_MODULES = {"vpp_sim.py"}
+_VPP_IO_PACKAGES = {"vpp_papi"}
+_ENCODING_MODULES = {"json_provider.py", "binary_formats.py"}
+_ENCODING_PACKAGES = {"json", "msgpack", "pyarrow"}
+_DECODING_MODULES = {"vpp_records.py", "vpp_address.py", "ipaddress.py"}
+_API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api")
+
+
+# ---------------------------------------------------------------------------
+# Stack folding / attribution
+# ---------------------------------------------------------------------------
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def fold_stack(frame):
+    """Return (folded stack string root->leaf, category) for one thread frame."""
+    names = []
+    files = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        files.append(frame.f_code.co_filename)
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names), categorize(files)
+
+
+def _file_category(filename):
+    directory, module = os.path.split(filename)
+    package = os.path.basename(directory)
+    if module in _VPP_IO_MODULES or package in _VPP_IO_PACKAGES:
+        return "vpp_io"
+    if module in _ENCODING_MODULES or package in _ENCODING_PACKAGES:
+        return "encoding"
+    if module in _DECODING_MODULES:
+        return "decoding"
+    return None
+
+
+def categorize(files):
+    """
+    Attribute a sample (files listed leaf first) to the innermost frame
+    that belongs to a known module. A handler in api/ is on every request
+    stack, so it only counts as decoding when it is the leaf itself.
+    """
+    for filename in files:
+        category = _file_category(filename)
+        if category is not None:
+            return category
+    if files and os.path.dirname(os.path.abspath(files[0])) == _API_DIR:
+        return "decoding"
+    return "other"
+
+
+class StackSamples:
+    """Folded stack counts plus per-category sample counts."""
+
+    def __init__(self):
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.samples = 0
+
+    def add(self, frame):
+        stack, category = fold_stack(frame)
+        self.stacks[stack] += 1
+        self.categories[category] += 1
+        self.samples += 1
+
+    def merge(self, other):
+        self.stacks.update(other.stacks)
+        self.categories.update(other.categories)
+        self.samples += other.samples
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, interval):
+        return {
+            "samples": self.samples,
+            "interval_ms": interval * 1000.0,
+            "categories": {c: self.categories.get(c, 0) for c in CATEGORIES},
+            "category_ms": {c: round(self.categories.get(c, 0) * interval * 1000.0, 3) for c in CATEGORIES},
+            "top_stacks": [{"stack": s, "samples": n} for s, n in self.stacks.most_common(20)],
+        }
+
+
+# ---------------------------------------------------------------------------
+# Per-request sampler (?profile=)
+# ---------------------------------------------------------------------------
+
+class ThreadSampler(threading.Thread):
+    """Samples one thread's stack every interval until stopped."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = StackSamples()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples.add(frame)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.samples
+
+
+def _profile_authorized():
+    return bool(VPP_PROFILE_TOKEN) and request.headers.get("X-Profile-Token") == VPP_PROFILE_TOKEN
+
+
+def _start_request_profile():
+    mode = request.args.get("profile")
+    if not mode:
+        return None
+    if not _profile_authorized():
+        return jsonify({"error": "Profiling requires a valid X-Profile-Token"}), 403
+
+    g.profile_mode = mode
+    g.profile_started = time.perf_counter()
+    if mode == "cprofile":
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+    else:
+        g.profiler = ThreadSampler(threading.get_ident(), VPP_PROFILE_INTERVAL)
+        g.profiler.start()
+    return None
+
+
+def _stop_profiler(profiler):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        return None
+    return profiler.stop()
+
+
+def _finish_request_profile(response):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    # runs before vpp_connection's own hook, which would only see the profile's 200
+    mark_failed_request(response)
+
+    mode = g.pop("profile_mode")
+    wall_ms = (time.perf_counter() - g.pop("profile_started")) * 1000.0
+    try:
+        if response.is_streamed:
+            # reading an event stream here would never return
+            return response
+        # make sure the body (JSON encoding) is part of the profile
+        response.get_data()
+    finally:
+        samples = _stop_profiler(profiler)
+
+    if mode == "cprofile":
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        return current_app.response_class(out.getvalue(), mimetype="text/plain")
+
+    if mode == "folded":
+        return current_app.response_class(samples.folded(), mimetype="text/plain")
+
+    result = samples.summary(VPP_PROFILE_INTERVAL)
+    result.update({"path": request.path, "status": response.status_code, "wall_ms": round(wall_ms, 3)})
+    return jsonify(result)
+
+
+def _abort_request_profile(exc):
+    # after_request is skipped when the view raised; don't leave a sampler running
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        _stop_profiler(profiler)
+
+
+# ---------------------------------------------------------------------------
+# Rolling sampler for selected blueprints
+# ---------------------------------------------------------------------------
+
+class RollingSampler(threading.Thread):
+    """
+    Background sampler over request threads currently serving one of the
+    selected blueprints. Keeps the current and the previous window.
+    """
+
+    def __init__(self, interval, window):
+        super().__init__(daemon=True, name="vpp-profile-sampler")
+        self.interval = interval
+        self.window = window
+        self._lock = threading.Lock()
+        self._active = {}           # thread id -> blueprint
+        self._current = {}          # blueprint -> StackSamples
+        self._previous = {}
+        self._window_start = time.monotonic()
+
+    def enter(self, blueprint):
+        with self._lock:
+            self._active[threading.get_ident()] = blueprint
+
+    def leave(self):
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                active = dict(self._active)
+            frames = sys._current_frames()
+            with self._lock:
+                if time.monotonic() - self._window_start > self.window:
+                    self._previous = self._current
+                    self._current = {}
+                    self._window_start = time.monotonic()
+                for thread_id, blueprint in active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        self._current.setdefault(blueprint, StackSamples()).add(frame)
+
+    def snapshot(self, blueprint=None):
+        merged = StackSamples()
+        with self._lock:
+            for window in (self._previous, self._current):
+                for name, samples in window.items():
+                    if blueprint in (None, name):
+                        merged.merge(samples)
+        return merged
+
+    def reset(self):
+        with self._lock:
+            self._current = {}
+            self._previous = {}
+            self._window_start = time.monotonic()
+
+
+rolling_sampler = RollingSampler(VPP_PROFILE_INTERVAL, VPP_PROFILE_WINDOW) if VPP_PROFILE_SAMPLER else None
+
+
+def _sampler_enter():
+    if request.blueprint in VPP_PROFILE_BLUEPRINTS or (not VPP_PROFILE_BLUEPRINTS and request.blueprint):
+        rolling_sampler.enter(request.blueprint)
+
+
+def _sampler_leave(exc):
+    rolling_sampler.leave()
+
+
+def init_profiler(app):
+    """
+    Call this from create_app() to enable ?profile= (needs VPP_PROFILE_TOKEN)
+    and the rolling sampler (VPP_PROFILE_SAMPLER=1).
+    """
+    if VPP_PROFILE_TOKEN:
+        app.before_request(_start_request_profile)
+        app.after_request(_finish_request_profile)
+        app.teardown_request(_abort_request_profile)
+
+    if rolling_sampler is not None:
+        app.before_request(_sampler_enter)
+        app.teardown_request(_sampler_leave)
+        if not rolling_sampler.is_alive():
+            rolling_sampler.start()
@@ -0,0 +1,167 @@
+from operator import itemgetter
+from vpp_address import format_address, format_prefix
+
+
+# ---------------------------------------------------------------------------
+# Field converters (picked once per field, not per message)
+# ---------------------------------------------------------------------------
+
+def _optional_int(value):
+    return int(value) if value else None
+
+
+def _raw(value):
+    return value
+
+
+CONVERTERS = {
+    'ip': format_address,
+    'prefix': format_prefix,
+    'int': int,
+    'opt_int': _optional_int,
+    'bool': bool,
+    'raw': _raw,
+}
+
+
+# ---------------------------------------------------------------------------
+# Record types
+# ---------------------------------------------------------------------------
+
+class Record:
+    """
+    Base for decoded VPP objects. Subclasses list their FIELDS as
+    (attribute, message field, converter kind, default) and get matching
+    __slots__, so big dumps allocate one small object per entry.
+    """
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Session(Record):
+    FIELDS = (
+        ('inside_ip', 'inside_ip_address', 'ip', None),
+        ('inside_port', 'inside_port', 'int', 0),
+        ('outside_ip', 'outside_ip_address', 'ip', None),
+        ('outside_port', 'outside_port', 'int', 0),
+        ('protocol', 'protocol', 'int', 0),
+    )
+    __slots__ = tuple(f[0] for f in FIELDS)
+
+
+class StaticMapping(Record):
+    FIELDS = (
+        ('local_ip', 'local_ip_address', 'ip', None),
+        ('local_port', 'local_port', 'opt_int', None),
+        ('external_ip', 'external_ip_address', 'ip', None),
+        ('external_port', 'external_port', 'opt_int', None),
+        ('protocol', 'protocol', 'opt_int', None),
+        ('vrf_id', 'vrf_id', 'int', 0),
+    )
+    __slots__ = tuple(f[0] for f in FIELDS)
+
+
+class NatAddress(Record):
+    FIELDS = (
+        ('ip_address', 'ip_address', 'ip', None),
+        ('vrf_id', 'vrf_id', 'int', 0),
+    )
+    __slots__ = tuple(f[0] for f in FIELDS)
+
+
+class AclRule(Record):
+    FIELDS = (
+        ('is_permit', 'is_permit', 'int', 0),
+        ('src_prefix', 'src_prefix', 'prefix', None),
+        ('dst_prefix', 'dst_prefix', 'prefix', None),
+        ('proto', 'proto', 'int', 0),
+        ('src_port_min', 'srcport_or_icmptype_first', 'int', 0),
+        ('src_port_max', 'srcport_or_icmptype_last', 'int', 0),
+        ('dst_port_min', 'dstport_or_icmpcode_first', 'int', 0),
+        ('dst_port_max', 'dstport_or_icmpcode_last', 'int', 0),
+    )
+    __slots__ = tuple(f[0] for f in FIELDS)
+
+
+class DhcpLease(Record):
+    FIELDS = (
+        ('sw_if_index', 'sw_if_index', 'int', 0),
+        ('state', 'state', 'int', 0),
+        ('is_ipv6', 'is_ipv6', 'bool', False),
+        ('hostname', 'hostname', 'raw', None),
+        ('mask_width', 'mask_width', 'int', 0),
+        ('host_address', 'host_address', 'ip', None),
+        ('router_address', 'router_address', 'ip', None),
+    )
+    __slots__ = tuple(f[0] for f in FIELDS)
+
+
+# ---------------------------------------------------------------------------
+# Decoders, compiled once per (record type, message definition)
+# ---------------------------------------------------------------------------
+
+_decoders = {}
+
+
+def _field_reader(msg_type, source, default):
+    # vpp_papi messages are namedtuples: index lookups beat getattr
+    fields = getattr(msg_type, '_fields', None)
+    if fields is not None:
+        if source in fields:
+            return itemgetter(fields.index(source))
+        return lambda msg: default
+    return lambda msg: getattr(msg, source, default)
+
+
+def _compile(record_cls, msg_type):
+    steps = []
+    for _name, source, kind, default in record_cls.FIELDS:
+        read = _field_reader(msg_type, source, default)
+        convert = CONVERTERS[kind]
+        steps.append((read, convert, default))
+
+    def decode(msg):
+        values = []
+        for read, convert, default in steps:
+            value = read(msg)
+            values.append(default if value is None else convert(value))
+        return record_cls(*values)
+
+    return decode
+
+
+def decoder_for(record_cls, msg_type):
+    key = (record_cls, msg_type)
+    decode = _decoders.get(key)
+    if decode is None:
+        decode = _decoders[key] = _compile(record_cls, msg_type)
+    return decode
+
+
+def decode(record_cls, msg):
+    """Decode one dumped VPP message into record_cls."""
+    return decoder_for(record_cls, type(msg))(msg)
+
+
+def decode_all(record_cls, msgs):
+    """Decode a whole dump, reusing the compiled decoder while the message type stays the same."""
+    result = []
+    last_type = None
+    convert = None
+    for msg in msgs:
+        if type(msg) is not last_type:
+            last_type = type(msg)
+            convert = decoder_for(record_cls, last_type)
+        result.append(convert(msg))
+    return result
@@ -0,0 +1,863 @@
+"""
+Local stand-in for VPPApiClient / VPPStats.
+
+Serves synthetic interfaces, FIB routes, ACLs, NAT44 sessions and DHCP
+clients at configurable scale so the blueprints can be load tested and
+benchmarked without a running VPP. Enable it with VPP_SIMULATOR=1; the
+dataset size and latency model come from the VPP_SIM_* variables below.
+
+Dump entries are generated from their index on each call (like VPP
+encoding them on each dump), so 1M routes or 5M sessions cost memory only
+while a reply is being built. Changes made through the API are kept in
+small overlays on top of the synthetic data.
+"""
+import ipaddress
+import os
+import threading
+import time
+from collections import namedtuple
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+# ---- dataset scale ----
+SIM_INTERFACES = _env_int("VPP_SIM_INTERFACES", 16)
+SIM_ROUTES = _env_int("VPP_SIM_ROUTES", 1000)
+SIM_ACLS = _env_int("VPP_SIM_ACLS", 10)
+SIM_ACL_RULES = _env_int("VPP_SIM_ACL_RULES", 20)
+SIM_NAT_USERS = _env_int("VPP_SIM_NAT_USERS", 100)
+SIM_SESSIONS_PER_USER = _env_int("VPP_SIM_SESSIONS_PER_USER", 50)
+SIM_STATIC_MAPPINGS = _env_int("VPP_SIM_STATIC_MAPPINGS", 20)
+SIM_DHCP_CLIENTS = _env_int("VPP_SIM_DHCP_CLIENTS", 4)
+SIM_WORKER_THREADS = _env_int("VPP_SIM_WORKER_THREADS", 2)
+
+# ---- latency model (microseconds) ----
+# every request/reply round-trip pays CALL latency, every reply entry pays ITEM latency
+SIM_CALL_LATENCY_US = _env_int("VPP_SIM_CALL_LATENCY_US", 100)
+SIM_ITEM_LATENCY_US = _env_int("VPP_SIM_ITEM_LATENCY_US", 1)
+SIM_CONNECT_LATENCY_US = _env_int("VPP_SIM_CONNECT_LATENCY_US", 2000)
+
+
+# ---------------------------------------------------------------------------
+# Message shapes (field names follow the VPP .api definitions)
+# ---------------------------------------------------------------------------
+
+Reply = namedtuple("Reply", "retval")
+ControlPingReply = namedtuple("ControlPingReply", "retval client_index vpe_pid")
+AclAddReplaceReply = namedtuple("AclAddReplaceReply", "retval acl_index")
+ShowVersionReply = namedtuple("ShowVersionReply", "retval program version build_date build_directory")
+CliInbandReply = namedtuple("CliInbandReply", "retval reply")
+DhcpVersionReply = namedtuple("DhcpVersionReply", "major minor")
+Nat44RunningConfig = namedtuple("Nat44RunningConfig", "retval inside_vrf outside_vrf users sessions user_sessions flags")
+
+SwInterfaceDetails = namedtuple(
+    "SwInterfaceDetails",
+    "sw_if_index sup_sw_if_index interface_name flags mtu link_speed sub_id sub_outer_vlan_id type "
+    "sub_inner_vlan_id",
+    defaults=(0,)
+)
+BdSwIf = namedtuple("BdSwIf", "context sw_if_index shg")
+BridgeDomainDetails = namedtuple("BridgeDomainDetails", "bd_id bvi_sw_if_index n_sw_ifs sw_if_details")
+AddressUnion = namedtuple("AddressUnion", "ip4 ip6")
+Address = namedtuple("Address", "af un")
+Prefix = namedtuple("Prefix", "address len")
+IpAddressDetails = namedtuple("IpAddressDetails", "sw_if_index prefix")
+
+FibPathNh = namedtuple("FibPathNh", "address via_label obj_id classify_table_index")
+FibPath = namedtuple(
+    "FibPath",
+    "sw_if_index table_id rpf_id weight preference type flags proto nh n_labels label_stack"
+)
+IpRoute = namedtuple("IpRoute", "table_id stats_index prefix n_paths paths")
+IpRouteDetails = namedtuple("IpRouteDetails", "route")
+IpTable = namedtuple("IpTable", "table_id is_ip6 name")
+IpTableDetails = namedtuple("IpTableDetails", "table")
+
+AclRule = namedtuple(
+    "AclRule",
+    "is_permit src_prefix dst_prefix proto srcport_or_icmptype_first srcport_or_icmptype_last "
+    "dstport_or_icmpcode_first dstport_or_icmpcode_last tcp_flags_mask tcp_flags_value"
+)
+AclDetails = namedtuple("AclDetails", "acl_index tag count r")
+AclInterfaceListDetails = namedtuple("AclInterfaceListDetails", "sw_if_index count n_input acls")
+
+Nat44InterfaceDetails = namedtuple("Nat44InterfaceDetails", "sw_if_index flags")
+Nat44AddressDetails = namedtuple("Nat44AddressDetails", "ip_address flags vrf_id")
+Nat44UserDetails = namedtuple("Nat44UserDetails", "vrf_id ip_address nsessions nstaticsessions")
+Nat44UserSessionDetails = namedtuple(
+    "Nat44UserSessionDetails",
+    "outside_ip_address outside_port inside_ip_address inside_port protocol flags "
+    "last_heard total_bytes total_pkts ext_host_address ext_host_port"
+)
+Nat44StaticMappingDetails = namedtuple(
+    "Nat44StaticMappingDetails",
+    "flags local_ip_address external_ip_address protocol local_port external_port "
+    "external_sw_if_index vrf_id tag"
+)
+
+DhcpClient = namedtuple("DhcpClient", "sw_if_index hostname id want_dhcp_event set_broadcast_flag dscp pid")
+DhcpLease = namedtuple(
+    "DhcpLease",
+    "sw_if_index state is_ipv6 hostname mask_width host_address router_address host_mac count domain_server"
+)
+DhcpClientDetails = namedtuple("DhcpClientDetails", "client lease")
+DhcpServer = namedtuple("DhcpServer", "server_vrf_id dhcp_server")
+DhcpProxyDetails = namedtuple(
+    "DhcpProxyDetails",
+    "rx_vrf_id vss_oui vss_fib_id vss_type is_ipv6 vss_vpn_ascii_id dhcp_src_address count servers"
+)
+
+IF_STATUS_API_FLAG_ADMIN_UP = 1
+IF_STATUS_API_FLAG_LINK_UP = 2
+NAT44_IF_INSIDE = 0x20
+NAT44_IF_OUTSIDE = 0x10
+
+_ROUTE_BASE = int(ipaddress.IPv4Address("100.0.0.0"))
+_USER_BASE = int(ipaddress.IPv4Address("10.128.0.0"))
+_OUTSIDE_BASE = int(ipaddress.IPv4Address("198.51.100.0"))
+_MAPPING_BASE = int(ipaddress.IPv4Address("192.168.0.0"))
+_PUBLIC_BASE = int(ipaddress.IPv4Address("203.0.113.0"))
+_EMPTY_LABELS = [{"label": 0, "ttl": 0, "exp": 0, "is_uniform": 0}] * 16
+
+
+def _ip4(value):
+    return ipaddress.IPv4Address(value)
+
+
+def _ip_bytes(value):
+    """Packed address from bytes, an ipaddress object / string, or an address / union dict."""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if isinstance(value, dict):
+        value = value.get("un", value)
+        value = value["ip6"] if "ip6" in value else value["ip4"]
+        return _ip_bytes(value)
+    return ipaddress.ip_address(value).packed
+
+
+def _ip(packed):
+    return ipaddress.ip_address(packed)
+
+
+def _address(packed):
+    """vl_api_address_t-shaped value for a packed address."""
+    if len(packed) == 16:
+        return Address(1, AddressUnion(None, _ip(packed)))
+    return Address(0, AddressUnion(packed, None))
+
+
+def _prefix_to_network(prefix):
+    """Accept both ip_route_add_del and _v2 prefix dicts (or an ip_network)."""
+    if isinstance(prefix, ipaddress._BaseNetwork):
+        return prefix
+    return ipaddress.ip_network((_ip_bytes(prefix["address"]), prefix["len"]), strict=False)
+
+
+# ---------------------------------------------------------------------------
+# Shared simulated dataplane
+# ---------------------------------------------------------------------------
+
+class SimDataplane:
+    """
+    The simulated VPP instance. All SimVPPApiClient connections share it,
+    like per-request papi clients share one VPP process.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.started = time.time()
+        self.epoch = 1
+        self.running = True
+        self.next_client_index = 0
+        self.reset()
+
+    def reset(self):
+        """Wipe all API-made changes (what a VPP restart does to the GUI's config)."""
+        with self.lock:
+            self.next_sw_if_index = SIM_INTERFACES
+            self.extra_interfaces = {}      # sw_if_index -> SwInterfaceDetails
+            self.deleted_interfaces = set()
+            self.if_flags = {}              # sw_if_index -> flags override
+            self.if_addresses = {}          # sw_if_index -> {(packed, len)}, overrides synthetic
+            self.routes_added = {}          # (table_id, network) -> list of paths
+            self.routes_deleted = set()     # (table_id, network)
+            self.tables = {0: ""}
+            self.acls = {}                  # acl_index -> AclDetails
+            self.deleted_acls = set()
+            self.next_acl_index = SIM_ACLS
+            self.acl_bindings = {}          # sw_if_index -> (n_input, [acls])
+            self.nat_enabled = True
+            self.nat_interfaces = {}
+            self.nat_addresses = {}         # (packed, vrf) -> flags
+            self.static_added = {}
+            self.static_deleted = set()
+            self.dhcp_clients = {}
+            self.dhcp_deleted = set()
+            self.dhcp_proxies = {}
+            self.bridge_members = {}        # sw_if_index -> (bd_id, shg, port_type)
+
+    def restart(self):
+        """Simulate a VPP restart: config is lost and the stats epoch moves on."""
+        with self.lock:
+            self.reset()
+            self.started = time.time()
+            self.epoch += 1
+            self.running = True
+
+    def stop(self):
+        """Simulate VPP going down: new connections are refused until restart()."""
+        with self.lock:
+            self.running = False
+
+    @property
+    def pid(self):
+        return 1000 + self.epoch
+
+    # ---- interfaces ----
+
+    def interface_count(self):
+        return self.next_sw_if_index
+
+    def _synthetic_interface(self, i):
+        name = "local0" if i == 0 else f"GigabitEthernet{(i - 1) // 64}/{((i - 1) // 8) % 8}/{(i - 1) % 8}"
+        flags = self.if_flags.get(i, 0 if i == 0 else IF_STATUS_API_FLAG_ADMIN_UP | IF_STATUS_API_FLAG_LINK_UP)
+        return SwInterfaceDetails(i, i, name, flags, [9000, 0, 0, 0], 10000000, 0, 0, 0)
+
+    def interface(self, i):
+        if i in self.deleted_interfaces:
+            return None
+        if i in self.extra_interfaces:
+            details = self.extra_interfaces[i]
+            return details._replace(flags=self.if_flags.get(i, details.flags))
+        if 0 <= i < SIM_INTERFACES:
+            return self._synthetic_interface(i)
+        return None
+
+    def interfaces(self):
+        result = []
+        for i in range(self.next_sw_if_index):
+            details = self.interface(i)
+            if details is not None:
+                result.append(details)
+        return result
+
+    def addresses(self, sw_if_index):
+        if sw_if_index in self.if_addresses:
+            return sorted(self.if_addresses[sw_if_index])
+        if 1 <= sw_if_index < min(SIM_INTERFACES, 65536):
+            return [(bytes([10, sw_if_index >> 8, sw_if_index & 0xFF, 1]), 24)]
+        return []
+
+    # ---- routes ----
+
+    def _synthetic_route(self, k):
+        network = ipaddress.IPv4Network((_ROUTE_BASE + (k << 8), 24))
+        sw_if_index = 1 + k % max(SIM_INTERFACES - 1, 1)
+        nh = bytes([10, sw_if_index >> 8, sw_if_index & 0xFF, 254])
+        return network, [(sw_if_index, nh)]
+
+    def route_entries(self, table_id):
+        """Yield (network, [(sw_if_index, nh_bytes)]) for one table."""
+        if table_id == 0:
+            for k in range(SIM_ROUTES):
+                network, paths = self._synthetic_route(k)
+                if (0, network) not in self.routes_deleted and (0, network) not in self.routes_added:
+                    yield network, paths
+        for (tid, network), paths in list(self.routes_added.items()):
+            if tid == table_id:
+                yield network, paths
+
+    # ---- ACLs ----
+
+    def _synthetic_acl(self, idx):
+        rules = []
+        for r in range(SIM_ACL_RULES):
+            src = ipaddress.IPv4Network((int(ipaddress.IPv4Address("10.0.0.0")) + ((idx * SIM_ACL_RULES + r) << 8), 24))
+            rules.append(AclRule(r % 2, src, ipaddress.IPv4Network("0.0.0.0/0"), 6,
+                                 0, 65535, 1000 + r, 1000 + r, 0, 0))
+        return AclDetails(idx, f"sim-acl-{idx}".encode(), len(rules), rules)
+
+    def acl(self, idx):
+        if idx in self.deleted_acls:
+            return None
+        if idx in self.acls:
+            return self.acls[idx]
+        if 0 <= idx < SIM_ACLS:
+            return self._synthetic_acl(idx)
+        return None
+
+    # ---- NAT ----
+
+    def user_count(self):
+        return SIM_NAT_USERS if self.nat_enabled else 0
+
+    def user_sessions(self, user):
+        now = time.time()
+        base = user * SIM_SESSIONS_PER_USER
+        inside = _ip4(_USER_BASE + user)
+        result = []
+        for s in range(SIM_SESSIONS_PER_USER):
+            k = base + s
+            result.append(Nat44UserSessionDetails(
+                _ip4(_OUTSIDE_BASE + k % 256), 1024 + k % 64000,
+                inside, 10000 + s, (6, 17, 1)[k % 3], 0,
+                int(now) - k % 300, 1500 * (1 + k % 100), 1 + k % 100,
+                _ip4(_PUBLIC_BASE + k % 256), 443
+            ))
+        return result
+
+
+dataplane = SimDataplane()
+
+
+# ---------------------------------------------------------------------------
+# API client
+# ---------------------------------------------------------------------------
+
+def _delay(n_items=0):
+    us = SIM_CALL_LATENCY_US + n_items * SIM_ITEM_LATENCY_US
+    if us > 0:
+        time.sleep(us / 1e6)
+
+
+class _SimApi:
+    """Implements the v.api.<message>() calls the blueprints use."""
+
+    def __init__(self, dp, client_index=0):
+        self._dp = dp
+        self._client_index = client_index
+        self._epoch = dp.epoch
+
+    # ---- system ----
+
+    def show_version(self):
+        _delay()
+        return ShowVersionReply(0, "vpe", "sim-24.10", time.ctime(self._dp.started), "/sim")
+
+    def cli_inband(self, cmd=""):
+        _delay()
+        with self._dp.lock:
+            lines = [f"{i.interface_name:<40}{i.sw_if_index:>8}  {'up' if i.flags & 1 else 'down'}"
+                     for i in self._dp.interfaces()]
+        return CliInbandReply(0, "\n".join(lines) + "\n")
+
+    def control_ping(self):
+        _delay()
+        # a connection made before a restart (or while down) is dead, like a closed socket
+        if not self._dp.running or self._epoch != self._dp.epoch:
+            raise ConnectionResetError("VPP API connection lost")
+        return ControlPingReply(0, self._client_index, self._dp.pid)
+
+    # ---- interfaces ----
+
+    def sw_interface_dump(self, sw_if_index=0xFFFFFFFF, name_filter_valid=False, name_filter="", **kwargs):
+        with self._dp.lock:
+            if sw_if_index != 0xFFFFFFFF:
+                details = self._dp.interface(sw_if_index)
+                result = [details] if details is not None else []
+            else:
+                result = self._dp.interfaces()
+        if name_filter_valid:
+            # VPP matches the filter as a substring of the name
+            result = [d for d in result if name_filter in d.interface_name]
+        _delay(len(result))
+        return result
+
+    def sw_interface_set_flags(self, sw_if_index, flags):
+        _delay()
+        with self._dp.lock:
+            current = self._dp.interface(sw_if_index)
+            if current is None:
+                raise ValueError(f"sw_interface_set_flags: invalid sw_if_index {sw_if_index}")
+            link = current.flags & IF_STATUS_API_FLAG_LINK_UP
+            self._dp.if_flags[sw_if_index] = (flags & IF_STATUS_API_FLAG_ADMIN_UP) | link
+        return Reply(0)
+
+    def ip_address_dump(self, sw_if_index, is_ipv6=False):
+        with self._dp.lock:
+            addrs = [(packed, plen) for packed, plen in self._dp.addresses(sw_if_index)
+                     if (len(packed) == 16) == bool(is_ipv6)]
+        result = [IpAddressDetails(sw_if_index, Prefix(_address(packed), plen)) for packed, plen in addrs]
+        _delay(len(result))
+        return result
+
+    def sw_interface_add_del_address(self, sw_if_index, is_add, prefix, del_all=0):
+        _delay()
+        with self._dp.lock:
+            if self._dp.interface(sw_if_index) is None:
+                raise ValueError(f"sw_interface_add_del_address: invalid sw_if_index {sw_if_index}")
+            current = set(self._dp.addresses(sw_if_index))
+            entry = (_ip_bytes(prefix["address"]), int(prefix["len"]))
+            if del_all:
+                current = set()
+            elif is_add:
+                current.add(entry)
+            else:
+                current.discard(entry)
+            self._dp.if_addresses[sw_if_index] = current
+        return Reply(0)
+
+    def create_loopback(self, mac_address=None):
+        _delay()
+        with self._dp.lock:
+            i = self._dp.next_sw_if_index
+            self._dp.next_sw_if_index += 1
+            self._dp.extra_interfaces[i] = SwInterfaceDetails(i, i, f"loop{i}", 0, [9000, 0, 0, 0], 0, 0, 0, 0)
+        return namedtuple("CreateLoopbackReply", "retval sw_if_index")(0, i)
+
+    def create_loopback_instance(self, mac_address=None, is_specified=False, user_instance=0):
+        if not is_specified:
+            return self.create_loopback(mac_address)
+        _delay()
+        name = f"loop{int(user_instance)}"
+        with self._dp.lock:
+            for details in self._dp.extra_interfaces.values():
+                if details.interface_name == name and details.sw_if_index not in self._dp.deleted_interfaces:
+                    raise ValueError(f"create_loopback_instance: {name} already exists")
+            i = self._dp.next_sw_if_index
+            self._dp.next_sw_if_index += 1
+            self._dp.extra_interfaces[i] = SwInterfaceDetails(i, i, name, 0, [9000, 0, 0, 0], 0, 0, 0, 0)
+        return namedtuple("CreateLoopbackInstanceReply", "retval sw_if_index")(0, i)
+
+    def create_vlan_subif(self, sw_if_index, vlan_id):
+        return self.create_subif(sw_if_index=sw_if_index, sub_id=vlan_id, outer_vlan_id=vlan_id, sub_if_flags=0)
+
+    def create_subif(self, sw_if_index, sub_id, outer_vlan_id=0, inner_vlan_id=0, sub_if_flags=0):
+        _delay()
+        with self._dp.lock:
+            parent = self._dp.interface(sw_if_index)
+            if parent is None:
+                raise ValueError(f"create_subif: invalid sw_if_index {sw_if_index}")
+            name = f"{parent.interface_name}.{sub_id}"
+            for details in self._dp.extra_interfaces.values():
+                if details.interface_name == name and details.sw_if_index not in self._dp.deleted_interfaces:
+                    raise ValueError(f"create_subif: {name} already exists")
+            i = self._dp.next_sw_if_index
+            self._dp.next_sw_if_index += 1
+            self._dp.extra_interfaces[i] = SwInterfaceDetails(
+                i, sw_if_index, name, 0, list(parent.mtu), parent.link_speed, sub_id, outer_vlan_id, 1,
+                inner_vlan_id)
+        return namedtuple("CreateSubifReply", "retval sw_if_index")(0, i)
+
+    def _delete_interface(self, sw_if_index):
+        _delay()
+        with self._dp.lock:
+            if sw_if_index not in self._dp.extra_interfaces or sw_if_index in self._dp.deleted_interfaces:
+                raise ValueError(f"invalid sw_if_index {sw_if_index}")
+            self._dp.deleted_interfaces.add(sw_if_index)
+            self._dp.bridge_members.pop(sw_if_index, None)
+        return Reply(0)
+
+    def delete_subif(self, sw_if_index):
+        return self._delete_interface(sw_if_index)
+
+    def delete_loopback(self, sw_if_index):
+        return self._delete_interface(sw_if_index)
+
+    def sw_interface_set_l2_bridge(self, rx_sw_if_index, bd_id=0, port_type=0, shg=0, enable=True):
+        _delay()
+        with self._dp.lock:
+            if enable:
+                self._dp.bridge_members[rx_sw_if_index] = (int(bd_id), int(shg), int(port_type))
+            else:
+                self._dp.bridge_members.pop(rx_sw_if_index, None)
+        return Reply(0)
+
+    def bridge_domain_dump(self, bd_id=0xFFFFFFFF, sw_if_index=0xFFFFFFFF):
+        _delay()
+        with self._dp.lock:
+            domains = {}
+            for member, (bd, shg, port_type) in sorted(self._dp.bridge_members.items()):
+                if bd_id != 0xFFFFFFFF and bd != bd_id:
+                    continue
+                bvi, members = domains.setdefault(bd, [0xFFFFFFFF, []])
+                if port_type == 1:
+                    domains[bd][0] = member
+                members.append(BdSwIf(0, member, shg))
+        return [BridgeDomainDetails(bd, bvi, len(members), members)
+                for bd, (bvi, members) in sorted(domains.items())]
+
+    # ---- routes ----
+
+    def ip_table_dump(self):
+        with self._dp.lock:
+            result = [IpTableDetails(IpTable(tid, is_ip6, name))
+                      for tid, name in sorted(self._dp.tables.items()) for is_ip6 in (False, True)]
+        _delay(len(result))
+        return result
+
+    def ip_table_add_del(self, is_add, table):
+        _delay()
+        with self._dp.lock:
+            tid = int(table["table_id"])
+            if is_add:
+                self._dp.tables[tid] = table.get("name", "")
+            elif tid != 0:
+                self._dp.tables.pop(tid, None)
+        return Reply(0)
+
+    def ip_route_dump(self, table):
+        table_id = int(table.get("table_id", 0))
+        version = 6 if table.get("is_ip6") else 4
+        with self._dp.lock:
+            entries = [e for e in self._dp.route_entries(table_id) if e[0].version == version]
+        result = []
+        for stats_index, (network, paths) in enumerate(entries):
+            proto = 1 if version == 6 else 0
+            fib_paths = [FibPath(sw_if_index, table_id, 0, 1, 0, 0, 0, proto,
+                                 FibPathNh(_address(nh).un, None, 0, 0), 0, _EMPTY_LABELS)
+                         for sw_if_index, nh in paths]
+            result.append(IpRouteDetails(IpRoute(table_id, stats_index, network, len(fib_paths), fib_paths)))
+        _delay(len(result))
+        return result
+
+    def ip_route_add_del(self, is_add, is_multipath=False, route=None):
+        _delay()
+        table_id = int(route.get("table_id", 0))
+        network = _prefix_to_network(route["prefix"])
+        paths = []
+        for path in route.get("paths", []):
+            nh = path.get("nh", {})
+            nh = nh.get("address", nh)
+            raw = _ip_bytes(nh) if nh else b"\x00" * (16 if network.version == 6 else 4)
+            paths.append((int(path.get("sw_if_index", 0)), raw))
+        key = (table_id, network)
+        with self._dp.lock:
+            if table_id not in self._dp.tables:
+                raise ValueError(f"ip_route_add_del: table {table_id} does not exist")
+            if is_add:
+                existing = self._dp.routes_added.get(key, []) if is_multipath else []
+                self._dp.routes_added[key] = existing + paths
+                self._dp.routes_deleted.discard(key)
+            else:
+                self._dp.routes_added.pop(key, None)
+                self._dp.routes_deleted.add(key)
+        return Reply(0)
+
+    def ip_route_add_del_v2(self, is_add, is_multipath=False, route=None):
+        return self.ip_route_add_del(is_add=is_add, is_multipath=is_multipath, route=route)
+
+    # ---- ACLs ----
+
+    def acl_dump(self, acl_index=0xFFFFFFFF):
+        with self._dp.lock:
+            if acl_index != 0xFFFFFFFF:
+                acl = self._dp.acl(acl_index)
+                result = [acl] if acl else []
+            else:
+                indexes = sorted(set(range(SIM_ACLS)) | set(self._dp.acls))
+                result = [a for a in (self._dp.acl(i) for i in indexes) if a is not None]
+        _delay(sum(len(a.r) for a in result))
+        return result
+
+    def acl_add_replace(self, acl_index, tag, count, r):
+        _delay(len(r))
+        rules = [AclRule(int(x["is_permit"]), ipaddress.ip_network(x["src_prefix"], strict=False),
+                         ipaddress.ip_network(x["dst_prefix"], strict=False), int(x["proto"]),
+                         int(x["srcport_or_icmptype_first"]), int(x["srcport_or_icmptype_last"]),
+                         int(x["dstport_or_icmpcode_first"]), int(x["dstport_or_icmpcode_last"]),
+                         int(x.get("tcp_flags_mask", 0)), int(x.get("tcp_flags_value", 0)))
+                 for x in r]
+        with self._dp.lock:
+            if acl_index == 0xFFFFFFFF:
+                acl_index = self._dp.next_acl_index
+                self._dp.next_acl_index += 1
+            elif self._dp.acl(acl_index) is None:
+                raise ValueError(f"acl_add_replace: no such ACL {acl_index}")
+            tag = tag.encode() if isinstance(tag, str) else tag
+            self._dp.acls[acl_index] = AclDetails(acl_index, tag, len(rules), rules)
+            self._dp.deleted_acls.discard(acl_index)
+        return AclAddReplaceReply(0, acl_index)
+
+    def acl_del(self, acl_index):
+        _delay()
+        with self._dp.lock:
+            if self._dp.acl(acl_index) is None:
+                raise ValueError(f"acl_del: no such ACL {acl_index}")
+            self._dp.acls.pop(acl_index, None)
+            self._dp.deleted_acls.add(acl_index)
+        return Reply(0)
+
+    def acl_interface_list_dump(self, sw_if_index=0xFFFFFFFF):
+        with self._dp.lock:
+            items = self._dp.acl_bindings.items()
+            result = [AclInterfaceListDetails(i, len(acls), n_input, list(acls))
+                      for i, (n_input, acls) in sorted(items)
+                      if sw_if_index in (0xFFFFFFFF, i)]
+        _delay(len(result))
+        return result
+
+    def acl_interface_set_acl_list(self, sw_if_index, count, n_input, acls):
+        _delay()
+        with self._dp.lock:
+            if acls:
+                self._dp.acl_bindings[sw_if_index] = (n_input, list(acls))
+            else:
+                self._dp.acl_bindings.pop(sw_if_index, None)
+        return Reply(0)
+
+    # ---- NAT44 ----
+
+    def nat44_show_running_config(self):
+        _delay()
+        sessions = SIM_NAT_USERS * SIM_SESSIONS_PER_USER if self._dp.nat_enabled else 0
+        return Nat44RunningConfig(0, 0, 0, SIM_NAT_USERS, sessions, SIM_SESSIONS_PER_USER, 0)
+
+    def nat44_ed_plugin_enable_disable(self, enable=True, **kwargs):
+        _delay()
+        with self._dp.lock:
+            self._dp.nat_enabled = bool(enable)
+        return Reply(0)
+
+    def nat44_interface_dump(self):
+        with self._dp.lock:
+            result = [Nat44InterfaceDetails(i, f) for i, f in sorted(self._dp.nat_interfaces.items())]
+        _delay(len(result))
+        return result
+
+    def nat44_interface_add_del_feature(self, sw_if_index, is_add, flags):
+        _delay()
+        with self._dp.lock:
+            if is_add:
+                self._dp.nat_interfaces[sw_if_index] = self._dp.nat_interfaces.get(sw_if_index, 0) | flags
+            else:
+                self._dp.nat_interfaces.pop(sw_if_index, None)
+        return Reply(0)
+
+    def nat44_address_dump(self):
+        with self._dp.lock:
+            result = [Nat44AddressDetails(_ip4(packed), flags, vrf)
+                      for (packed, vrf), flags in sorted(self._dp.nat_addresses.items())]
+        _delay(len(result))
+        return result
+
+    def nat44_add_del_address_range(self, first_ip_address, last_ip_address, vrf_id=0, is_add=1, flags=0):
+        _delay()
+        first = int(ipaddress.IPv4Address(first_ip_address))
+        last = int(ipaddress.IPv4Address(last_ip_address))
+        with self._dp.lock:
+            for ip in range(first, last + 1):
+                key = (ipaddress.IPv4Address(ip).packed, int(vrf_id))
+                if is_add:
+                    self._dp.nat_addresses[key] = flags
+                else:
+                    self._dp.nat_addresses.pop(key, None)
+        return Reply(0)
+
+    def nat44_user_dump(self):
+        with self._dp.lock:
+            n = self._dp.user_count()
+        result = [Nat44UserDetails(0, _ip4(_USER_BASE + u), SIM_SESSIONS_PER_USER, 0) for u in range(n)]
+        _delay(len(result))
+        return result
+
+    def nat44_user_session_dump(self, ip_address, vrf_id=0):
+        user = int(ipaddress.IPv4Address(ip_address)) - _USER_BASE
+        if not (0 <= user < self._dp.user_count()):
+            _delay()
+            return []
+        result = self._dp.user_sessions(user)
+        _delay(len(result))
+        return result
+
+    def _synthetic_mapping(self, k):
+        return Nat44StaticMappingDetails(
+            0, _ip4(_MAPPING_BASE + k), _ip4(_PUBLIC_BASE + k % 256), 6,
+            8000 + k, 10000 + k, 0xFFFFFFFF, 0, f"sim-{k}")
+
+    def nat44_static_mapping_dump(self):
+        with self._dp.lock:
+            result = [self._synthetic_mapping(k) for k in range(SIM_STATIC_MAPPINGS)
+                      if k not in self._dp.static_deleted]
+            result.extend(self._dp.static_added.values())
+        _delay(len(result))
+        return result
+
+    def nat44_add_del_static_mapping(self, is_add, local_ip_address, external_ip_address,
+                                     local_port=0, external_port=0, protocol=0, vrf_id=0,
+                                     external_sw_if_index=0xFFFFFFFF, flags=0, tag=""):
+        _delay()
+        details = Nat44StaticMappingDetails(
+            flags, _ip4(local_ip_address), _ip4(external_ip_address), protocol,
+            local_port, external_port, external_sw_if_index, vrf_id, tag)
+        key = (str(details.local_ip_address), local_port, str(details.external_ip_address),
+               external_port, protocol, vrf_id)
+        with self._dp.lock:
+            if is_add:
+                self._dp.static_added[key] = details
+            else:
+                self._dp.static_added.pop(key, None)
+                for k in range(SIM_STATIC_MAPPINGS):
+                    m = self._synthetic_mapping(k)
+                    if (str(m.local_ip_address), m.local_port, str(m.external_ip_address),
+                            m.external_port, m.protocol, m.vrf_id) == key:
+                        self._dp.static_deleted.add(k)
+        return Reply(0)
+
+    # ---- DHCP ----
+
+    def dhcp_plugin_get_version(self):
+        _delay()
+        return DhcpVersionReply(1, 0)
+
+    def dhcp_client_dump(self):
+        with self._dp.lock:
+            result = []
+            for i in range(1, 1 + SIM_DHCP_CLIENTS):
+                if i not in self._dp.dhcp_deleted and i not in self._dp.dhcp_clients:
+                    result.append(self._dhcp_details(DhcpClient(i, f"sim-host-{i}", b"", False, False, 0, 0)))
+            for client in self._dp.dhcp_clients.values():
+                result.append(self._dhcp_details(client))
+        _delay(len(result))
+        return result
+
+    def _dhcp_details(self, client):
+        i = client.sw_if_index
+        lease = DhcpLease(i, 3, False, client.hostname, 24,
+                          _ip4(bytes([172, 16, i & 0xFF, 10])), _ip4(bytes([172, 16, i & 0xFF, 1])),
+                          b"\x00" * 6, 0, [])
+        return DhcpClientDetails(client, lease)
+
+    def dhcp_client_config(self, is_add, client):
+        _delay()
+        details = DhcpClient(int(client["sw_if_index"]), client.get("hostname", ""), client.get("id", b""),
+                             bool(client.get("want_dhcp_event")), bool(client.get("set_broadcast_flag")),
+                             int(client.get("dscp", 0)), int(client.get("pid", 0)))
+        with self._dp.lock:
+            if is_add:
+                self._dp.dhcp_clients[details.sw_if_index] = details
+                self._dp.dhcp_deleted.discard(details.sw_if_index)
+            else:
+                self._dp.dhcp_clients.pop(details.sw_if_index, None)
+                self._dp.dhcp_deleted.add(details.sw_if_index)
+        return Reply(0)
+
+    def dhcp_proxy_dump(self, is_ip6=False):
+        with self._dp.lock:
+            result = []
+            for (rx_vrf, src), servers in sorted(self._dp.dhcp_proxies.items()):
+                if (len(src) == 16) != bool(is_ip6):
+                    continue
+                srv = [DhcpServer(vrf, _ip(addr)) for vrf, addr in servers]
+                result.append(DhcpProxyDetails(rx_vrf, 0, 0, 255, bool(is_ip6), "", _ip(src), len(srv), srv))
+        _delay(len(result))
+        return result
+
+    def dhcp_proxy_config(self, rx_vrf_id, server_vrf_id, is_add, dhcp_server, dhcp_src_address):
+        _delay()
+        key = (int(rx_vrf_id), _ip_bytes(dhcp_src_address))
+        server = (int(server_vrf_id), _ip_bytes(dhcp_server))
+        with self._dp.lock:
+            servers = self._dp.dhcp_proxies.setdefault(key, [])
+            if is_add and server not in servers:
+                servers.append(server)
+            elif not is_add and server in servers:
+                servers.remove(server)
+            if not servers:
+                del self._dp.dhcp_proxies[key]
+        return Reply(0)
+
+    def dhcp_proxy_set_vss(self, **kwargs):
+        _delay()
+        return Reply(0)
+
+    def dhcp6_clients_enable_disable(self, enable=True):
+        _delay()
+        return Reply(0)
+
+    def dhcp6_duid_ll_set(self, duid_ll):
+        _delay()
+        return Reply(0)
+
+    def dhcp_client_detect_enable_disable(self, sw_if_index, enable=True):
+        _delay()
+        return Reply(0)
+
+
+class SimVPPApiClient:
+    """Drop-in for vpp_papi.VPPApiClient backed by the shared SimDataplane."""
+
+    def __init__(self, server_address=None, read_timeout=5, **kwargs):
+        self.server_address = server_address
+        self.read_timeout = read_timeout
+        self.api = None
+        self.transport = None
+
+    def connect(self, name, **kwargs):
+        if SIM_CONNECT_LATENCY_US > 0:
+            time.sleep(SIM_CONNECT_LATENCY_US / 1e6)
+        with dataplane.lock:
+            if not dataplane.running:
+                raise ConnectionRefusedError(f"{self.server_address}: connection refused")
+            dataplane.next_client_index += 1
+            client_index = dataplane.next_client_index
+        self.name = name
+        self.api = _SimApi(dataplane, client_index)
+        return 0
+
+    def disconnect(self):
+        self.api = None
+        return 0
+
+
+class SimVPPStats:
+    """
+    Drop-in for vpp_papi.VPPStats. Interface counters grow at a steady,
+    per-interface rate from dataplane start, split over SIM_WORKER_THREADS.
+    """
+
+    def __init__(self, socketname=None, timeout=10):
+        self.socketname = socketname
+
+    @property
+    def epoch(self):
+        return dataplane.epoch
+
+    def _elapsed(self):
+        return max(time.time() - dataplane.started, 0.0)
+
+    def _combined(self, n, direction):
+        t = self._elapsed()
+        threads = []
+        for th in range(SIM_WORKER_THREADS):
+            row = []
+            for i in range(n):
+                pps = (1 + i % 97) * (200 if direction == "rx" else 150)
+                packets = int(t * pps / SIM_WORKER_THREADS) + th
+                row.append({"packets": packets, "bytes": packets * (64 + (i * 37) % 1400)})
+            threads.append(row)
+        return threads
+
+    def get_counter(self, name):
+        with dataplane.lock:
+            n = dataplane.interface_count()
+            names = []
+            for i in range(n):
+                details = dataplane.interface(i)
+                names.append(details.interface_name if details else "")
+
+        if name == "/if/names":
+            return names
+        if name == "/if/rx":
+            return self._combined(n, "rx")
+        if name == "/if/tx":
+            return self._combined(n, "tx")
+        if name == "/if/drops":
+            t = self._elapsed()
+            return [[int(t * (i % 7)) // SIM_WORKER_THREADS for i in range(n)]
+                    for _ in range(SIM_WORKER_THREADS)]
+        if name.startswith("/err/"):
+            t = self._elapsed()
+            return [int(t * 3) // SIM_WORKER_THREADS] * SIM_WORKER_THREADS
+        raise KeyError(name)
+
+    def ls(self, patterns):
+        counters = ["/if/names", "/if/rx", "/if/tx", "/if/drops", "/err/ip4-input/ip4 ttl <= 1"]
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        return [c for c in counters if any(c.startswith(p.rstrip("*").lstrip("^")) for p in patterns)]
+
+    def close(self):
+        pass
@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from flask import g, has_request_context, request
+
+# VPP_TRACE=1 also times every v.api call; otherwise the proxy only watches for failed calls.
+VPP_TRACE = os.environ.get("VPP_TRACE", "0") not in ("", "0", "false", "no")
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open-ended)
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+trace_log = logging.getLogger("vpp.trace")
+
+
+class ApiCallStats:
+    """Process-wide per-message call histogram for /api/debug/apicalls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, msg, seconds, replies, size):
+        ms = seconds * 1000.0
+        bucket = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                bucket = i
+                break
+
+        with self._lock:
+            entry = self._stats.get(msg)
+            if entry is None:
+                entry = self._stats[msg] = {
+                    "calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "replies": 0, "bytes": 0,
+                    "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                }
+            entry["calls"] += 1
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+            entry["replies"] += replies
+            entry["bytes"] += size
+            entry["buckets"][bucket] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for msg, entry in self._stats.items():
+                result[msg] = dict(entry, buckets=list(entry["buckets"]),
+                                   mean_ms=entry["total_ms"] / entry["calls"])
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+api_call_stats = ApiCallStats()
+
+
+def _reply_size(reply):
+    """(reply count, approximate decoded size in bytes) of an API reply."""
+    if isinstance(reply, list):
+        return len(reply), sum(sys.getsizeof(item) for item in reply)
+    return 1, sys.getsizeof(reply)
+
+
+class CheckedApi:
+    """
+    Proxy for v.api that marks the request's connection broken
+    (g.vpp_broken) when a message call raises, so it is not pooled again
+    even if the handler swallows the error. Always installed.
+    """
+
+    def __init__(self, api):
+        self._api = api
+
+    def __getattr__(self, msg):
+        fn = getattr(self._api, msg)
+        if not callable(fn):
+            return fn
+
+        def checked(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                _mark_broken()
+                raise
+
+        # later calls of this message skip __getattr__
+        self.__dict__[msg] = checked
+        return checked
+
+
+class TracedApi(CheckedApi):
+    """
+    CheckedApi that also times each message call and records it on the
+    current request (g.vpp_calls) and in the global histogram (VPP_TRACE=1).
+    """
+
+    def __getattr__(self, msg):
+        fn = getattr(self._api, msg)
+        if not callable(fn):
+            return fn
+
+        def traced(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                reply = fn(*args, **kwargs)
+            except Exception:
+                _mark_broken()
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+            if not isinstance(reply, list) and hasattr(reply, "__next__"):
+                reply = list(reply)
+            replies, size = _reply_size(reply)
+            record_call(msg, elapsed, replies, size)
+            return reply
+
+        return traced
+
+
+def _mark_broken():
+    if has_request_context():
+        # the request's connection is returned to its pool as broken
+        g.vpp_broken = True
+
+
+def traced_api(api):
+    return TracedApi(api) if VPP_TRACE else CheckedApi(api)
+
+
+def record_call(msg, seconds, replies, size):
+    api_call_stats.record(msg, seconds, replies, size)
+    if has_request_context():
+        calls = g.get("vpp_calls")
+        if calls is None:
+            calls = g.vpp_calls = []
+        calls.append((msg, seconds, replies, size))
+    trace_log.debug("vpp_call %s %.3fms replies=%d bytes=%d", msg, seconds * 1000.0, replies, size)
+
+
+def _server_timing(calls):
+    per_msg = {}
+    for msg, seconds, _replies, _size in calls:
+        total, count = per_msg.get(msg, (0.0, 0))
+        per_msg[msg] = (total + seconds, count + 1)
+
+    total = sum(seconds for _msg, seconds, _r, _s in calls)
+    parts = [f'vpp;dur={total * 1000.0:.3f};desc="{len(calls)} calls"']
+    for msg, (seconds, count) in per_msg.items():
+        parts.append(f'{msg};dur={seconds * 1000.0:.3f};desc="x{count}"')
+    return ", ".join(parts)
+
+
+def _add_trace_headers(response):
+    calls = g.pop("vpp_calls", None)
+    if not calls:
+        return response
+
+    response.headers["Server-Timing"] = _server_timing(calls)
+    if trace_log.isEnabledFor(logging.INFO):
+        trace_log.info("request %s", json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "vpp_calls": len(calls),
+            "vpp_ms": round(sum(c[1] for c in calls) * 1000.0, 3),
+            "replies": sum(c[2] for c in calls),
+            "bytes": sum(c[3] for c in calls),
+            "messages": sorted({c[0] for c in calls}),
+        }))
+    return response
+
+
+def init_vpp_trace(app):
+    """
+    Call this from create_app() to emit Server-Timing headers and per-request
+    trace log lines. Does nothing unless VPP_TRACE is enabled.
+    """
+    if VPP_TRACE:
+        app.after_request(_add_trace_headers)
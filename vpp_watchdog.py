@@ -0,0 +1,213 @@
+"""
+VPP restart watchdog.
+
+A background thread keeps one API connection and probes it every
+VPP_WATCHDOG_INTERVAL seconds with control_ping plus the stats segment
+epoch. VPP has restarted when the connection drops and comes back, or when
+the epoch / vpe_pid changes under a live connection. On a restart it
+
+  * bumps the connection generation so long-lived background connections
+    (counter recorder, alert evaluator) reconnect on their next tick,
+  * drops every cached dump, listing and route index from the old
+    instance,
+  * replays the newest known configuration of the default target -- the
+    last document applied to it through config_apply, or its latest saved
+    config snapshot if that is newer -- with the usual batched apply,
+    retrying while VPP finishes starting up.
+
+Only those two sources exist: changes made afterwards through the other
+endpoints (or vppctl) are not replayed unless a snapshot was saved after
+them, and the last applied document is lost when the GUI restarts.
+
+Restore time (restart detected as down -> data plane config replayed) is
+recorded per restart and exposed at GET /api/debug/watchdog.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import config_apply
+import config_snapshot
+from route_index import route_indexer
+from vpp_cache import config_cache, dump_flight
+from vpp_connection import DEFAULT_TARGET, connect_vpp, disconnect_vpp, new_connection_generation
+
+log = logging.getLogger(__name__)
+
+VPP_WATCHDOG = os.environ.get("VPP_WATCHDOG", "0") not in ("", "0", "false", "no")
+VPP_WATCHDOG_INTERVAL = float(os.environ.get("VPP_WATCHDOG_INTERVAL", "1"))
+VPP_WATCHDOG_REPLAY = os.environ.get("VPP_WATCHDOG_REPLAY", "1") not in ("", "0", "false", "no")
+
+REPLAY_ATTEMPTS = 5
+RESTART_HISTORY = 50
+
+
+def probe(v):
+    """(stats epoch, vpe_pid, client_index) for v's VPP instance. Raises if the connection is dead."""
+    reply = v.api.control_ping()
+    stats = getattr(v, "vpp_stats", None)
+    epoch = getattr(stats, "epoch", None) if stats is not None else None
+    return epoch, getattr(reply, "vpe_pid", None), getattr(reply, "client_index", None)
+
+
+class VppWatchdog(threading.Thread):
+    """Detects VPP restarts and replays the last applied configuration."""
+
+    def __init__(self, interval, replay=True):
+        super().__init__(daemon=True, name="vpp-watchdog")
+        self.interval = interval
+        self.replay = replay
+        self._lock = threading.Lock()
+        self.state = "starting"
+        self.identity = None           # (epoch, vpe_pid) of the instance we last saw
+        self.client_index = None
+        self.down_since = None
+        self.last_ok = None
+        self.restarts = deque(maxlen=RESTART_HISTORY)
+        self.restart_count = 0
+        self.last_error = None
+
+    def run(self):
+        v = None
+        while True:
+            started = time.monotonic()
+            try:
+                if v is None:
+                    v = connect_vpp("vpp-gui-watchdog")
+                epoch, pid, client_index = probe(v)
+                self._seen(v, (epoch, pid), client_index)
+                self.last_error = None
+            except Exception as e:
+                if self.last_error != str(e):
+                    log.warning("VPP watchdog probe failed: %s", e)
+                self.last_error = str(e)
+                if v is not None:
+                    disconnect_vpp(v)
+                    v = None
+                with self._lock:
+                    if self.state != "down":
+                        # VPP was last seen alive at last_ok; count the outage from there
+                        self.down_since = self.last_ok or time.time()
+                        self.state = "down"
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _seen(self, v, identity, client_index):
+        now = time.time()
+        with self._lock:
+            previous, down_since = self.identity, self.down_since
+            self.identity = identity
+            self.client_index = client_index
+            self.last_ok = now
+            self.down_since = None
+            first = previous is None
+            # without an epoch or pid to compare, any reconnect after an outage counts
+            unknown = identity == (None, None)
+            restarted = not first and (identity != previous or (unknown and down_since is not None))
+            self.state = "up"
+        if first:
+            log.info("VPP watchdog: epoch %s, vpe_pid %s", *identity)
+            return
+        if not restarted:
+            if down_since is not None:
+                log.info("VPP watchdog: connection restored, same VPP instance")
+            return
+        self._restarted(v, previous, identity, down_since or now, now)
+
+    def _restarted(self, v, previous, identity, down_since, detected):
+        log.warning("VPP restart detected (epoch %s -> %s, vpe_pid %s -> %s)",
+                    previous[0], identity[0], previous[1], identity[1])
+        with self._lock:
+            self.state = "restoring"
+        new_connection_generation()
+        config_cache.clear()
+        dump_flight.invalidate()
+        route_indexer.reset()
+
+        record = {
+            "down_since": down_since,
+            "detected_at": detected,
+            "epoch": identity[0],
+            "vpe_pid": identity[1],
+            "replayed": False,
+        }
+        source, doc = self._replay_source() if self.replay else (None, None)
+        if doc is not None:
+            record["source"] = source
+            record.update(self._replay(v, doc))
+        record["restore_s"] = round(time.time() - down_since, 3)
+
+        with self._lock:
+            self.restarts.append(record)
+            self.restart_count += 1
+            self.state = "up"
+        log.warning("VPP restored in %.3fs (%s)", record["restore_s"],
+                    "config replayed" if record["replayed"] else "nothing to replay")
+
+    def _replay_source(self):
+        """(source label, document) of the newest configuration to replay, or (None, None)."""
+        applied = config_apply.last_applied.get(DEFAULT_TARGET) or {"document": None, "applied_at": None}
+        best = ("last_applied", applied["document"], applied["applied_at"] or 0.0)
+        try:
+            snapshots = config_snapshot.list_snapshots(target=DEFAULT_TARGET)
+            if snapshots and (best[1] is None or snapshots[-1]["created"] > best[2]):
+                latest = config_snapshot.load_snapshot(snapshots[-1]["name"], target=DEFAULT_TARGET)
+                best = (f"snapshot:{latest['name']}", latest["document"], latest["created"])
+        except Exception as e:
+            log.warning("Cannot read config snapshots for replay: %s", e)
+        return (best[0], best[1]) if best[1] is not None else (None, None)
+
+    def _replay(self, v, doc):
+        started = time.perf_counter()
+        result = None
+        for attempt in range(1, REPLAY_ATTEMPTS + 1):
+            try:
+                result = config_apply.apply_config(v, doc)
+                if result["success"]:
+                    break
+                log.warning("Config replay attempt %d: %d error(s)", attempt, result["errors"])
+            except Exception as e:
+                log.warning("Config replay attempt %d failed: %s", attempt, e)
+            time.sleep(min(0.1 * 2 ** attempt, self.interval))
+        return {
+            "replayed": bool(result and result["success"]),
+            "replay_attempts": attempt,
+            "replay_ms": round((time.perf_counter() - started) * 1000.0, 3),
+            "changes": len(result["changes"]) if result else 0,
+            "errors": result["errors"] if result else None,
+        }
+
+    def snapshot(self):
+        with self._lock:
+            restarts = list(self.restarts)
+            restore = [r["restore_s"] for r in restarts]
+            return {
+                "enabled": True,
+                "state": self.state,
+                "interval_s": self.interval,
+                "replay": self.replay,
+                "epoch": self.identity[0] if self.identity else None,
+                "vpe_pid": self.identity[1] if self.identity else None,
+                "client_index": self.client_index,
+                "down_since": self.down_since,
+                "last_ok": self.last_ok,
+                "last_error": self.last_error,
+                "restarts": self.restart_count,
+                "restore_s": {
+                    "last": restore[-1] if restore else None,
+                    "min": min(restore) if restore else None,
+                    "max": max(restore) if restore else None,
+                    "mean": round(sum(restore) / len(restore), 3) if restore else None,
+                },
+                "history": restarts,
+            }
+
+
+vpp_watchdog = VppWatchdog(VPP_WATCHDOG_INTERVAL, VPP_WATCHDOG_REPLAY)
+
+
+def init_vpp_watchdog(app):
+    """Call this from create_app() to start the restart watchdog (VPP_WATCHDOG=1)."""
+    if VPP_WATCHDOG and not vpp_watchdog.is_alive():
+        vpp_watchdog.start()